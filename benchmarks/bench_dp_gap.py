@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.bess import Bess
+from src.bess_optimizer import Bess_Optimizer
+
+# months of the bundled 2023 dataset, plus the full year
+PERIODS = [(f'{month:02d}-01-2023', (pd.Timestamp(2023, month, 1) + pd.offsets.MonthEnd()).strftime('%m-%d-%Y'))
+           for month in range(1, 13)] + [('01-01-2023', '12-31-2023')]
+
+
+def main():
+    """
+    report the optimality gap and run time of the dp backend against the HiGHS LP,
+    and check that the dp backend is faster over all the periods
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--soc_levels", type = int, required = False, help="points of the state of charge grid", default = 41)
+    parser.add_argument("--iterations", type = int, required = False, help="passes of the daily multipliers", default = 4)
+    args = parser.parse_args()
+
+    optimizers = {backend: Bess_Optimizer(case = 'benchmark', backend = backend) for backend in ('highs', 'dp')}
+    for optimizer in optimizers.values():
+        optimizer.load_prices(energy_price_file = 'data/energy_prices.csv')
+        optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    optimizers['dp'].dp_options = {'soc_levels': args.soc_levels, 'iterations': args.iterations}
+
+    rows = []
+    for start, end in PERIODS:
+        row = {'start': start, 'end': end}
+        for backend, optimizer in optimizers.items():
+            begin = time.perf_counter()
+            optimizer.optimize_period(Bess(), start, end)
+            row[f'{backend}_time'] = round(time.perf_counter() - begin, 2)
+            row[f'{backend}_profit'] = round(optimizer.get_profit(), 1)
+        row['gap_pct'] = round(100 * (row['highs_profit'] - row['dp_profit']) / abs(row['highs_profit']), 2)
+        rows.append(row)
+    results = pd.DataFrame(rows)
+    print(results.to_string(index = False))
+    dp_time, highs_time = results['dp_time'].sum(), results['highs_time'].sum()
+    assert dp_time < highs_time, f"dp backend took {dp_time:.2f} s, slower than HiGHS ({highs_time:.2f} s)"
+
+
+if __name__ == "__main__":
+    main()
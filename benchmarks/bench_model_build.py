@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.bess import Bess
+from src.bess_optimizer import Bess_Optimizer
+
+# horizons benchmarked over the bundled 2023 dataset
+HORIZONS = {
+    '1 month': ('01-01-2023', '01-31-2023'),
+    '1 quarter': ('01-01-2023', '03-31-2023'),
+    'full year': ('01-01-2023', '12-31-2023'),
+}
+
+
+def main():
+    """
+    time the LP model build of Bess_Optimizer for 1 month, 1 quarter and the full 8760-hour dataset
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type = int, required = False, help="number of builds per horizon", default = 3)
+    args = parser.parse_args()
+
+    optimizer = Bess_Optimizer(case = 'benchmark')
+    optimizer.load_prices(energy_price_file = 'data/energy_prices.csv')
+    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    bess = Bess()
+
+    print(f"{'horizon':<12}{'hours':>8}{'constraints':>14}{'best build [s]':>16}")
+    for horizon, (start_day, end_day) in HORIZONS.items():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            optimizer.build_model(bess, start_day = start_day, end_day = end_day, initial_charge = 0)
+            timings.append(time.perf_counter() - start)
+        print(f"{horizon:<12}{len(optimizer.period):>8}{len(optimizer.optimizer.constraints):>14}{min(timings):>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.bess import Bess
+from src.bess_optimizer import Bess_Optimizer
+
+# (window_hours, commit_hours) pairs compared against the monolithic solve
+WINDOWS = [(24, 24), (36, 24), (48, 24), (72, 24), (48, 12)]
+
+
+def main():
+    """
+    report the profit gap and run time of rolling horizon windows against the monolithic solve
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start_date", type = str, required = False, help="start date of the period", default ='01-01-2023')
+    parser.add_argument("--end_date", type = str, required = False, help="end date of the period", default ='03-31-2023')
+    parser.add_argument("--backend", type = str, required = False, help="model backend: pulp, highs or dp", default ='highs', choices = ['pulp', 'highs', 'dp'])
+    args = parser.parse_args()
+
+    optimizer = Bess_Optimizer(case = 'benchmark', backend = args.backend)
+    optimizer.load_prices(energy_price_file = 'data/energy_prices.csv')
+    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    report = optimizer.rolling_profit_gap(Bess(), args.start_date, args.end_date, WINDOWS)
+    print(report.to_string(index = False))
+
+
+if __name__ == "__main__":
+    main()
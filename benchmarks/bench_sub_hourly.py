@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.bess import Bess
+from src.bess_optimizer import Bess_Optimizer
+from src.lp_matrix import build_lp_matrices
+
+
+def expand_prices(price_file: str, intervals: int, path: str, seed: int = 0):
+    """
+    write the hourly prices of price_file as intervals per hour with a little noise between intervals
+    """
+    prices = pd.read_csv(price_file)
+    expanded = prices.loc[prices.index.repeat(intervals)].reset_index(drop = True)
+    expanded.insert(2, 'Interval', np.tile(np.arange(1, intervals + 1), len(prices)))
+    expanded['Price'] = (expanded['Price'] * np.random.default_rng(seed).normal(1, 0.05, len(expanded))).round(2)
+    expanded.to_csv(path, index = False)
+
+
+def main():
+    """
+    time aligning and building the full year model of 8760 hours at 60, 15 and 5 minute intervals
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type = int, nargs = '+', required = False, help="interval lengths to benchmark",
+                        default = [60, 15, 5])
+    parser.add_argument("--pulp", action = 'store_true', help="also time the PuLP model build")
+    args = parser.parse_args()
+
+    bess = Bess()
+    print(f"{'interval':<10}{'intervals':>10}{'align [s]':>11}{'matrices [s]':>14}{'pulp [s]':>10}")
+    with tempfile.TemporaryDirectory() as folder:
+        for minutes in args.minutes:
+            price_file = 'data/energy_prices.csv'
+            if minutes != 60:
+                price_file = os.path.join(folder, f'energy_prices_{minutes}min.csv')
+                expand_prices('data/energy_prices.csv', 60 // minutes, price_file)
+            optimizer = Bess_Optimizer(case = 'benchmark')
+            optimizer.load_prices(energy_price_file = price_file)
+            optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+
+            start = time.perf_counter()
+            period, day_ranges, energy, reg_up, reg_down = optimizer.align_prices('01-01-2023', '12-31-2023')
+            align = time.perf_counter() - start
+
+            start = time.perf_counter()
+            build_lp_matrices(energy, reg_up, reg_down, day_ranges, bess.get_power_capacity(), bess.get_energy_capacity(),
+                              bess.get_efficiency(), interval_hours = optimizer.interval_hours)
+            matrices = time.perf_counter() - start
+
+            pulp = float('nan')
+            if args.pulp:
+                start = time.perf_counter()
+                optimizer.build_model_arrays(bess, period, day_ranges, energy, reg_up, reg_down)
+                pulp = time.perf_counter() - start
+            print(f"{f'{minutes} min':<10}{len(period):>10}{align:>11.3f}{matrices:>14.3f}{pulp:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import math
+import time
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip('pytest_benchmark')
+from src.bess import Bess
+from src.bess_optimizer import Bess_Optimizer
+from src.portfolio import Bess_Portfolio
+from src.price_store import Price_Store
+from benchmarks.conftest import HORIZONS, ROUNDS, make_optimizer
+
+# asset counts of the portfolio scaling curve
+ASSETS = [1, 2, 4, 8]
+
+
+@pytest.mark.parametrize('use_cache', [False, True])
+def test_load_prices(benchmark, tmp_path, use_cache):
+    '''
+    time parsing the energy prices, from the csv and from the memory-mapped cache
+    '''
+    benchmark.group = 'load_prices'
+    optimizer = Bess_Optimizer(case = 'benchmark')
+    optimizer.price_store = Price_Store(cache_dir = str(tmp_path), use_cache = use_cache)
+    optimizer.load_prices('data/energy_prices.csv')
+    benchmark(optimizer.load_prices, 'data/energy_prices.csv')
+
+
+@pytest.mark.parametrize('backend', ['pulp', 'highs'])
+@pytest.mark.parametrize('horizon', list(HORIZONS))
+def test_build_model(benchmark, loaded_prices, horizon, backend):
+    '''
+    time the model build by horizon
+    '''
+    benchmark.group = f'build_model-{backend}'
+    benchmark.extra_info['hours'] = len(make_optimizer(loaded_prices).align_prices(*HORIZONS[horizon])[0])
+    optimizer = make_optimizer(loaded_prices, backend)
+    period, day_ranges, energy, reg_up, reg_down = optimizer.align_prices(*HORIZONS[horizon])
+
+    if backend == 'pulp':
+        build = lambda: optimizer.build_model_arrays(Bess(), period, day_ranges, energy, reg_up, reg_down)
+    else:
+        from src.lp_matrix import build_lp_matrices
+        build = lambda: build_lp_matrices(energy, reg_up, reg_down, day_ranges, 100, 200 / 0.9, 0.9)
+    benchmark.pedantic(build, rounds = ROUNDS[horizon], iterations = 1)
+
+
+@pytest.mark.parametrize('backend', ['pulp', 'highs'])
+@pytest.mark.parametrize('horizon', list(HORIZONS))
+def test_solve(benchmark, loaded_prices, horizon, backend):
+    '''
+    time the solve by horizon, the model build is done in the setup of each round
+    '''
+    benchmark.group = f'solve-{backend}'
+    optimizer = make_optimizer(loaded_prices, backend)
+    period, day_ranges, energy, reg_up, reg_down = optimizer.align_prices(*HORIZONS[horizon])
+    benchmark.extra_info['hours'] = len(period)
+
+    if backend == 'pulp':
+        from pulp import PULP_CBC_CMD
+        setup = lambda: optimizer.build_model_arrays(Bess(), period, day_ranges, energy, reg_up, reg_down)
+        solve = lambda: optimizer.optimizer.solve(PULP_CBC_CMD(msg = False))
+    else:
+        from src.lp_matrix import build_lp_matrices, solve_matrices
+        matrices = build_lp_matrices(energy, reg_up, reg_down, day_ranges, 100, 200 / 0.9, 0.9)
+        setup = None
+        solve = lambda: solve_matrices(matrices)
+    benchmark.pedantic(solve, setup = setup, rounds = ROUNDS[horizon], iterations = 1)
+
+
+@pytest.mark.parametrize('horizon', list(HORIZONS))
+def test_extraction(benchmark, loaded_prices, horizon):
+    '''
+    time the extraction of the schedule from the solved PuLP model by horizon
+    '''
+    benchmark.group = 'extraction'
+    optimizer = make_optimizer(loaded_prices)
+    optimizer.optimize_period(Bess(), *HORIZONS[horizon])
+    benchmark.extra_info['hours'] = len(optimizer.period)
+    benchmark.pedantic(optimizer.process_optimal_schedule, rounds = ROUNDS[horizon], iterations = 1)
+
+
+@pytest.mark.parametrize('poi_limit', [None, 150])
+@pytest.mark.parametrize('assets', ASSETS)
+def test_portfolio(benchmark, loaded_prices, assets, poi_limit):
+    '''
+    time a one week portfolio optimization by asset count, independent blocks and with a POI limit
+    '''
+    benchmark.group = f'portfolio-{"poi" if poi_limit else "independent"}'
+    benchmark.extra_info['assets'] = assets
+    portfolio = Bess_Portfolio(make_optimizer(loaded_prices, 'highs'), [Bess() for _ in range(assets)], poi_limit = poi_limit)
+    benchmark.pedantic(portfolio.optimize_period, args = HORIZONS['1_week'], rounds = 3, iterations = 1)
+
+
+def test_build_scales_linearly(loaded_prices):
+    '''
+    fail loudly when the model build grows superlinearly with the horizon, on any machine
+    '''
+    optimizer = make_optimizer(loaded_prices)
+    timings = {}
+    for horizon in ['1_month', '1_year']:
+        period, day_ranges, energy, reg_up, reg_down = optimizer.align_prices(*HORIZONS[horizon])
+        best = math.inf
+        for _ in range(2):
+            start = time.perf_counter()
+            optimizer.build_model_arrays(Bess(), period, day_ranges, energy, reg_up, reg_down)
+            best = min(best, time.perf_counter() - start)
+        timings[horizon] = (len(period), best)
+
+    (month_hours, month_time), (year_hours, year_time) = timings['1_month'], timings['1_year']
+    exponent = math.log(year_time / month_time) / math.log(year_hours / month_hours)
+    assert exponent < 1.3, f'model build scales as hours^{exponent:.2f}, expected close to linear'
@@ -0,0 +1,37 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.bess_optimizer import Bess_Optimizer
+
+# horizons of the scaling curves over the bundled 2023 dataset
+HORIZONS = {
+    '1_day': ('01-01-2023', '01-01-2023'),
+    '1_week': ('01-01-2023', '01-07-2023'),
+    '1_month': ('01-01-2023', '01-31-2023'),
+    '1_year': ('01-01-2023', '12-31-2023'),
+}
+
+# benchmark rounds by horizon, so the year long cases stay affordable
+ROUNDS = {'1_day': 20, '1_week': 10, '1_month': 5, '1_year': 2}
+
+
+@pytest.fixture(scope = 'session')
+def loaded_prices():
+    '''
+    energy and regulation prices loaded once for every benchmark
+    '''
+    optimizer = Bess_Optimizer(case = 'benchmark')
+    optimizer.load_prices(energy_price_file = 'data/energy_prices.csv')
+    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    return optimizer.energy_price, optimizer.reg_prices
+
+
+def make_optimizer(loaded_prices, backend: str = 'pulp') -> Bess_Optimizer:
+    '''
+    optimizer sharing the session prices
+    '''
+    optimizer = Bess_Optimizer(case = 'benchmark', backend = backend)
+    optimizer.energy_price, optimizer.reg_prices = loaded_prices
+    return optimizer
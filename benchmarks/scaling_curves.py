@@ -0,0 +1,63 @@
+import os
+import sys
+import glob
+import json
+import argparse
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def latest_run(storage: str = '.benchmarks') -> str:
+    """
+    return the newest pytest-benchmark json saved with --benchmark-autosave or --benchmark-save
+    """
+    runs = glob.glob(os.path.join(storage, '*', '*.json'))
+    if not runs:
+        sys.exit(f'no saved benchmark runs in {storage}, run the suite with --benchmark-autosave first')
+    return max(runs, key = os.path.getmtime)
+
+
+def scaling_curves(run_file: str) -> dict:
+    """
+    group the mean time of the benchmarks by group, against hours or asset count
+    """
+    with open(run_file) as run:
+        benchmarks = json.load(run)['benchmarks']
+    curves = {}
+    for benchmark in benchmarks:
+        size = benchmark['extra_info'].get('hours', benchmark['extra_info'].get('assets'))
+        if size is not None:
+            curves.setdefault(benchmark['group'], []).append((size, benchmark['stats']['mean']))
+    return {group: sorted(points) for group, points in curves.items()}
+
+
+def main():
+    """
+    print and plot the scaling curves of a saved benchmark run
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--run", type = str, required = False, help="pytest-benchmark json, the newest saved run by default", default = None)
+    parser.add_argument("--output", type = str, required = False, help="pdf with the scaling curves", default = 'output/scaling_curves.pdf')
+    args = parser.parse_args()
+
+    curves = scaling_curves(args.run or latest_run())
+    figure, axes = plt.subplots(1, 2, figsize = (12, 4))
+    for group, points in curves.items():
+        sizes, means = zip(*points)
+        print(f'{group}: ' + ', '.join(f'{size} -> {mean:.4f}s' for size, mean in points))
+        axis = axes[1] if group.startswith('portfolio') else axes[0]
+        axis.plot(sizes, means, marker = 'o', label = group)
+
+    axes[0].set(xscale = 'log', yscale = 'log', xlabel = 'Hours', ylabel = 'Mean time [s]', title = 'Scaling with horizon')
+    axes[1].set(xlabel = 'Assets', ylabel = 'Mean time [s]', title = 'Scaling with asset count (1 week)')
+    for axis in axes:
+        axis.grid(True, linestyle = '--', alpha = 0.6)
+        axis.legend(fontsize = 8)
+    figure.tight_layout()
+    figure.savefig(args.output)
+    plt.close(figure)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 from src.bess import Bess
 from src.bess_optimizer import Bess_Optimizer
-from src.visualizer import Visualizer
+from src.visualizer import Visualizer, render_reports
+from src.sweep import build_grid, run_sweep
+from src.service import Optimization_Service
+from src.profiler import Profiler
+from src.solution_cache import Solution_Cache
+from src.solvers import available_solvers
 import argparse
 
 def main():
@@ -16,20 +21,95 @@ def main():
     parser.add_argument("--energy_capacity", type = float, required = False, help="Bess power capacity", default= 200)
     parser.add_argument("--start_date", type = str, required = False, help="optimization start date", default ='03-01-2023')
     parser.add_argument("--end_date", type = str, required = False, help="Optimization end date", default ='04-01-2023')
+    parser.add_argument("--backend", type = str, required = False, help="model backend: pulp, highs or dp", default ='pulp', choices = ['pulp', 'highs', 'dp'])
+    parser.add_argument("--report_format", type = str, required = False, help="hourly report format: csv or parquet", default ='csv', choices = ['csv', 'parquet'])
+    parser.add_argument("--profile", action = "store_true", help="measure time and memory of each stage into output/profile-<case>.json")
+    parser.add_argument("--window_hours", type = int, required = False, help="rolling horizon window, 0 solves the whole period at once", default = 0)
+    parser.add_argument("--commit_hours", type = int, required = False, help="hours committed from each rolling horizon window", default = 24)
+    parser.add_argument("--cache", action = "store_true", help="reuse schedules solved before for the same case from output/.solution_cache")
+    parser.add_argument("--solver", type = str, required = False, help="LP solver: cbc, highs or glpk, by default cbc for pulp and highs for highs", default = None, choices = ['cbc', 'highs', 'glpk'])
+    parser.add_argument("--threads", type = int, required = False, help="solver threads", default = None)
+    parser.add_argument("--time_limit", type = float, required = False, help="solver time limit in seconds", default = None)
+    parser.add_argument("--tolerance", type = float, required = False, help="solver primal and dual feasibility tolerance", default = None)
+    parser.add_argument("--race", type = str, nargs = "+", required = False, help="race these solvers in parallel and keep the first optimal result", default = None, choices = ['cbc', 'highs', 'glpk'])
+    parser.add_argument("--sensitivity", action = "store_true", help="report the marginal profit of power, energy, daily limits and initial charge into output/sensitivity-<case>.csv")
+    parser.add_argument("--headless", action = "store_true", help="write the plots into one downsampled output/report-<case>.pdf without opening windows")
+
+    # sweep subcommand over a grid of Bess parameters and periods
+    subparsers = parser.add_subparsers(dest = "command")
+    sweep_parser = subparsers.add_parser("sweep", help="optimize a grid of Bess sizes and periods in parallel")
+    sweep_parser.add_argument("--power_capacity", type = float, nargs = "+", required = False, help="Bess power capacities", default = [100])
+    sweep_parser.add_argument("--energy_capacity", type = float, nargs = "+", required = False, help="Bess energy capacities", default = [200])
+    sweep_parser.add_argument("--period", type = str, nargs = "+", required = False, help="periods as start_date:end_date", default = ['03-01-2023:04-01-2023'])
+    sweep_parser.add_argument("--workers", type = int, required = False, help="number of worker processes, all cores by default", default = None)
+    sweep_parser.add_argument("--reports", action = "store_true", help="render output/report-<case>.pdf of every case in parallel")
+
+    # serve subcommand keeping prices and solver processes warm between requests
+    serve_parser = subparsers.add_parser("serve", help="serve optimization requests over HTTP on localhost")
+    serve_parser.add_argument("--port", type = int, required = False, help="port of the service on localhost", default = 8765)
+    serve_parser.add_argument("--workers", type = int, required = False, help="number of solver processes, all cores by default", default = None)
+    serve_parser.add_argument("--queue_size", type = int, required = False, help="requests waiting for a solver before rejecting with 503", default = 8)
+    serve_parser.add_argument("--warm_models", type = int, required = False, help="models kept built in each solver process for repeated Bess and periods", default = 4)
     args = parser.parse_args()
 
+    if args.command == "sweep":
+        sweep(args)
+        return
+    if args.command == "serve":
+        service = Optimization_Service(workers = args.workers, queue_size = args.queue_size, backend = args.backend,
+                                       warm_models = args.warm_models, port = args.port)
+        print(f'serving optimization requests on {service.address}')
+        service.serve_forever()
+        return
+
+    # reject option combinations before loading any prices
+    solver_flags = args.solver or args.threads is not None or args.time_limit is not None or args.tolerance is not None
+    if args.backend == 'dp' and (solver_flags or args.race):
+        parser.error("--backend dp solves without an LP solver, it cannot be combined with --solver, --threads, --time_limit, --tolerance or --race")
+    if args.race and args.solver:
+        parser.error("--race picks the solver, it cannot be combined with --solver")
+    missing = [solver for solver in [args.solver, *(args.race or [])] if solver and solver not in available_solvers()]
+    if missing:
+        parser.error(f"solver {', '.join(missing)} is not installed, available: {', '.join(available_solvers())}")
+    if args.window_hours > 0 and not 0 < args.commit_hours <= args.window_hours:
+        parser.error("--commit_hours must be between 1 and --window_hours")
+    if args.sensitivity and args.window_hours > 0:
+        parser.error("--sensitivity solves the whole period at once, it cannot be combined with --window_hours")
+    if args.sensitivity and (args.cache or args.race or args.solver not in (None, 'highs') or args.threads is not None):
+        parser.error("--sensitivity solves once with SciPy HiGHS for its duals, it cannot be combined with --cache, --race, --threads or a --solver other than highs")
+
     # create a Bess instance
     bess_texas = Bess(power_capacity = args.power_capacity, energy_capacity = args.energy_capacity)
     # create a Bess Optimizer instance
-    optimizer = Bess_Optimizer(case = args.case)
+    optimizer = Bess_Optimizer(case = args.case, backend = args.backend)
+    profiler = Profiler(enabled = args.profile)
+    optimizer.profiler = profiler
+    if args.cache:
+        optimizer.solution_cache = Solution_Cache()
+    limits = {'threads': args.threads, 'time_limit': args.time_limit, 'tolerance': args.tolerance}
+    limits = {name: value for name, value in limits.items() if value is not None}
+    optimizer.solver_options = {**limits, **({'solver': args.solver} if args.solver else {})}
+    optimizer.race = [{'solver': solver, **limits} for solver in args.race or []]
     # load energy prices
     optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
     # load regulation prices
     optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
     # optimize the period
-    optimizer.optimize_period(bess_texas, start_day = args.start_date, end_day = args.end_date, initial_charge = 0)
+    if args.sensitivity:
+        marginals = optimizer.optimize_sensitivity(bess_texas, start_day = args.start_date, end_day = args.end_date, initial_charge = 0)
+        optimizer.save_sensitivity_report(file_format = args.report_format)
+        print('MARGINAL PROFIT OVER THE PERIOD:')
+        for name, value in marginals.items():
+            print(f'{name}: {value}')
+    elif args.window_hours > 0:
+        optimizer.optimize_rolling(bess_texas, start_day = args.start_date, end_day = args.end_date, initial_charge = 0,
+                                   window_hours = args.window_hours, commit_hours = args.commit_hours)
+    else:
+        optimizer.optimize_period(bess_texas, start_day = args.start_date, end_day = args.end_date, initial_charge = 0)
+    if optimizer.solved_by is not None:
+        print(f"solved by {optimizer.solved_by['solver']} in {optimizer.solve_time:.2f} s, status {optimizer.solve_status}")
     # write hourly report
-    optimizer.save_hourly_report()
+    optimizer.save_hourly_report(file_format = args.report_format)
     # set the optimal schedule on bess
     bess_texas.set_schedule(optimizer.get_optimal_schedule())
     # set the profit to the bess
@@ -37,8 +117,30 @@ def main():
     # print the total profit and number of cycles
     bess_texas.print_report()
 
-    visualizer = Visualizer(args.case)
-    visualizer.plot()
+    # plot the in-memory schedule without reading the report back
+    visualizer = Visualizer(args.case, data = optimizer.get_optimal_schedule(), profiler = profiler)
+    if args.headless:
+        visualizer.render_pdf()
+    else:
+        visualizer.plot()
+
+    if args.profile:
+        profiler.print_report()
+        profiler.save(f'output/profile-{args.case}.json')
+    profiler.close()
+
+
+def sweep(args):
+    """
+    run the sweep subcommand and write the summary table into the output folder
+    """
+    periods = [tuple(period.split(':')) for period in args.period]
+    cases = build_grid(args.power_capacity, args.energy_capacity, periods)
+    summary, schedules = run_sweep(cases, workers = args.workers, backend = args.backend)
+    summary.to_csv(f'output/sweep-{args.case}.csv', index = False)
+    if args.reports:
+        render_reports({f'{args.case}-{case}': schedule for case, schedule in schedules.items()}, workers = args.workers)
+    print(summary.to_string(index = False))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+from src.bess import Bess
+from src.lp_matrix import VARIABLES
+
+
+def schedule_arrays(schedule) -> dict:
+    """
+    Returns the hourly values of each of the VARIABLES as float arrays, from a schedule DataFrame
+    like Bess_Optimizer.schedule_ds or a dict of arrays.
+    """
+    return {var: np.asarray(schedule[var], dtype = float) for var in VARIABLES}
+
+
+def schedule_day_ranges(schedule: pd.DataFrame) -> list:
+    """
+    Returns the index ranges [start, stop) of each day of a schedule indexed by hour.
+    """
+    days = schedule.index.normalize().asi8
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    return list(zip(starts.tolist(), np.r_[starts[1:], len(days)].tolist()))
+
+
+def schedule_interval_hours(schedule) -> float:
+    """
+    Returns the length in hours of the intervals of a schedule DataFrame, 1 for a dict of arrays.
+    """
+    if not isinstance(schedule, pd.DataFrame) or len(schedule) < 2:
+        return 1.0
+    return schedule.index.to_series().diff().dropna().mode()[0] / pd.Timedelta(hours = 1)
+
+
+def settle(schedule, energy: np.ndarray, reg_up: np.ndarray, reg_down: np.ndarray,
+           throughput_fee: float = 0.0, hourly: bool = False, interval_hours: float = None) -> dict:
+    """
+    Settles a fixed schedule against any number of price series without re-solving.
+
+    Parameters:
+    schedule: schedule DataFrame or dict of hourly arrays of the VARIABLES.
+    energy / reg_up / reg_down: realized prices of shape (hours,) or (paths, hours).
+    throughput_fee: fee paid per MWh charged or discharged.
+    hourly: also return the (paths, hours) revenue of every hour.
+    interval_hours: length of each interval in hours, taken from the index of a schedule DataFrame when not given.
+
+    Returns: A dict of (paths,) arrays with the energy and regulation revenue, the fees and the
+    total revenue, plus the hourly revenue when requested. Regulation revenue includes the 0.1
+    energy deployed, as in the objective of the optimizer.
+    """
+    h = schedule_interval_hours(schedule) if interval_hours is None else interval_hours
+    values = schedule_arrays(schedule)
+    energy, reg_up, reg_down = (np.atleast_2d(np.asarray(prices, dtype = float)) for prices in (energy, reg_up, reg_down))
+    net = values['gen_hour'] - values['charge_hour']
+    deployed = values['reg_up_hour'] + values['reg_down_hour']
+
+    # totals as matrix-vector products, no (paths, hours) temporaries
+    energy_revenue = h * (energy @ net)
+    regulation_revenue = h * (reg_up @ values['reg_up_hour'] + reg_down @ values['reg_down_hour'] + 0.1 * energy @ deployed)
+    fees = np.full(energy_revenue.shape, h * throughput_fee * (values['gen_hour'] + values['charge_hour']).sum())
+    settlement = {
+        'energy_revenue': energy_revenue,
+        'regulation_revenue': regulation_revenue,
+        'fees': fees,
+        'revenue': energy_revenue + regulation_revenue - fees,
+    }
+    if hourly:
+        settlement['hourly_revenue'] = h * (energy * (net + 0.1 * deployed) + reg_up * values['reg_up_hour']
+                                            + reg_down * values['reg_down_hour']
+                                            - throughput_fee * (values['gen_hour'] + values['charge_hour']))
+    return settlement
+
+
+def check_schedule(schedule, power_capacity: float, energy_capacity: float, efficiency, initial_charge: float = None,
+                   day_ranges: list = None, daily_anchor: bool = False, tolerance: float = 0.1,
+                   interval_hours: float = None, limit_efficiency: float = None) -> dict:
+    """
+    Replays the state of charge of a fixed schedule under efficiency assumptions and counts the hours
+    breaking each constraint of the optimizer.
+
+    Parameters:
+    schedule: schedule DataFrame or dict of hourly arrays of the VARIABLES.
+    power_capacity / energy_capacity: Bess parameters, energy_capacity as Bess.get_energy_capacity.
+    efficiency: efficiency assumed, a scalar or one per assumption.
+    initial_charge: state of charge at the first hour, the first state of charge of the schedule by default.
+    day_ranges: index ranges [start, stop) of each day for the daily cycle limits,
+                taken from the index of a schedule DataFrame when not given.
+    daily_anchor: restart the replay of each day from the state of charge of the schedule. Off by default,
+                  so drift building up across days is flagged, only the first interval is anchored.
+    tolerance: MWh allowed over each limit, covering the rounding of the schedule values. The rounding of
+               a 2 decimal schedule adds up to a few tenths of MWh over a month of replay.
+    interval_hours: length of each interval in hours, taken from the index of a schedule DataFrame when not given.
+    limit_efficiency: efficiency of the Bess setting its daily discharge and charge limits in the optimizer,
+                      which do not change with the efficiency assumed, the first efficiency when not given.
+
+    Returns: A dict with the replayed state_of_charge (assumptions, hours) and the (assumptions,)
+    counts of violations of each constraint and in total.
+    """
+    h = schedule_interval_hours(schedule) if interval_hours is None else interval_hours
+    values = schedule_arrays(schedule)
+    efficiency = np.atleast_1d(np.asarray(efficiency, dtype = float))[:, None]
+    gen, charge, reg_up, reg_down = (values[var] for var in VARIABLES[:4])
+    if day_ranges is None and isinstance(schedule, pd.DataFrame):
+        day_ranges = schedule_day_ranges(schedule)
+
+    # state of charge at the beginning of each hour from the cumulative hourly change since the anchor hour
+    change = h * (charge * efficiency - gen / efficiency + 0.1 * reg_down * efficiency - 0.1 * reg_up / efficiency)
+    cumulative = np.concatenate([np.zeros((len(efficiency), 1)), np.cumsum(change[:, :-1], axis = 1)], axis = 1)
+    anchor = np.zeros(len(gen), dtype = int)
+    if daily_anchor and day_ranges is not None:
+        anchor = np.concatenate([np.full(stop - start, start) for start, stop in day_ranges])
+    start_soc = values['state_of_charge'][anchor]
+    if initial_charge is not None:
+        start_soc[anchor == 0] = initial_charge
+    soc = start_soc + cumulative - cumulative[:, anchor]
+
+    violations = {
+        'soc_below_zero': (soc < -tolerance).sum(axis = 1),
+        'soc_above_capacity': (soc > energy_capacity + tolerance).sum(axis = 1),
+        'power_capacity': ((gen + reg_up > power_capacity + tolerance)
+                           | (np.maximum(charge, reg_down) > power_capacity + tolerance)).sum() + np.zeros(len(efficiency), dtype = int),
+        'discharge_above_charge': (h * (gen + reg_up) > 0.9 * soc + tolerance).sum(axis = 1),
+        'charge_above_room': (h * (charge + reg_down) > (energy_capacity - soc) / efficiency + tolerance).sum(axis = 1),
+    }
+    if day_ranges is not None:
+        limit_efficiency = efficiency[0, 0] if limit_efficiency is None else limit_efficiency
+        starts = np.array([start for start, _ in day_ranges])
+        daily_discharge = (h * np.add.reduceat(gen, starts) > limit_efficiency * energy_capacity + tolerance).sum()
+        daily_charge = (h * np.add.reduceat(charge, starts) > energy_capacity / limit_efficiency + tolerance).sum()
+        violations['daily_discharge'] = daily_discharge + np.zeros(len(efficiency), dtype = int)
+        violations['daily_charge'] = daily_charge + np.zeros(len(efficiency), dtype = int)
+    violations['total'] = sum(violations.values())
+    return {'state_of_charge': soc, **violations}
+
+
+def backtest(schedule, bess: Bess, energy: np.ndarray, reg_up: np.ndarray, reg_down: np.ndarray,
+             throughput_fee: float = 0.0, efficiency=None, initial_charge: float = None,
+             interval_hours: float = None, daily_anchor: bool = False) -> pd.DataFrame:
+    """
+    Evaluates a fixed schedule of a Bess against realized price paths and efficiency assumptions.
+
+    Parameters:
+    schedule: schedule DataFrame or dict of hourly arrays of the VARIABLES.
+    bess: Bess operating the schedule.
+    energy / reg_up / reg_down: realized prices of shape (hours,) or (paths, hours).
+    throughput_fee: fee paid per MWh charged or discharged.
+    efficiency: efficiency assumed when replaying the state of charge, a scalar or one per path,
+                the Bess efficiency by default.
+    initial_charge: state of charge at the first hour, the first state of charge of the schedule by default.
+    interval_hours: length of each interval in hours, taken from the index of a schedule DataFrame when not given.
+    daily_anchor: restart the replay of each day from the state of charge of the schedule, see check_schedule.
+
+    Returns: A DataFrame with one row per price path with revenue, energy and regulation revenue,
+    fees, cycles and the hours breaking a constraint.
+    """
+    h = schedule_interval_hours(schedule) if interval_hours is None else interval_hours
+    settlement = settle(schedule, energy, reg_up, reg_down, throughput_fee, interval_hours = h)
+    efficiency = np.atleast_1d(np.asarray(bess.get_efficiency() if efficiency is None else efficiency, dtype = float))
+    paths = len(settlement['revenue'])
+    if len(efficiency) not in (1, paths):
+        raise ValueError(f'expected 1 efficiency or one per price path ({paths}), got {len(efficiency)}')
+    checks = check_schedule(schedule, bess.get_power_capacity(), bess.get_energy_capacity(), efficiency, initial_charge,
+                            interval_hours = h, daily_anchor = daily_anchor, limit_efficiency = bess.get_efficiency())
+    summary = pd.DataFrame({
+        'revenue': settlement['revenue'],
+        'energy_revenue': settlement['energy_revenue'],
+        'regulation_revenue': settlement['regulation_revenue'],
+        'fees': settlement['fees'],
+    }).round(1)
+    summary['cycles'] = round(h * schedule_arrays(schedule)['charge_hour'].sum() / bess.get_energy_capacity(), 1)
+    summary['violations'] = np.broadcast_to(checks['total'], len(summary))
+    return summary
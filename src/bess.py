@@ -57,9 +57,11 @@ class Bess:
 
     def calc_total_cycles(self) -> float:
         """
-        calculate the total cycles of the optimal schedule
+        calculate the total cycles of the optimal schedule, with the interval length taken from its index
         """
-        total_charge = self.schedule_ds['charge_hour'].sum()
+        steps = self.schedule_ds.index.to_series().diff().dropna()
+        interval_hours = steps.mode()[0] / pd.Timedelta(hours = 1) if len(steps) else 1.0
+        total_charge = self.schedule_ds['charge_hour'].sum() * interval_hours
         self.cycles = round(total_charge / self.energy_capacity,1)
         return self.cycles
     
@@ -1,64 +1,175 @@
+import time
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from pulp import LpProblem, LpMaximize, LpVariable, lpSum, PULP_CBC_CMD
+from pulp import LpProblem, LpMaximize, LpVariable, LpAffineExpression, lpSum
 from src.bess import Bess
-from utils.utils import date_to_timezone
+from src.dp_solver import solve_dp
+from src.exporter import CHUNK_SIZE, Schedule_Exporter
+from src.lp_matrix import VARIABLES, Persistent_Highs_Model, build_lp_matrices, objective_coefficients
+from src.price_store import Price_Store
+from src.profiler import Profiler
+from src.sensitivity import MARGINALS, marginal_values, solve_duals
+from src.solution_cache import Solution_Cache
+from src.solvers import check_options, highs_options, highs_status, race, solve_pulp, solve_with_options
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
+# model builders and solvers selectable on Bess_Optimizer
+BACKENDS = ('pulp', 'highs', 'dp')
+# local wall time of the intervals of the period, used as keys of the PuLP variables
+PERIOD_FORMAT = '%Y_%m_%d_%H_%M'
+
+
+def interval_length(timestamps: np.ndarray) -> int:
+    '''
+    return the most common step between consecutive int64 nanosecond timestamps, one hour for a single one
+    '''
+    if len(timestamps) < 2:
+        return 3600 * 10**9
+    steps, counts = np.unique(np.diff(timestamps), return_counts = True)
+    return int(steps[counts.argmax()])
+
+
 class Bess_Optimizer:
         
-    def __init__(self, case:str = 'test_0'):
+    def __init__(self, case:str = 'test_0', backend: str = 'pulp'):
         """
         Initialize the optimizer with a case name and properties for prices and total profit.
 
         Parameters:
         case: Identifier for the optimization case.
+        backend: 'pulp' builds the model with PuLP and solves it with CBC,
+                 'highs' builds it as sparse matrices and solves it in-process with SciPy HiGHS,
+                 'dp' screens the schedule with a dynamic program over a state of charge grid (see dp_options).
         self.energy_price = None
         self.total_profit = None
         """
 
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend '{backend}', expected one of {BACKENDS}")
+
         self.case = case                        # name for identify the optimization case
+        self.backend = backend                  # model builder and solver used by optimize_period
+        self.dp_options = {}                    # soc_levels and iterations of the 'dp' backend
+        self.solver_options = {}                # solver, threads, time_limit, tolerance and raw options of the LP (src/solvers.py)
+        self.race = []                          # solver options raced in parallel on each solve, the first optimal result wins
+        self.solve_status = None                # status of the last solve, 'optimal' when its schedule can be read
+        self.solve_time = None                  # seconds spent in the last solve
+        self.solved_by = None                   # solver options of the last solve, the winner when racing
+        self.sensitivity_ds = None              # marginal profit of the Bess parameters by interval (optimize_sensitivity)
         self.reg_prices = None                  # hourly regulation price up and down
         self.energy_price = None                # hourly energy prices
         self.total_profit = None                # total profit of the Bess operation
+        self.period = None                      # hours of the optimized period
+        self.day_ranges = None                  # index ranges of each operating day in the period
+        self.interval_hours = 1.0               # length of the intervals of the period in hours
+        self.persistent_model = None            # HiGHS model kept alive between re-solves
+        self.timings = {}                       # seconds spent building, updating and solving the persistent model
+        self.pending_update_time = 0.0          # seconds spent in updates since the last re-solve
+        self.price_store = Price_Store()        # parses the price files once and caches them as columns
+        self.profiler = Profiler(enabled = False)   # per-stage timing and memory, enabled with --profile
+        self.solution_cache = None              # optional Solution_Cache consulted by optimize_period
+        self.cache_hit = False                  # whether the last optimize_period came from the cache
     
     def load_prices(self, energy_price_file: str):
         '''
-        load energy prices from energy_price_file
+        load energy prices from energy_price_file through the price store cache
         ''' 
-        self.energy_price = pd.read_csv(energy_price_file)
-        self.energy_price['Operating Day'] = pd.to_datetime(self.energy_price['Operating Day'])
-        self.energy_price['Date'] = self.energy_price['Operating Day'] + pd.to_timedelta(self.energy_price['Operating Hour'] - 1, unit='h')
-        self.energy_price = date_to_timezone(self.energy_price, 'Date')
-        self.energy_price['Date'] = self.energy_price['Date'].dt.strftime("%Y_%m_%d_%H")
-        
+        with self.profiler.stage('load_prices'):
+            self.energy_price = self.price_store.load(energy_price_file)
 
     def load_regulation(self, regulation_price_file: str):
         '''
-        load regulation prices from regulation_price_file
+        load regulation prices from regulation_price_file through the price store cache
         '''
-        self.reg_prices = pd.read_csv(regulation_price_file)
-        self.reg_prices['Operating Day'] = pd.to_datetime(self.reg_prices['Operating Day'])
-        self.reg_prices['Date'] = self.reg_prices['Operating Day'] + pd.to_timedelta(self.reg_prices['Operating Hour'] - 1, unit='h')
-        self.reg_prices = date_to_timezone(self.reg_prices, 'Date')
-        self.reg_prices['Date'] = self.reg_prices['Date'].dt.strftime("%Y_%m_%d_%H")
+        with self.profiler.stage('load_regulation'):
+            self.reg_prices = self.price_store.load(regulation_price_file)
 
-    def optimize_period(self, operated_bess: Bess, start_day: str, end_day:str, initial_charge: float = 0):
+    def align_prices(self, start_day: str, end_day: str):
         '''
-        determine the optimal schedule for Bess over the period from start_day to end_day
-        includes the option to set an initial charge of the Bess 
+        align the energy and regulation prices for the period from start_day to end_day
+        into numpy arrays indexed by the position of the interval in the period.
+        The interval length is taken from the energy prices (hourly, 15 or 5 minutes) and
+        regulation prices of longer intervals (e.g. hourly) apply to every energy interval they cover.
+        Raises ValueError when energy and regulation intervals do not line up.
+        '''
+        start_day = pd.to_datetime(start_day)
+        end_day = pd.to_datetime(end_day)
+
+        energy_mask = ((self.energy_price['Operating Day'] >= start_day) & (self.energy_price['Operating Day'] <= end_day)).to_numpy()
+        reg_mask = ((self.reg_prices['Operating Day'] >= start_day) & (self.reg_prices['Operating Day'] <= end_day)).to_numpy()
+        hours = self.energy_price['Date'][energy_mask]
+        timestamps = pd.DatetimeIndex(hours).asi8
+        reg_timestamps = pd.DatetimeIndex(self.reg_prices['Date']).asi8[reg_mask]
+
+        if len(timestamps) == 0:
+            raise ValueError(f'no energy prices between {start_day.date()} and {end_day.date()}')
+        interval = interval_length(timestamps)
+        reg_interval = interval_length(reg_timestamps) if len(reg_timestamps) > 1 else interval
+
+        # position of the regulation interval covering each energy interval
+        reg_index = np.zeros(len(timestamps), dtype = int)
+        lined_up = np.zeros(len(timestamps), dtype = bool)
+        if len(reg_timestamps) > 0:
+            reg_index = np.maximum(np.searchsorted(reg_timestamps, timestamps, side = 'right') - 1, 0)
+            offset = timestamps - reg_timestamps[reg_index]
+            lined_up = (offset >= 0) & (offset < reg_interval) & (offset % interval == 0)
+        unused = np.setdiff1d(reg_timestamps, reg_timestamps[reg_index[lined_up]])
+        if reg_interval % interval != 0 or not lined_up.all() or len(unused) > 0:
+            mismatch = np.sort(np.concatenate([timestamps[~lined_up], unused]))[:5]
+            mismatch = [str(hour) for hour in pd.to_datetime(mismatch, utc = True).tz_convert(self.price_store.timezone)]
+            raise ValueError(
+                f'energy and regulation hours do not line up between {start_day.date()} and {end_day.date()} '
+                f'({len(timestamps)} energy intervals, {len(reg_timestamps)} regulation intervals, first mismatches: {mismatch})'
+            )
+
+        # index ranges [start, stop) of every operating day inside the period
+        days = self.energy_price['Operating Day'].to_numpy()[energy_mask]
+        day_starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        day_stops = np.r_[day_starts[1:], len(days)]
+
+        # local wall time keys, the repeated hour when daylight saving time ends gets a suffix
+        keys = hours.dt.strftime(PERIOD_FORMAT).to_numpy(dtype = object)
+        _, first = np.unique(keys, return_index = True)
+        repeated = np.ones(len(keys), dtype = bool)
+        repeated[first] = False
+        keys[repeated] = keys[repeated] + '_2'
+
+        self.period = keys.tolist()
+        self.day_ranges = list(zip(day_starts.tolist(), day_stops.tolist()))
+        self.interval_hours = interval / 3.6e12
+        self.energy_array = self.energy_price['Price'].to_numpy(dtype=float)[energy_mask]
+        self.reg_up_array = self.reg_prices['Regulation Up'].to_numpy(dtype=float)[reg_mask][reg_index]
+        self.reg_down_array = self.reg_prices['Regulation Down'].to_numpy(dtype=float)[reg_mask][reg_index]
+        return self.period, self.day_ranges, self.energy_array, self.reg_up_array, self.reg_down_array
+
+    def build_model(self, operated_bess: Bess, start_day: str, end_day:str, initial_charge: float = 0):
+        '''
+        build the LP model for the Bess over the period from start_day to end_day
+        without solving it
+        '''
+        period, day_ranges, energy, reg_up, reg_down = self.align_prices(start_day, end_day)
+        self.build_model_arrays(operated_bess, period, day_ranges, energy, reg_up, reg_down, initial_charge)
+
+    def build_model_arrays(self, operated_bess: Bess, period: list, day_ranges: list, energy: np.ndarray,
+                           reg_up: np.ndarray, reg_down: np.ndarray, initial_charge: float = 0,
+                           gen_budget: np.ndarray = None, charge_budget: np.ndarray = None):
+        '''
+        build the LP model for the Bess from aligned price arrays without solving it.
+        gen_budget / charge_budget optionally replace the daily cycle limits of each day in day_ranges.
+        Generation, charge and regulation are average powers over intervals of interval_hours,
+        so their energy is scaled by the interval length
         '''
         self.optimizer = LpProblem('Bess-Fluence', LpMaximize)
+        interval = self.interval_hours
         bess_efficiency = operated_bess.get_efficiency()
         bess_power_capacity = operated_bess.get_power_capacity() 
         bess_energy_capacity = operated_bess.get_energy_capacity()                                        
         
-        start_day = pd.to_datetime(start_day)
-        end_day = pd.to_datetime(end_day)
-        period = self.energy_price[(self.energy_price['Operating Day'] >= start_day) & (self.energy_price['Operating Day'] <= end_day)]['Date'].tolist()
-        days_list = list(self.energy_price[(self.energy_price['Operating Day'] >= start_day) & (self.energy_price['Operating Day'] <= end_day)]['Operating Day'].unique())
-        days_list = [day.strftime("%Y_%m_%d") for day in days_list]
+        if gen_budget is None:
+            gen_budget = np.full(len(day_ranges), bess_efficiency * bess_energy_capacity)
+        if charge_budget is None:
+            charge_budget = np.full(len(day_ranges), (1/bess_efficiency) * bess_energy_capacity)
         
         #Decision Variables
         
@@ -104,87 +215,488 @@ class Bess_Optimizer:
                                         upBound = bess_energy_capacity
                                         )
 
-        # objective function
-        self.optimizer += lpSum(
-                                self.energy_price[self.energy_price['Date']==hour]['Price'].iloc[0] * self.gen_hour[hour] -
-                                self.energy_price[self.energy_price['Date']==hour]['Price'].iloc[0] * self.charge_hour[hour] +
-                                self.reg_prices[self.reg_prices['Date']==hour]['Regulation Up'].iloc[0] * self.reg_up[hour] +
-                                self.energy_price[self.energy_price['Date']==hour]['Price'].iloc[0] * self.reg_up[hour] * 0.1 +
-                                self.reg_prices[self.reg_prices['Date']==hour]['Regulation Down'].iloc[0] * self.reg_down[hour] +
-                                self.energy_price[self.energy_price['Date']==hour]['Price'].iloc[0] * self.reg_down[hour] * 0.1 
-                                for hour in period
-                                )
+        gen = [self.gen_hour[hour] for hour in period]
+        charge = [self.charge_hour[hour] for hour in period]
+        up = [self.reg_up[hour] for hour in period]
+        down = [self.reg_down[hour] for hour in period]
+        soc = [self.state_of_charge[hour] for hour in period]
+
+        # objective function, coefficients taken from the aligned price arrays
+        self.optimizer += self.pulp_objective(period, energy, reg_up, reg_down)
         
         # initializing total charge 
-        self.optimizer += self.state_of_charge[period[0]] == initial_charge
+        self.optimizer += soc[0] == initial_charge, 'initial_charge'
 
-        
         for index in range(len(period)):
-                hour = period[index]
 
                 # generation plus regulation up should be less than capacity
-                self.optimizer += (self.gen_hour[hour] + self.reg_up[hour]) <= bess_power_capacity
+                self.optimizer += (gen[index] + up[index]) <= bess_power_capacity
                 
                 # generation plus regulation up should be less than equal to battery charge
-                self.optimizer += self.gen_hour[hour] + self.reg_up[hour] <= 0.9 * self.state_of_charge[hour] 
+                self.optimizer += interval * (gen[index] + up[index]) <= 0.9 * soc[index]
                 
                 # charging rate plus regulation down should be less than equal to remaining capacity of charge
                 self.optimizer +=   (
-                                    self.charge_hour[hour] + self.reg_down[hour] <= 
-                                    (1 / bess_efficiency) * (bess_energy_capacity - self.state_of_charge[hour]) 
+                                    interval * (charge[index] + down[index]) <= 
+                                    (1 / bess_efficiency) * (bess_energy_capacity - soc[index]) 
                                     )
+                
+                # temporary dependency on state of charge for all intervals
+                if index > 0:
+                    self.optimizer += (soc[index] == + soc[index-1]
+                                                     + interval * charge[index-1] * bess_efficiency
+                                                     - interval * gen[index-1] * (1/bess_efficiency)
+                                                     + interval * 0.1 * down[index-1] * bess_efficiency
+                                                     - interval * 0.1 * up[index-1] * (1/bess_efficiency)
+                                        )
         
-        # iterate over the days in the period
+        # iterate over the days in the period using the precomputed index ranges
         # only 1 cycle of charge/discharge per day
-        for day in days_list:
-            hour_day = [hour for hour in period if day in hour]
-            
-            self.optimizer += lpSum(
-                                self.gen_hour[hour] 
-                                for hour in hour_day
-                                ) <= bess_efficiency * bess_energy_capacity 
-        
-            self.optimizer += lpSum(
-                                    self.charge_hour[hour] 
-                                    for hour in hour_day
-                                    ) <= (1/bess_efficiency) * bess_energy_capacity 
-                
+        for day, (day_start, day_stop) in enumerate(day_ranges):
+            self.optimizer += interval * lpSum(gen[day_start:day_stop]) <= float(gen_budget[day])
+            self.optimizer += interval * lpSum(charge[day_start:day_stop]) <= float(charge_budget[day])
 
-        # temporary dependency on state of charge for all hours
-        for index in range(len(period)):
-            if index > 0:
-                past_hour = period[index-1]
-                hour = period[index]
-                self.optimizer += (self.state_of_charge[hour] == + self.state_of_charge[past_hour]                   
-                                                                 + self.charge_hour[past_hour]  * bess_efficiency    
-                                                                 - self.gen_hour[past_hour] * (1/bess_efficiency)    
-                                                                 + 0.1 * self.reg_down[past_hour]* bess_efficiency
-                                                                 - 0.1 * self.reg_up[past_hour] * (1/bess_efficiency) 
-                                    )
+    def pulp_objective(self, period: list, energy: np.ndarray, reg_up: np.ndarray, reg_down: np.ndarray) -> LpAffineExpression:
+        '''
+        build the objective of the PuLP model from the aligned price arrays, over intervals of interval_hours
+        '''
+        reg_up_coef = (self.interval_hours * (reg_up + 0.1 * energy)).tolist()
+        reg_down_coef = (self.interval_hours * (reg_down + 0.1 * energy)).tolist()
+        energy_coef = (self.interval_hours * energy).tolist()
+        objective = LpAffineExpression()
+        for index, hour in enumerate(period):
+            objective.addterm(self.gen_hour[hour], energy_coef[index])
+            objective.addterm(self.charge_hour[hour], -energy_coef[index])
+            objective.addterm(self.reg_up[hour], reg_up_coef[index])
+            objective.addterm(self.reg_down[hour], reg_down_coef[index])
+        return objective
+
+    def optimize_period(self, operated_bess: Bess, start_day: str, end_day:str, initial_charge: float = 0):
+        '''
+        determine the optimal schedule for Bess over the period from start_day to end_day
+        includes the option to set an initial charge of the Bess 
+        '''
+        if self.solution_cache is not None:
+            self.optimize_period_cached(operated_bess, start_day, end_day, initial_charge)
+            return
+        if self.backend != 'pulp' or self.race:
+            self.optimize_period_matrix(operated_bess, start_day, end_day, initial_charge)
+            return
 
-        self.optimizer.solve(PULP_CBC_CMD(msg=False))
+        with self.profiler.stage('align_prices'):
+            period, day_ranges, energy, reg_up, reg_down = self.align_prices(start_day, end_day)
+        with self.profiler.stage('build_model'):
+            self.build_model_arrays(operated_bess, period, day_ranges, energy, reg_up, reg_down, initial_charge)
+        self.profiler.set_model_size(*self.model_size())
+        with self.profiler.stage('solve'):
+            self.solve_pulp_model()
         self.total_profit = round(self.optimizer.objective.value() , 1)
         self.process_optimal_schedule()
-        
+
+    def optimize_period_cached(self, operated_bess: Bess, start_day: str, end_day:str, initial_charge: float = 0):
+        '''
+        determine the optimal schedule through the solution cache: a case solved before with the same
+        Bess, period, initial charge, solver settings and prices is read back without building the model
+        '''
+        with self.profiler.stage('align_prices'):
+            period, day_ranges, energy, reg_up, reg_down = self.align_prices(start_day, end_day)
+        settings = {
+                    'power_capacity': operated_bess.get_power_capacity(),
+                    'energy_capacity': operated_bess.get_energy_capacity(),
+                    'efficiency': operated_bess.get_efficiency(),
+                    'initial_charge': initial_charge,
+                    **self.solver_settings()
+                    }
+        key = Solution_Cache.key(settings, period, energy, reg_up, reg_down)
+        start = time.perf_counter()
+        with self.profiler.stage('solution_cache'):
+            cached = self.solution_cache.get(key)
+        self.cache_hit = cached is not None
+
+        if self.cache_hit:
+            values, objective = cached
+            # only optimal solutions are cached
+            self.solve_status, self.solve_time, self.solved_by = 'optimal', time.perf_counter() - start, {'solver': 'cache'}
+        else:
+            values, objective = self.solve_arrays(operated_bess, period, day_ranges, energy, reg_up, reg_down, initial_charge)
+            self.solution_cache.put(key, values, objective)
+        self.total_profit = round(objective, 1)
+        with self.profiler.stage('process_optimal_schedule'):
+            self.schedule_ds = self.schedule_from_values(period, values)
+
+    def solver_settings(self) -> dict:
+        '''
+        return the backend and solver options that change the solution, as part of the solution cache key
+        '''
+        return {'backend': self.backend, 'dp_options': self.dp_options, 'solver_options': self.solver_options, 'race': self.race}
+
+    def optimize_sensitivity(self, operated_bess: Bess, start_day: str, end_day:str, initial_charge: float = 0) -> dict:
+        '''
+        determine the optimal schedule like optimize_period and, from the duals of the same solve, the marginal
+        profit of one more MW of power capacity, MWh of energy capacity, MWh of daily discharge and charge
+        allowance and MWh of initial charge. The breakdown by interval is kept in sensitivity_ds.
+        The duals come from the matrix model solved with SciPy HiGHS, whatever the backend: solver options
+        naming another solver, threads or raw options, a race and the solution cache (which keeps no duals)
+        are rejected with ValueError, time_limit and tolerance apply
+        '''
+        if self.race or self.solution_cache is not None:
+            raise ValueError('the sensitivity solve cannot race solvers or use the solution cache')
+        options = check_options(self.solver_options, 'highs')
+        if options['solver'] != 'highs' or options.get('threads') is not None or options.get('options'):
+            raise ValueError("the sensitivity duals come from SciPy HiGHS, only time_limit and tolerance apply")
+
+        with self.profiler.stage('align_prices'):
+            period, day_ranges, energy, reg_up, reg_down = self.align_prices(start_day, end_day)
+        with self.profiler.stage('build_model'):
+            self.matrices = build_lp_matrices(
+                                            energy, reg_up, reg_down, day_ranges,
+                                            power_capacity = operated_bess.get_power_capacity(),
+                                            energy_capacity = operated_bess.get_energy_capacity(),
+                                            efficiency = operated_bess.get_efficiency(),
+                                            initial_charge = initial_charge,
+                                            interval_hours = self.interval_hours
+                                            )
+        self.profiler.set_model_size(*self.model_size(self.matrices))
+        start = time.perf_counter()
+        self.solve_status, self.solved_by = 'not_solved', options
+        with self.profiler.stage('solve'):
+            x, objective, duals = solve_duals(self.matrices, highs_options(options))
+        self.solve_status, self.solve_time = 'optimal', time.perf_counter() - start
+
+        n = len(period)
+        self.total_profit = round(objective, 1)
+        with self.profiler.stage('process_optimal_schedule'):
+            self.schedule_ds = self.schedule_from_values(period, {var: x[i * n:(i + 1) * n] for i, var in enumerate(VARIABLES)})
+            marginals = marginal_values(duals, day_ranges, operated_bess.get_efficiency())
+            self.sensitivity_ds = pd.DataFrame({name: np.round(marginals[name], 4) for name in MARGINALS},
+                                               index = self.schedule_ds.index)
+        summary = {name: round(float(marginals[name].sum()), 2) for name in MARGINALS[:-1]}
+        summary['initial_charge'] = round(float(marginals['state_of_charge'][0]), 2)
+        return summary
+
+    def solve_pulp_model(self):
+        '''
+        solve the PuLP model with the configured solver options, raising RuntimeError unless the solve is optimal
+        '''
+        options = check_options(self.solver_options, 'cbc')
+        start = time.perf_counter()
+        self.solve_status = solve_pulp(self.optimizer, options)
+        self.solve_time = time.perf_counter() - start
+        self.solved_by = options
+        self.check_solve_status()
+
+    def solve_matrix_model(self, matrices: dict):
+        '''
+        solve the matrix form of the model with the configured solver options, or race the solver options
+        of self.race, and return the hourly values of each variable with the optimal objective.
+        Raises RuntimeError unless the solve is optimal
+        '''
+        x, objective = self.solve_matrices_x(matrices)
+        n = len(x) // len(VARIABLES)
+        return {var: x[i * n:(i + 1) * n] for i, var in enumerate(VARIABLES)}, objective
+
+    def solve_matrices_x(self, matrices: dict, default_solver: str = 'highs'):
+        '''
+        solve an LP in the matrix form of build_lp_matrices with the configured solver options, or race the
+        solver options of self.race, and return the optimal x with the optimal objective.
+        Raises RuntimeError unless the solve is optimal
+        '''
+        start = time.perf_counter()
+        if self.race:
+            result = race(matrices, [check_options(options, default_solver) for options in self.race])
+            x, objective, self.solve_status = result['x'], result['objective'], result['status']
+            self.solved_by = None if result['index'] is None else check_options(self.race[result['index']], default_solver)
+        else:
+            self.solved_by = check_options(self.solver_options, default_solver)
+            x, objective, self.solve_status = solve_with_options(matrices, self.solved_by)
+        self.solve_time = time.perf_counter() - start
+        self.check_solve_status()
+        return x, objective
+
+    def check_solve_status(self):
+        '''
+        raise RuntimeError when the last solve did not reach the optimum, so no partial solution is read
+        '''
+        if self.solve_status != 'optimal':
+            raise RuntimeError(f'the Bess model of case {self.case} was not solved to optimality: {self.solve_status}')
+
+    def optimize_period_matrix(self, operated_bess: Bess, start_day: str, end_day:str, initial_charge: float = 0):
+        '''
+        determine the optimal schedule building the model directly as sparse matrices
+        and solving it in-process with HiGHS, skipping the PuLP objects and the CBC files
+        '''
+        with self.profiler.stage('align_prices'):
+            period, day_ranges, energy, reg_up, reg_down = self.align_prices(start_day, end_day)
+        values, objective = self.solve_arrays(operated_bess, period, day_ranges, energy, reg_up, reg_down, initial_charge)
+        self.total_profit = round(objective, 1)
+        with self.profiler.stage('process_optimal_schedule'):
+            self.schedule_ds = self.schedule_from_values(period, values)
+
+    def solve_arrays(self, operated_bess: Bess, period: list, day_ranges: list, energy: np.ndarray,
+                     reg_up: np.ndarray, reg_down: np.ndarray, initial_charge: float = 0,
+                     gen_budget: np.ndarray = None, charge_budget: np.ndarray = None):
+        '''
+        solve the model for aligned price arrays with the configured backend
+        and return the hourly values of each variable with the optimal objective
+        '''
+        if self.backend == 'dp':
+            if self.race:
+                raise ValueError("racing needs the 'pulp' or 'highs' backend")
+            start = time.perf_counter()
+            with self.profiler.stage('solve'):
+                values, profit = solve_dp(
+                                        energy, reg_up, reg_down, day_ranges,
+                                        power_capacity = operated_bess.get_power_capacity(),
+                                        energy_capacity = operated_bess.get_energy_capacity(),
+                                        efficiency = operated_bess.get_efficiency(),
+                                        initial_charge = initial_charge,
+                                        gen_budget = gen_budget,
+                                        charge_budget = charge_budget,
+                                        interval_hours = self.interval_hours,
+                                        **self.dp_options
+                                        )
+            self.solve_status, self.solve_time, self.solved_by = 'optimal', time.perf_counter() - start, {'solver': 'dp'}
+            return {var: values[var][0] for var in VARIABLES}, profit[0]
+
+        if self.backend == 'highs' or self.race:
+            with self.profiler.stage('build_model'):
+                self.matrices = build_lp_matrices(
+                                                energy, reg_up, reg_down, day_ranges,
+                                                power_capacity = operated_bess.get_power_capacity(),
+                                                energy_capacity = operated_bess.get_energy_capacity(),
+                                                efficiency = operated_bess.get_efficiency(),
+                                                initial_charge = initial_charge,
+                                                gen_budget = gen_budget,
+                                                charge_budget = charge_budget,
+                                                interval_hours = self.interval_hours
+                                                )
+            self.profiler.set_model_size(*self.model_size())
+            with self.profiler.stage('solve'):
+                return self.solve_matrix_model(self.matrices)
+
+        with self.profiler.stage('build_model'):
+            self.build_model_arrays(operated_bess, period, day_ranges, energy, reg_up, reg_down,
+                                    initial_charge, gen_budget, charge_budget)
+        self.profiler.set_model_size(*self.model_size())
+        with self.profiler.stage('solve'):
+            self.solve_pulp_model()
+        return self.pulp_values(period), self.optimizer.objective.value()
+
+    def model_size(self, matrices: dict = None):
+        '''
+        return the number of variables, constraints and nonzeros of the last model built, or of matrices
+        '''
+        if matrices is not None or self.backend == 'highs' or self.race:
+            matrices = matrices or self.matrices
+            A_ub, A_eq = matrices['A_ub'], matrices['A_eq']
+            return A_ub.shape[1], A_ub.shape[0] + A_eq.shape[0], A_ub.nnz + A_eq.nnz
+        constraints = self.optimizer.constraints.values()
+        return self.optimizer.numVariables(), len(constraints), sum(len(constraint) for constraint in constraints)
+
+    def pulp_values(self, period: list) -> dict:
+        '''
+        return the hourly values of each variable of the solved PuLP model
+        '''
+        variables = [self.gen_hour, self.charge_hour, self.reg_up, self.reg_down, self.state_of_charge]
+        values = np.empty((len(VARIABLES), len(period)))
+        for row, lp_vars in enumerate(variables):
+            values[row] = np.fromiter((lp_vars[hour].varValue for hour in period), dtype = float, count = len(period))
+        return dict(zip(VARIABLES, values))
+
+    def schedule_from_values(self, period: list, values: dict) -> pd.DataFrame:
+        '''
+        build the hourly schedule dataset from the hourly values of each variable
+        '''
+        return pd.DataFrame(
+                            {var: np.round(values[var], 2) for var in VARIABLES},
+                            index = pd.to_datetime([key[:16] for key in period], format = PERIOD_FORMAT)
+                            )
+
+    def optimize_rolling(self, operated_bess: Bess, start_day: str, end_day: str, initial_charge: float = 0,
+                         window_hours: int = 48, commit_hours: int = 24):
+        '''
+        determine the schedule for Bess over the period from start_day to end_day with a rolling horizon:
+        solve window_hours at a time, commit the first commit_hours, carry the ending state of charge
+        as the initial charge of the next window and stitch the committed hours into schedule_ds
+        '''
+        if commit_hours <= 0 or window_hours < commit_hours:
+            raise ValueError('rolling horizon needs 0 < commit_hours <= window_hours')
+
+        bess_efficiency = operated_bess.get_efficiency()
+        bess_energy_capacity = operated_bess.get_energy_capacity()
+        period, day_ranges, energy, reg_up, reg_down = self.align_prices(start_day, end_day)
+        n_hours = len(period)
+        interval = self.interval_hours
+        window_intervals = max(int(round(window_hours / interval)), 1)
+        commit_intervals = max(int(round(commit_hours / interval)), 1)
+
+        day_of_hour = np.empty(n_hours, dtype = int)
+        for day, (day_start, day_stop) in enumerate(day_ranges):
+            day_of_hour[day_start:day_stop] = day
+        gen_used = np.zeros(len(day_ranges))
+        charge_used = np.zeros(len(day_ranges))
+
+        committed = {var: np.zeros(n_hours) for var in VARIABLES}
+        charge_level = initial_charge
+        self.rolling_windows = []
+
+        for start in range(0, n_hours, commit_intervals):
+            stop = min(start + window_intervals, n_hours)
+            commit_stop = min(start + commit_intervals, n_hours)
+            first_day, last_day = day_of_hour[start], day_of_hour[stop - 1]
+
+            # days of the window clipped to it, with the cycle budget left after the committed hours
+            window_days = [
+                        (max(day_start, start) - start, min(day_stop, stop) - start)
+                        for day_start, day_stop in day_ranges[first_day:last_day + 1]
+                        ]
+            gen_budget = np.maximum(bess_efficiency * bess_energy_capacity - gen_used[first_day:last_day + 1], 0)
+            charge_budget = np.maximum((1/bess_efficiency) * bess_energy_capacity - charge_used[first_day:last_day + 1], 0)
+
+            window_start = time.perf_counter()
+            values, objective = self.solve_arrays(
+                                                operated_bess, period[start:stop], window_days,
+                                                energy[start:stop], reg_up[start:stop], reg_down[start:stop],
+                                                charge_level, gen_budget, charge_budget
+                                                )
+            self.rolling_windows.append({
+                                        'start': period[start],
+                                        'initial_charge': charge_level,
+                                        'window_profit': objective,
+                                        'solve_time': time.perf_counter() - window_start
+                                        })
+
+            n_commit = commit_stop - start
+            for var in VARIABLES:
+                committed[var][start:commit_stop] = values[var][:n_commit]
+            np.add.at(gen_used, day_of_hour[start:commit_stop], interval * values['gen_hour'][:n_commit])
+            np.add.at(charge_used, day_of_hour[start:commit_stop], interval * values['charge_hour'][:n_commit])
+
+            # state of charge at the beginning of the next window
+            last = n_commit - 1
+            charge_level = (values['state_of_charge'][last]
+                            + interval * values['charge_hour'][last] * bess_efficiency
+                            - interval * values['gen_hour'][last] * (1/bess_efficiency)
+                            + interval * 0.1 * values['reg_down_hour'][last] * bess_efficiency
+                            - interval * 0.1 * values['reg_up_hour'][last] * (1/bess_efficiency))
+            charge_level = min(max(charge_level, 0), bess_energy_capacity)
+
+        profit = interval * (energy * (committed['gen_hour'] - committed['charge_hour'])
+                             + (reg_up + 0.1 * energy) * committed['reg_up_hour']
+                             + (reg_down + 0.1 * energy) * committed['reg_down_hour']).sum()
+        self.total_profit = round(profit, 1)
+        self.schedule_ds = self.schedule_from_values(period, committed)
+
+    def rolling_profit_gap(self, operated_bess: Bess, start_day: str, end_day: str, windows: list,
+                           initial_charge: float = 0) -> pd.DataFrame:
+        '''
+        compare the profit of rolling horizon runs with (window_hours, commit_hours) in windows
+        against the monolithic solve of the period, for picking a window length
+        '''
+        start = time.perf_counter()
+        self.optimize_period(operated_bess, start_day, end_day, initial_charge)
+        monolithic_profit = self.get_profit()
+        report = [{'window_hours': None, 'commit_hours': None, 'profit': monolithic_profit,
+                   'gap': 0.0, 'gap_pct': 0.0, 'time': time.perf_counter() - start}]
+
+        for window_hours, commit_hours in windows:
+            start = time.perf_counter()
+            self.optimize_rolling(operated_bess, start_day, end_day, initial_charge, window_hours, commit_hours)
+            gap = monolithic_profit - self.get_profit()
+            report.append({'window_hours': window_hours, 'commit_hours': commit_hours, 'profit': self.get_profit(),
+                           'gap': round(gap, 1), 'gap_pct': round(100 * gap / abs(monolithic_profit), 3),
+                           'time': time.perf_counter() - start})
+        return pd.DataFrame(report)
+
+    def build_persistent(self, operated_bess: Bess, start_day: str, end_day: str, initial_charge: float = 0):
+        '''
+        build the constraint structure once for the Bess and period, so prices and initial charge
+        can later be updated in place with update_prices / update_initial_charge and re-solved with resolve
+        '''
+        if self.backend == 'dp':
+            raise ValueError("the persistent model needs the 'pulp' or 'highs' backend")
+
+        start = time.perf_counter()
+        period, day_ranges, energy, reg_up, reg_down = self.align_prices(start_day, end_day)
+        if self.backend == 'highs':
+            self.matrices = build_lp_matrices(
+                                            energy, reg_up, reg_down, day_ranges,
+                                            power_capacity = operated_bess.get_power_capacity(),
+                                            energy_capacity = operated_bess.get_energy_capacity(),
+                                            efficiency = operated_bess.get_efficiency(),
+                                            initial_charge = initial_charge,
+                                            interval_hours = self.interval_hours
+                                            )
+            options = check_options(self.solver_options, 'highs')
+            if options['solver'] != 'highs':
+                raise ValueError("the persistent 'highs' model is solved with the 'highs' solver")
+            self.persistent_model = Persistent_Highs_Model(self.matrices, highs_options(options))
+        else:
+            self.build_model_arrays(operated_bess, period, day_ranges, energy, reg_up, reg_down, initial_charge)
+        self.timings = {'build': time.perf_counter() - start}
+        self.pending_update_time = 0.0
+
+    def update_prices(self, energy: np.ndarray = None, reg_up: np.ndarray = None, reg_down: np.ndarray = None):
+        '''
+        update in place the hourly energy and/or regulation prices of the persistent model,
+        each array holds one price per hour of the period
+        '''
+        start = time.perf_counter()
+        for name, prices in [('energy_array', energy), ('reg_up_array', reg_up), ('reg_down_array', reg_down)]:
+            if prices is not None:
+                if len(prices) != len(self.period):
+                    raise ValueError(f'expected {len(self.period)} hourly prices, got {len(prices)}')
+                setattr(self, name, np.asarray(prices, dtype = float))
+
+        if self.backend == 'highs':
+            self.persistent_model.update_objective(objective_coefficients(self.energy_array, self.reg_up_array, self.reg_down_array,
+                                                                           self.interval_hours))
+        else:
+            self.optimizer.setObjective(self.pulp_objective(self.period, self.energy_array, self.reg_up_array, self.reg_down_array))
+        self.pending_update_time += time.perf_counter() - start
+
+    def update_initial_charge(self, initial_charge: float):
+        '''
+        update in place the initial charge of the persistent model
+        '''
+        start = time.perf_counter()
+        if self.backend == 'highs':
+            self.persistent_model.update_initial_charge(initial_charge)
+        else:
+            self.optimizer.constraints['initial_charge'].constant = -initial_charge
+        self.pending_update_time += time.perf_counter() - start
+
+    def resolve(self):
+        '''
+        solve the persistent model after updates, warm-started from the previous basis with HiGHS.
+        CBC has no warm start for LPs, so the pulp backend re-solves the updated model from scratch
+        '''
+        start = time.perf_counter()
+        if self.backend == 'highs':
+            try:
+                values, objective = self.persistent_model.solve()
+            finally:
+                self.solve_status = highs_status(self.persistent_model.highs)
+                self.solve_time = time.perf_counter() - start
+                self.solved_by = check_options(self.solver_options, 'highs')
+        else:
+            self.solve_pulp_model()
+            values = self.pulp_values(self.period)
+            objective = self.optimizer.objective.value()
+        self.timings['update'] = self.pending_update_time
+        self.timings['solve'] = time.perf_counter() - start
+        self.pending_update_time = 0.0
+        self.total_profit = round(objective, 1)
+        self.schedule_ds = self.schedule_from_values(self.period, values)
 
     def process_optimal_schedule(self) -> pd.DataFrame :
         '''
         process the hourly optimal schedule for the Bess
         into a pandas dataset
         '''
-        vars = ['gen_hour', 'charge_hour', 'reg_up_hour', 'reg_down_hour', 'state_of_charge']
-        schedule_dict = {}
-
-        for var in vars:
-            schedule_dict[var] = {}
-            for v in self.optimizer.variables():
-                if v.name.startswith(var):
-                    day_hour = v.name.replace(var + '_', '')
-                    day_hour = day_hour.replace('_', '-')
-                    day_hour = datetime.strptime(day_hour, '%Y-%m-%d-%H')
-                    schedule_dict[var][day_hour] = round(v.varValue,2)
-        self.schedule_ds = pd.DataFrame.from_dict(schedule_dict)
-    
+        with self.profiler.stage('process_optimal_schedule'):
+            self.schedule_ds = self.schedule_from_values(self.period, self.pulp_values(self.period))
+        return self.schedule_ds
 
     def get_optimal_schedule(self) -> pd.DataFrame:
         """
@@ -192,11 +704,30 @@ class Bess_Optimizer:
         """
         return self.schedule_ds
     
-    def save_hourly_report(self):
+    def save_hourly_report(self, file_format: str = 'csv', chunk_size: int = CHUNK_SIZE) -> str:
+        '''
+        save the hourly report into the output folder, streamed in chunks of chunk_size hours
+        as csv (output/results-<case>.csv) or parquet (output/results-<case>.parquet)
+        '''
+        exporter = Schedule_Exporter(f'output/results-{self.case}.{file_format}', file_format, chunk_size)
+        with self.profiler.stage('save_hourly_report'):
+            exporter.write(self.schedule_ds)
+        return exporter.path
+
+    def get_sensitivity(self) -> pd.DataFrame:
+        '''
+        return the marginal profit of the Bess parameters by interval of the last optimize_sensitivity
+        '''
+        return self.sensitivity_ds
+
+    def save_sensitivity_report(self, file_format: str = 'csv', chunk_size: int = CHUNK_SIZE) -> str:
         '''
-        save a csv hourly report into the output folder
+        save the marginal values by interval next to the hourly report,
+        as output/sensitivity-<case>.csv or output/sensitivity-<case>.parquet
         '''
-        self.schedule_ds.to_csv(f'output/results-{self.case}.csv')
+        exporter = Schedule_Exporter(f'output/sensitivity-{self.case}.{file_format}', file_format, chunk_size)
+        exporter.write(self.sensitivity_ds)
+        return exporter.path
 
     def get_profit(self) -> float:
         """
@@ -0,0 +1,294 @@
+import numpy as np
+import pandas as pd
+from src.lp_matrix import VARIABLES
+
+# regulation (up, down) offered at zero or at the maximum feasible amount, indexed by 2 * up + down
+OFFERS = [(0.0, 0.0), (0.0, 1.0), (1.0, 0.0), (1.0, 1.0)]
+
+
+def _transition(soc, target, offer_up, offer_down, power, capacity, efficiency, interval_hours=1.0):
+    """
+    Returns the gen, charge, reg_up and reg_down powers moving the state of charge from soc to target
+    over one interval, with infeasible moves flagged. Regulation fills the room left when offered, so the
+    change of the state of charge grows with the net charge and each move has a single power solving it.
+    Shapes broadcast over (cases, states, targets).
+    """
+    change = (target - soc) / interval_hours
+    discharge_room = np.minimum(power, 0.9 * soc / interval_hours)              # gen + reg_up limit
+    charge_room = (capacity - soc) / (efficiency * interval_hours)              # charge + reg_down limit
+    charge_limit = np.minimum(power, charge_room)
+    up_loss = 0.1 * offer_up * discharge_room / efficiency                      # deployed when nothing is generated
+    idle = 0.1 * offer_down * efficiency * charge_limit - up_loss               # change of the state of charge at rest
+
+    gen = np.maximum(idle - change, 0) * efficiency / (1 - 0.1 * offer_up)
+    full_down = (change + up_loss - 0.1 * offer_down * efficiency * power) / efficiency
+    partial_down = (change + up_loss - 0.1 * offer_down * efficiency * charge_room) / (efficiency * (1 - 0.1 * offer_down))
+    charge = np.where(change <= idle, 0.0, np.where(full_down <= charge_room - power, full_down, partial_down))
+    feasible = (gen <= discharge_room + 1e-9) & (charge <= charge_limit + 1e-9)
+
+    gen = np.minimum(gen, discharge_room)
+    charge = np.clip(charge, 0, charge_limit)
+    reg_up = offer_up * np.clip(discharge_room - gen, 0, power)
+    reg_down = offer_down * np.clip(charge_room - charge, 0, power)
+    return gen, charge, reg_up, reg_down, feasible
+
+
+def _walk_day(policy, features, values, coefficients, offer, positions, state, gen_left, charge_left):
+    """
+    Follows the policy of one case over the given positions of one day from the grid state index state,
+    enforcing the daily limits exactly: a move needing more discharge or charge than left in the day is
+    replaced by the best move within them.
+
+    Returns: The (state, move) index chosen at each position, the state reached and whether the discharge
+    and the charge limits stopped a move.
+    """
+    soc_levels = policy.shape[1]
+    chosen = []
+    gen_stopped = charge_stopped = False
+    for hour in positions:
+        move = int(policy[hour, state])
+        gen, charge = features[offer[hour], :2, state * soc_levels + move] if move < soc_levels else (0.0, 0.0)
+        if gen > gen_left + 1e-9 or charge > charge_left + 1e-9:
+            gen_stopped |= gen > gen_left + 1e-9
+            charge_stopped |= charge > charge_left + 1e-9
+            window = features[offer[hour], :, state * soc_levels:(state + 1) * soc_levels]
+            total = coefficients[hour] @ window + values[hour + 1]
+            total[(window[0] > gen_left + 1e-9) | (window[1] > charge_left + 1e-9)] = -np.inf
+            move = int(total.argmax())
+            if total[move] <= values[hour + 1, state]:
+                move = soc_levels
+            gen, charge = features[offer[hour], :2, state * soc_levels + move] if move < soc_levels else (0.0, 0.0)
+        gen_left -= gen
+        charge_left -= charge
+        chosen.append(state * (soc_levels + 1) + move)
+        if move < soc_levels:
+            state = move
+    return chosen, state, gen_stopped, charge_stopped
+
+
+def _profit(schedule, energy, up_value, down_value, interval_hours):
+    """
+    Profit of each case of a schedule of shape (cases, hours).
+    """
+    return interval_hours * (energy * (schedule['gen_hour'] - schedule['charge_hour'])
+                             + up_value * schedule['reg_up_hour']
+                             + down_value * schedule['reg_down_hour']).sum(axis=1)
+
+
+def solve_dp(energy: np.ndarray, reg_up: np.ndarray, reg_down: np.ndarray, day_ranges: list,
+             power_capacity, energy_capacity, efficiency, initial_charge=0,
+             gen_budget: np.ndarray = None, charge_budget: np.ndarray = None, interval_hours: float = 1.0,
+             soc_levels: int = 41, iterations: int = 4):
+    """
+    Dynamic program over a discretized state of charge grid for fast screening of the Bess schedule.
+    Cases (price paths and/or Bess parameters) are solved together as batched array operations.
+
+    Every move goes from a grid state to a grid state, or holds the state of charge without regulation,
+    with the powers of each move solved exactly, so the schedule needs no interpolation. Regulation is
+    offered at its maximum feasible amount whenever it pays, including the 0.1 energy deployed.
+    The backward pass solves all days at once, each day ending on the values the previous pass found
+    for the start of the next day. The daily cycle limits are priced with one multiplier per day and case,
+    updated over iterations from the days where they stop a move, and enforced exactly when the schedule
+    is simulated, so the schedule is always feasible for the LP and its profit is a lower bound of the LP optimum.
+
+    Parameters:
+    energy / reg_up / reg_down: prices of each interval of shape (hours,) or (cases, hours).
+    day_ranges: index ranges [start, stop) of each operating day.
+    power_capacity / energy_capacity / efficiency / initial_charge: Bess parameters, scalars or one per case.
+    gen_budget / charge_budget: optional daily discharge and charge limits replacing the one cycle per day.
+    interval_hours: length of each interval in hours.
+    soc_levels: points of the state of charge grid, a finer grid allows finer powers.
+    iterations: passes updating the daily multipliers, the best pass is returned.
+
+    Returns: A tuple with a dict of hourly values for each of the VARIABLES of shape (cases, hours)
+    and the profit of each case.
+    """
+    parameters = [np.atleast_1d(np.asarray(parameter, dtype=float))
+                  for parameter in (power_capacity, energy_capacity, efficiency, initial_charge)]
+    energy, reg_up, reg_down = (np.atleast_2d(np.asarray(prices, dtype=float)) for prices in (energy, reg_up, reg_down))
+    cases = max([energy.shape[0]] + [len(parameter) for parameter in parameters])
+    hours = energy.shape[1]
+    energy, reg_up, reg_down = (np.broadcast_to(prices, (cases, hours)) for prices in (energy, reg_up, reg_down))
+    power, capacity, eff, start_soc = (np.broadcast_to(parameter, (cases,)) for parameter in parameters)
+    power, capacity, eff = (parameter.reshape(cases, 1, 1) for parameter in (power, capacity, eff))
+
+    days = len(day_ranges)
+    day_of_hour = np.concatenate([np.full(stop - start, day) for day, (start, stop) in enumerate(day_ranges)])
+    gen_budget = np.broadcast_to(eff.reshape(cases, 1) * capacity.reshape(cases, 1) if gen_budget is None
+                                 else np.asarray(gen_budget, dtype=float), (cases, days))
+    charge_budget = np.broadcast_to(capacity.reshape(cases, 1) / eff.reshape(cases, 1) if charge_budget is None
+                                    else np.asarray(charge_budget, dtype=float), (cases, days))
+
+    # days laid out as rows of equal length aligned on their last hour, shorter days padded at the start
+    length = max(stop - start for start, stop in day_ranges)
+    padding = np.array([length - (stop - start) for start, stop in day_ranges])
+    position = np.arange(hours) - np.array([start for start, _ in day_ranges])[day_of_hour] + padding[day_of_hour]
+    hour_table = np.zeros((days, length), dtype=int)
+    hour_table[day_of_hour, position] = np.arange(hours)
+    padded = np.arange(length) < padding[:, None]
+
+    grid = capacity.reshape(cases, 1) * np.linspace(0, 1, soc_levels)    # (cases, states)
+    up_value = reg_up + 0.1 * energy
+    down_value = reg_down + 0.1 * energy
+    offer = 2 * (up_value > 0) + (down_value > 0)                        # index into OFFERS by case and hour
+    offer_table = np.where(padded, len(OFFERS) - 1, offer[:, hour_table])
+    rows = np.arange(cases)
+
+    # discharge, charge, reg_up and reg_down energies and feasibility of the move between every two grid
+    # states only depend on the offer, holding the state of charge without regulation is always feasible
+    features = np.zeros((len(OFFERS), cases, 5, soc_levels, soc_levels))
+    for index, (offer_up, offer_down) in enumerate(OFFERS):
+        *powers, feasible = _transition(grid[:, :, None], grid[:, None, :], offer_up, offer_down,
+                                        power, capacity, eff, interval_hours)
+        features[index, :, :4] = np.stack(powers, axis=1) * interval_hours * feasible[:, None]
+        features[index, :, 4] = np.where(feasible, 0.0, -np.inf)
+    features = features.reshape(len(OFFERS), cases, 5, soc_levels ** 2)
+
+    # the reward of each move is coefficients @ features: energy prices net of the daily multipliers,
+    # regulation values and 1 for the infeasibility penalty
+    coefficients = np.ones((cases, hours, 5))
+    coefficients[:, :, 2] = up_value
+    coefficients[:, :, 3] = down_value
+    values = np.zeros((cases, days, length + 1, soc_levels))            # last column starts the next day
+    policy = np.zeros((cases, days, length, soc_levels), dtype=int)     # soc_levels holds
+
+    # price of one MWh of discharge and charge against the daily limits
+    gen_price = np.zeros((cases, days))
+    charge_price = np.zeros((cases, days))
+    price_scale = np.stack([energy[:, start:stop].max(axis=1) - energy[:, start:stop].min(axis=1)
+                            for start, stop in day_ranges], axis=1) + 1e-9     # daily price spread
+    best = None
+
+    for iteration in range(iterations):
+        # backward pass over the hours of all days at once with the current daily multipliers
+        coefficients[:, :, 0] = energy - gen_price[:, day_of_hour]
+        coefficients[:, :, 1] = -(energy + charge_price[:, day_of_hour])
+        table = coefficients[:, hour_table]
+        for hour in range(length - 1, -1, -1):
+            total = np.matmul(table[:, :, hour], features[-1]).reshape(cases, days, soc_levels, soc_levels)
+            other = np.nonzero(offer_table[:, :, hour] != len(OFFERS) - 1)
+            if len(other[0]):
+                total[other] = np.matmul(table[other[0], other[1], hour, None],
+                                         features[offer_table[other + (hour,)], other[0]]).reshape(-1, soc_levels, soc_levels)
+            later = values[:, :, hour + 1]
+            total += later[:, :, None, :]
+            move = total.argmax(axis=3)
+            move_value = np.take_along_axis(total, move[..., None], axis=3)[..., 0]
+            hold = (later >= move_value) | padded[:, hour, None]
+            policy[:, :, hour] = np.where(hold, soc_levels, move)
+            values[:, :, hour] = np.where(hold, later, move_value)
+        values[:, :-1, length] = values[:, np.arange(1, days), padding[1:]]
+
+        # policy followed over each day from every grid state, with the discharge, charge and state reached
+        reached = np.broadcast_to(np.arange(soc_levels), (cases, days, soc_levels))
+        paths = np.zeros((cases, days, length, soc_levels), dtype=int)
+        gen_used = np.zeros((cases, days, soc_levels))
+        charge_used = np.zeros((cases, days, soc_levels))
+        for hour in range(length):
+            move = np.take_along_axis(policy[:, :, hour], reached, axis=2)
+            paths[:, :, hour] = reached * (soc_levels + 1) + move
+            moving = move < soc_levels
+            index = (offer_table[:, :, hour, None], rows[:, None, None], reached * soc_levels + np.where(moving, move, 0))
+            gen_used += np.where(moving, features[:, :, 0][index], 0.0)
+            charge_used += np.where(moving, features[:, :, 1][index], 0.0)
+            reached = np.where(moving, move, reached)
+
+        # first interval from the exact initial charge to any grid state, with and without regulation
+        outcomes = [_transition(start_soc.reshape(cases, 1, 1), grid[:, None, :],
+                             (up_value[:, 0] > 0).reshape(cases, 1, 1) * regulate,
+                             (down_value[:, 0] > 0).reshape(cases, 1, 1) * regulate,
+                             power, capacity, eff, interval_hours) for regulate in (1.0, 0.0)]
+        gen, charge, up, down, feasible = (np.concatenate(arrays, axis=2)[:, 0] for arrays in zip(*outcomes))
+        feasible &= (gen * interval_hours <= gen_budget[:, 0, None] + 1e-9) \
+            & (charge * interval_hours <= charge_budget[:, 0, None] + 1e-9)
+        total = np.where(feasible, interval_hours * np.einsum('ck,ckm->cm', coefficients[:, 0, :4],
+                                                              np.stack([gen, charge, up, down], axis=1))
+                         + np.tile(values[:, 0, padding[0] + 1], 2), -np.inf)
+        first = total.argmax(axis=1)
+        schedule = {var: np.zeros((cases, hours)) for var in VARIABLES}
+        for var, array in zip(VARIABLES, (gen, charge, up, down)):
+            schedule[var][:, 0] = array[rows, first]
+        schedule['state_of_charge'][:, 0] = start_soc
+
+        # forward simulation of each case, following the paths of the days within the daily limits
+        # and walking the others hour by hour to enforce the limits exactly
+        start = np.zeros((cases, days), dtype=int)
+        gen_limited = np.zeros((cases, days), dtype=bool)
+        charge_limited = np.zeros((cases, days), dtype=bool)
+        walked = []
+        for case in rows:
+            state = first[case] % soc_levels
+            for day in range(days):
+                if day and gen_used[case, day, state] <= gen_budget[case, day] + 1e-9 \
+                        and charge_used[case, day, state] <= charge_budget[case, day] + 1e-9:
+                    start[case, day] = state
+                    state = reached[case, day, state]
+                    continue
+                positions = range(padding[day] + (day == 0), length)
+                used = interval_hours * (day == 0)
+                codes, state, gen_limited[case, day], charge_limited[case, day] = _walk_day(
+                    policy[case, day], features[:, case], values[case, day], table[case, day], offer_table[case, day],
+                    positions, state, gen_budget[case, day] - used * schedule['gen_hour'][case, 0],
+                    charge_budget[case, day] - used * schedule['charge_hour'][case, 0])
+                walked.append((case, day, positions, codes))
+        chosen = np.take_along_axis(paths, start[:, :, None, None], axis=3)[..., 0]
+        for case, day, positions, codes in walked:
+            chosen[case, day, positions.start:] = codes
+        chosen = chosen[:, day_of_hour, position]
+
+        state, move = np.divmod(chosen[:, 1:], soc_levels + 1)
+        holding = move == soc_levels
+        target = (offer[:, 1:], rows[:, None], state * soc_levels + np.where(holding, 0, move))
+        for index, var in enumerate(VARIABLES[:4]):
+            schedule[var][:, 1:] = np.where(holding, 0.0, features[:, :, index][target] / interval_hours)
+        schedule['state_of_charge'][:, 1:] = grid[rows[:, None], state]
+        profit = _profit(schedule, energy, up_value, down_value, interval_hours)
+        if best is None:
+            best = (schedule, profit)
+        else:
+            better = profit > best[1]
+            for var in VARIABLES:
+                best[0][var][better] = schedule[var][better]
+            best[1][better] = profit[better]
+
+        # raise the multipliers of the days where the limits stopped a move, relax the others
+        rate = 0.1 / (iteration + 1) * price_scale
+        gen_price = np.maximum(np.where(gen_limited, gen_price + rate, gen_price - rate), 0)
+        charge_price = np.maximum(np.where(charge_limited, charge_price + rate, charge_price - rate), 0)
+
+    # the same moves recur on the grid, so rounding the schedule to 2 decimals hour by hour would shift the
+    # replayed state of charge further every day: the powers are rounded on their running totals instead
+    schedule = best[0]
+    for var in VARIABLES[:4]:
+        schedule[var] = np.diff(np.round(np.cumsum(schedule[var], axis=1), 2), axis=1, prepend=0)
+    return schedule, _profit(schedule, energy, up_value, down_value, interval_hours)
+
+
+def screen(optimizer, assets: list, start_day: str, end_day: str, initial_charge: float = 0, **options):
+    """
+    Screens several Bess over the same period in one batched dynamic program.
+
+    Parameters:
+    optimizer: Bess_Optimizer with the energy and regulation prices loaded.
+    assets: Bess instances to screen.
+    start_day / end_day: period of the screening.
+    initial_charge: initial charge of every Bess.
+    options: soc_levels and iterations of solve_dp.
+
+    Returns: A DataFrame with the power and energy capacity, profit and cycles of each Bess.
+    """
+    period, day_ranges, energy, reg_up, reg_down = optimizer.align_prices(start_day, end_day)
+    capacity = np.array([bess.get_energy_capacity() for bess in assets])
+    values, profit = solve_dp(
+        energy, reg_up, reg_down, day_ranges,
+        power_capacity=[bess.get_power_capacity() for bess in assets],
+        energy_capacity=capacity,
+        efficiency=[bess.get_efficiency() for bess in assets],
+        initial_charge=initial_charge, interval_hours=optimizer.interval_hours, **options,
+    )
+    return pd.DataFrame({
+        'power_capacity': [bess.get_power_capacity() for bess in assets],
+        'energy_capacity': capacity,
+        'profit': profit.round(1),
+        'cycles': (optimizer.interval_hours * values['charge_hour'].sum(axis=1) / capacity).round(1),
+    })
@@ -0,0 +1,73 @@
+import pandas as pd
+
+# hours written per chunk by default
+CHUNK_SIZE = 24 * 31
+
+
+class Schedule_Exporter:
+    """
+    Writes hourly schedules to CSV or Parquet in chunks, so long schedules or schedules
+    produced piece by piece are never formatted in one block.
+    """
+
+    def __init__(self, path: str, file_format: str = 'csv', chunk_size: int = CHUNK_SIZE):
+        """
+        Parameters:
+
+        path: file written by the exporter.
+        file_format: 'csv' or 'parquet' (needs pyarrow).
+        chunk_size: hours written per chunk.
+        """
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"unknown file format '{file_format}', expected 'csv' or 'parquet'")
+        self.path = path
+        self.file_format = file_format
+        self.chunk_size = chunk_size
+
+    def chunks(self, schedules):
+        """
+        Yields chunks of at most chunk_size hours from a schedule DataFrame or an iterable of them.
+        """
+        if isinstance(schedules, pd.DataFrame):
+            schedules = [schedules]
+        for schedule in schedules:
+            for start in range(0, len(schedule), self.chunk_size):
+                yield schedule.iloc[start:start + self.chunk_size]
+
+    def write(self, schedules):
+        """
+        Writes a schedule DataFrame, or an iterable of consecutive schedule DataFrames, to path.
+        """
+        if self.file_format == 'csv':
+            self.write_csv(schedules)
+        else:
+            self.write_parquet(schedules)
+
+    def write_csv(self, schedules):
+        """
+        Streams the chunks into one CSV, the header is written with the first chunk.
+        """
+        with open(self.path, 'w', newline = '') as output:
+            for index, chunk in enumerate(self.chunks(schedules)):
+                chunk.to_csv(output, header = index == 0)
+
+    def write_parquet(self, schedules):
+        """
+        Streams the chunks into one Parquet file, one row group per chunk.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError("parquet export needs pyarrow, install it with 'pip install pyarrow'") from error
+
+        writer = None
+        try:
+            for chunk in self.chunks(schedules):
+                table = pa.Table.from_pandas(chunk.rename_axis('timestamp').reset_index(), preserve_index = False)
+                if writer is None:
+                    writer = pq.ParquetWriter(self.path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
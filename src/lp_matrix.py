@@ -0,0 +1,173 @@
+import numpy as np
+import scipy.sparse as sp
+
+# order of the decision variable blocks in the matrix form of the model
+VARIABLES = ['gen_hour', 'charge_hour', 'reg_up_hour', 'reg_down_hour', 'state_of_charge']
+
+
+def objective_coefficients(energy: np.ndarray, reg_up: np.ndarray, reg_down: np.ndarray,
+                           interval_hours: float = 1.0) -> np.ndarray:
+    """
+    Returns the objective coefficients of the VARIABLES blocks: energy sold minus bought,
+    regulation and the 0.1 energy deployed by regulation, over intervals of interval_hours.
+    """
+    return interval_hours * np.concatenate([energy, -energy, reg_up + 0.1 * energy, reg_down + 0.1 * energy,
+                                            np.zeros(len(energy))])
+
+
+def build_lp_matrices(energy: np.ndarray, reg_up: np.ndarray, reg_down: np.ndarray, day_ranges: list,
+                      power_capacity: float, energy_capacity: float, efficiency: float,
+                      initial_charge: float = 0, gen_budget: np.ndarray = None,
+                      charge_budget: np.ndarray = None, interval_hours: float = 1.0) -> dict:
+    """
+    Builds the Bess LP in matrix form as maximize c @ x subject to A_ub @ x <= b_ub, A_eq @ x == b_eq
+    and bounds, with x the concatenation of the VARIABLES blocks of one entry per interval.
+    Generation, charge and regulation are average powers over each interval, the state of charge
+    and the daily limits are energies, so interval lengths other than one hour scale the energy terms.
+
+    Parameters:
+    energy: energy prices of each interval.
+    reg_up / reg_down: regulation up and down prices of each interval.
+    day_ranges: index ranges [start, stop) of each operating day.
+    power_capacity / energy_capacity / efficiency: Bess parameters.
+    initial_charge: state of charge at the first interval.
+    gen_budget / charge_budget: optional daily discharge and charge limits replacing the one cycle per day.
+    interval_hours: length of each interval in hours.
+
+    Returns: A dict with the keys c, A_ub, b_ub, A_eq, b_eq and bounds.
+    """
+    n = len(energy)
+    n_days = len(day_ranges)
+    eye = sp.identity(n, format='csr')
+    zero = sp.csr_matrix((n, n))
+
+    c = objective_coefficients(energy, reg_up, reg_down, interval_hours)
+    h = interval_hours
+
+    # one row per day selecting the hours of that day
+    rows = np.concatenate([np.full(stop - start, day) for day, (start, stop) in enumerate(day_ranges)])
+    cols = np.concatenate([np.arange(start, stop) for start, stop in day_ranges])
+    day_sum = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_days, n))
+    day_zero = sp.csr_matrix((n_days, n))
+
+    A_ub = sp.bmat([
+        [eye, zero, eye, zero, zero],                                   # gen + reg_up <= power capacity
+        [h * eye, zero, h * eye, zero, -0.9 * eye],                     # gen + reg_up <= 0.9 * state of charge
+        [zero, h * eye, zero, h * eye, (1 / efficiency) * eye],         # charge + reg_down <= remaining capacity
+        [h * day_sum, day_zero, day_zero, day_zero, day_zero],          # one discharge cycle per day
+        [day_zero, h * day_sum, day_zero, day_zero, day_zero],          # one charge cycle per day
+    ], format='csr')
+    b_ub = np.concatenate([
+        np.full(n, power_capacity),
+        np.zeros(n),
+        np.full(n, energy_capacity / efficiency),
+        np.full(n_days, efficiency * energy_capacity) if gen_budget is None else gen_budget,
+        np.full(n_days, energy_capacity / efficiency) if charge_budget is None else charge_budget,
+    ])
+
+    # state of charge of interval t from interval t-1, first row fixes the initial charge
+    lag = sp.eye(n, k=-1, format='csr')
+    A_eq = sp.bmat([[
+        (h / efficiency) * lag,
+        -h * efficiency * lag,
+        (0.1 * h / efficiency) * lag,
+        -0.1 * h * efficiency * lag,
+        eye - lag,
+    ]], format='csr')
+    b_eq = np.zeros(n)
+    b_eq[0] = initial_charge
+
+    upper = np.concatenate([np.full(4 * n, power_capacity), np.full(n, energy_capacity)])
+    bounds = np.column_stack([np.zeros(5 * n), upper])
+
+    return {'c': c, 'A_ub': A_ub, 'b_ub': b_ub, 'A_eq': A_eq, 'b_eq': b_eq, 'bounds': bounds}
+
+
+def solve_matrices(matrices: dict, options: dict = None, return_result: bool = False):
+    """
+    Solves any LP in the matrix form of build_lp_matrices in-process with the SciPy HiGHS solver.
+
+    Parameters:
+    matrices: matrix form of the model as returned by build_lp_matrices.
+    options: linprog HiGHS options, e.g. time_limit or primal_feasibility_tolerance.
+    return_result: also return the linprog result, e.g. for its marginals.
+
+    Returns: A tuple with the optimal x and the optimal objective, and the linprog result with return_result.
+    """
+    from scipy.optimize import linprog
+
+    result = linprog(
+        -matrices['c'],
+        A_ub=matrices['A_ub'], b_ub=matrices['b_ub'],
+        A_eq=matrices['A_eq'], b_eq=matrices['b_eq'],
+        bounds=matrices['bounds'], method='highs', options=options,
+    )
+    if result.status != 0:
+        raise RuntimeError(f'HiGHS could not solve the Bess model: {result.message}')
+    if return_result:
+        return result.x, -result.fun, result
+    return result.x, -result.fun
+
+
+class Persistent_Highs_Model:
+    """
+    Bess LP kept alive inside a HiGHS instance so prices and initial charge can be
+    updated in place and re-solved warm-started from the previous basis.
+    """
+
+    def __init__(self, matrices: dict, options: dict = None):
+        """
+        Passes the matrix form of the model to HiGHS once.
+
+        Parameters:
+        matrices: matrix form of the model as returned by build_lp_matrices.
+        options: HiGHS option values, e.g. threads or time_limit.
+        """
+        import highspy
+
+        self.n_hours = len(matrices['c']) // len(VARIABLES)
+        self.initial_charge_row = matrices['A_ub'].shape[0]     # first equality row fixes the initial charge
+        self.highs = highspy.Highs()
+        self.optimal = highspy.HighsModelStatus.kOptimal
+        self.highs.setOptionValue('output_flag', False)
+        for name, value in (options or {}).items():
+            self.highs.setOptionValue(name, value)
+
+        n_cols = len(matrices['c'])
+        no_entries = np.array([], dtype=np.int32)
+        self.highs.addCols(n_cols, -matrices['c'], matrices['bounds'][:, 0], matrices['bounds'][:, 1],
+                           0, no_entries, no_entries, np.array([]))
+
+        A = sp.vstack([matrices['A_ub'], matrices['A_eq']], format='csr')
+        lower = np.concatenate([np.full(len(matrices['b_ub']), -np.inf), matrices['b_eq']])
+        upper = np.concatenate([matrices['b_ub'], matrices['b_eq']])
+        self.highs.addRows(A.shape[0], lower, upper, A.nnz, A.indptr[:-1].astype(np.int32),
+                           A.indices.astype(np.int32), A.data)
+
+    def update_objective(self, c: np.ndarray):
+        """
+        Replaces the objective coefficients of the generation, charge and regulation variables.
+        """
+        n_cols = 4 * self.n_hours
+        self.highs.changeColsCost(n_cols, np.arange(n_cols, dtype=np.int32), -c[:n_cols])
+
+    def update_initial_charge(self, initial_charge: float):
+        """
+        Moves the state of charge fixed at the first hour.
+        """
+        self.highs.changeRowBounds(self.initial_charge_row, initial_charge, initial_charge)
+
+    def solve(self):
+        """
+        Solves the model, HiGHS reuses the basis of the previous solve when there is one.
+
+        Returns: A tuple with a dict of hourly values for each of the VARIABLES and the optimal objective.
+        """
+        self.highs.run()
+        status = self.highs.getModelStatus()
+        if status != self.optimal:
+            raise RuntimeError(f'HiGHS could not solve the Bess model: {self.highs.modelStatusToString(status)}')
+
+        x = np.array(self.highs.getSolution().col_value)
+        values = {var: x[i * self.n_hours:(i + 1) * self.n_hours] for i, var in enumerate(VARIABLES)}
+        return values, -self.highs.getInfo().objective_function_value
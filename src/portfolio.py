@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+from src.bess_optimizer import Bess_Optimizer
+from src.lp_matrix import VARIABLES, build_lp_matrices
+from src.solvers import check_options, solve_with_options
+
+
+def _split(x: np.ndarray) -> dict:
+    """
+    Returns the hourly values of each variable of the x of one asset.
+    """
+    n = len(x) // len(VARIABLES)
+    return {var: x[i * n:(i + 1) * n] for i, var in enumerate(VARIABLES)}
+
+
+def _solve_asset(asset: dict, options: dict):
+    """
+    Builds and solves the matrix model of one independent asset with the solver options.
+    """
+    x, objective, status = solve_with_options(build_lp_matrices(**asset), options)
+    if status != 'optimal':
+        raise RuntimeError(f'the portfolio asset was not solved to optimality: {status}')
+    return _split(x), objective
+
+
+class Bess_Portfolio:
+    """
+    Portfolio of several Bess optimized together, optionally behind a shared interconnect (POI) limit.
+    """
+
+    def __init__(self, optimizer: Bess_Optimizer, assets: list, names: list = None, asset_prices: list = None,
+                 poi_limit: float = None, workers: int = 1):
+        """
+        Parameters:
+
+        optimizer: Bess_Optimizer with the energy and regulation prices loaded, its backend ('pulp' solves
+                   with CBC and 'highs' with HiGHS by default), solver_options and race are used for every solve.
+        assets: Bess instances of the portfolio.
+        names: names of the assets, asset_<n> by default.
+        asset_prices: optional per asset dict with 'energy', 'reg_up' and/or 'reg_down' hourly arrays
+                      for the period, None entries use the optimizer prices.
+        poi_limit: shared interconnect limit on the total injection and withdrawal of the portfolio.
+        workers: processes used to solve the assets when there is no coupling constraint.
+        """
+        self.optimizer = optimizer
+        self.assets = assets
+        self.names = names or [f'asset_{index}' for index in range(len(assets))]
+        self.asset_prices = asset_prices or [None] * len(assets)
+        self.poi_limit = poi_limit
+        self.workers = workers
+        self.schedules = None                   # hourly schedule of each asset
+        self.profits = None                     # profit of each asset
+        self.total_profit = None                # total profit of the portfolio
+
+        if not (len(self.names) == len(self.asset_prices) == len(assets)):
+            raise ValueError('names and asset_prices need one entry per asset')
+        if optimizer.backend == 'dp':
+            raise ValueError("the portfolio needs the 'pulp' or 'highs' backend")
+
+    @property
+    def default_solver(self) -> str:
+        """
+        Returns the solver of the optimizer backend when the solver options leave it out.
+        """
+        return 'cbc' if self.optimizer.backend == 'pulp' else 'highs'
+
+    def asset_models(self, start_day: str, end_day: str, initial_charges: list = None) -> list:
+        """
+        Returns the build_lp_matrices arguments of each asset for the period.
+        """
+        period, day_ranges, energy, reg_up, reg_down = self.optimizer.align_prices(start_day, end_day)
+        initial_charges = initial_charges or [0] * len(self.assets)
+        models = []
+        for bess, prices, initial_charge in zip(self.assets, self.asset_prices, initial_charges):
+            prices = prices or {}
+            models.append({
+                'energy': np.asarray(prices.get('energy', energy), dtype = float),
+                'reg_up': np.asarray(prices.get('reg_up', reg_up), dtype = float),
+                'reg_down': np.asarray(prices.get('reg_down', reg_down), dtype = float),
+                'day_ranges': day_ranges,
+                'power_capacity': bess.get_power_capacity(),
+                'energy_capacity': bess.get_energy_capacity(),
+                'efficiency': bess.get_efficiency(),
+                'initial_charge': initial_charge,
+                'interval_hours': self.optimizer.interval_hours,
+            })
+            if len(models[-1]['energy']) != len(period) or len(models[-1]['reg_up']) != len(period) \
+                    or len(models[-1]['reg_down']) != len(period):
+                raise ValueError(f'asset prices need {len(period)} hourly values for the period')
+        return models
+
+    def optimize_period(self, start_day: str, end_day: str, initial_charges: list = None):
+        """
+        determine the optimal schedule of every asset over the period from start_day to end_day,
+        as one coupled model when there is a POI limit or as independent blocks otherwise
+        """
+        models = self.asset_models(start_day, end_day, initial_charges)
+
+        if self.poi_limit is None:
+            if self.workers > 1:
+                if self.optimizer.race:
+                    raise ValueError('racing solvers already runs in parallel, use workers = 1')
+                options = check_options(self.optimizer.solver_options, self.default_solver)
+                with ProcessPoolExecutor(max_workers = self.workers) as pool:
+                    results = list(pool.map(_solve_asset, models, [options] * len(models)))
+            else:
+                results = []
+                for model in models:
+                    x, objective = self.optimizer.solve_matrices_x(build_lp_matrices(**model), self.default_solver)
+                    results.append((_split(x), objective))
+        else:
+            results = self.solve_coupled(models)
+
+        self.schedules = {}
+        self.profits = {}
+        for name, bess, (values, objective) in zip(self.names, self.assets, results):
+            self.schedules[name] = self.optimizer.schedule_from_values(self.optimizer.period, values)
+            self.profits[name] = round(float(objective), 1)
+            bess.set_schedule(self.schedules[name])
+            bess.set_profit(self.profits[name])
+        self.total_profit = round(float(sum(objective for _, objective in results)), 1)
+
+    def solve_coupled(self, models: list) -> list:
+        """
+        solve all assets in one block diagonal model with the shared POI rows
+        """
+        blocks = [build_lp_matrices(**model) for model in models]
+        n_hours = len(models[0]['energy'])
+        n_cols = 5 * n_hours
+
+        # total gen + reg_up and total charge + reg_down of the portfolio within the POI limit
+        eye = sp.identity(n_hours, format = 'csr')
+        zero = sp.csr_matrix((n_hours, n_hours))
+        injection = sp.hstack([eye, zero, eye, zero, zero])
+        withdrawal = sp.hstack([zero, eye, zero, eye, zero])
+        poi = sp.vstack([sp.hstack([injection] * len(blocks)), sp.hstack([withdrawal] * len(blocks))])
+
+        matrices = {
+            'c': np.concatenate([block['c'] for block in blocks]),
+            'A_ub': sp.vstack([sp.block_diag([block['A_ub'] for block in blocks]), poi], format = 'csr'),
+            'b_ub': np.concatenate([block['b_ub'] for block in blocks] + [np.full(2 * n_hours, self.poi_limit)]),
+            'A_eq': sp.block_diag([block['A_eq'] for block in blocks], format = 'csr'),
+            'b_eq': np.concatenate([block['b_eq'] for block in blocks]),
+            'bounds': np.vstack([block['bounds'] for block in blocks]),
+        }
+        x, _ = self.optimizer.solve_matrices_x(matrices, self.default_solver)
+
+        # split the stacked solution back into the assets
+        x = x.reshape(len(blocks), n_cols)
+        return [(_split(x[asset]), blocks[asset]['c'] @ x[asset]) for asset in range(len(blocks))]
+
+    def get_schedules(self) -> dict:
+        """
+        return the hourly schedule of each asset
+        """
+        return self.schedules
+
+    def get_aggregate_schedule(self) -> pd.DataFrame:
+        """
+        return the hourly schedule summed over the assets
+        """
+        return sum(self.schedules.values())
+
+    def get_profit(self) -> float:
+        """
+        return the total profit of the portfolio
+        """
+        return self.total_profit
@@ -0,0 +1,124 @@
+import os
+import json
+import shutil
+import tempfile
+import hashlib
+import numpy as np
+import pandas as pd
+
+# format of the 'Operating Day' column of the price files
+DAY_FORMAT = '%m/%d/%y'
+# version of the parsed columns, part of the cache key
+STORE_VERSION = 2
+
+
+class Price_Store:
+    """
+    Columnar store of hourly or sub-hourly price files. Each file is parsed once with explicit formats into
+    tz-aware int64 timestamps and float64 price columns, cached as .npy columns keyed on the
+    source file mtime and size, and later loaded memory-mapped.
+    """
+
+    def __init__(self, cache_dir: str = None, timezone: str = 'US/Central', use_cache: bool = True):
+        """
+        Parameters:
+
+        cache_dir: folder for the cached columns, by default a .price_cache folder next to each price file.
+        timezone: timezone of the operating days and hours in the price files.
+        use_cache: when False files are always parsed and nothing is written.
+        """
+        self.cache_dir = cache_dir
+        self.timezone = timezone
+        self.use_cache = use_cache
+
+    def cache_path(self, price_file: str) -> str:
+        """
+        Returns the cache folder of price_file for its current mtime and size.
+        """
+        stat = os.stat(price_file)
+        source = f'{os.path.abspath(price_file)}|{stat.st_mtime_ns}|{stat.st_size}|{self.timezone}|{STORE_VERSION}'
+        key = hashlib.sha1(source.encode()).hexdigest()[:16]
+        cache_dir = self.cache_dir or os.path.join(os.path.dirname(os.path.abspath(price_file)), '.price_cache')
+        stem = os.path.splitext(os.path.basename(price_file))[0]
+        return os.path.join(cache_dir, f'{stem}-{key}')
+
+    def parse(self, price_file: str) -> dict:
+        """
+        Parses a price file into columns: 'timestamp' (UTC int64 ns of the start of the interval),
+        'operating_day' (int64 ns), 'operating_hour' (int64) and one float64 array per price column.
+        Sub-hourly files have an 'Interval' column numbering the intervals of each operating hour
+        from 1, kept as an int64 'interval' column.
+        """
+        prices = pd.read_csv(price_file)
+        operating_day = pd.to_datetime(prices['Operating Day'], format = DAY_FORMAT)
+        operating_hour = prices['Operating Hour'].to_numpy(dtype = np.int64)
+        start = operating_day + pd.to_timedelta(operating_hour - 1, unit = 'h')
+        if 'Interval' in prices.columns:
+            interval = prices['Interval'].to_numpy(dtype = np.int64)
+            start = start + pd.to_timedelta((interval - 1) * 60 // interval.max(), unit = 'min')
+        local_start = pd.DatetimeIndex(start)
+        timestamp = local_start.tz_localize(self.timezone, ambiguous = 'infer')
+
+        columns = {
+            'timestamp': timestamp.asi8,
+            'operating_day': operating_day.to_numpy().view(np.int64),
+            'operating_hour': operating_hour,
+        }
+        if 'Interval' in prices.columns:
+            columns['interval'] = interval
+        for column in prices.columns.drop(['Operating Day', 'Operating Hour', 'Interval'], errors = 'ignore'):
+            columns[column] = prices[column].to_numpy(dtype = np.float64)
+        return columns
+
+    def load_columns(self, price_file: str) -> dict:
+        """
+        Returns the columns of price_file, memory-mapped from the cache when it is up to date,
+        otherwise parsed and written to the cache.
+        """
+        if not self.use_cache:
+            return self.parse(price_file)
+
+        path = self.cache_path(price_file)
+        meta_file = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_file):
+            with open(meta_file) as meta:
+                names = json.load(meta)['columns']
+            return {name: np.load(os.path.join(path, f'{index}.npy'), mmap_mode = 'c') for index, name in enumerate(names)}
+
+        columns = self.parse(price_file)
+        staging = None
+        try:
+            # the columns are written next to the cache folder and moved into place at once,
+            # so readers never see a partially written cache
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            staging = tempfile.mkdtemp(prefix = f'.{os.path.basename(path)}-', dir = os.path.dirname(path))
+            for index, values in enumerate(columns.values()):
+                np.save(os.path.join(staging, f'{index}.npy'), values)
+            with open(os.path.join(staging, 'meta.json'), 'w') as meta:
+                json.dump({'source': os.path.abspath(price_file), 'columns': list(columns)}, meta)
+            os.replace(staging, path)
+            staging = None
+        except OSError:
+            pass                                # read only folder, or another process cached the file first
+        finally:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors = True)
+        return columns
+
+    def load(self, price_file: str) -> pd.DataFrame:
+        """
+        Returns the prices of price_file as a DataFrame with a tz-aware 'Date' column,
+        'Operating Day', 'Operating Hour', 'Interval' for sub-hourly files and the price columns.
+        """
+        columns = self.load_columns(price_file)
+        prices = {
+            'Date': pd.to_datetime(np.asarray(columns['timestamp']), utc = True).tz_convert(self.timezone),
+            'Operating Day': np.asarray(columns['operating_day']).view('datetime64[ns]'),
+            'Operating Hour': columns['operating_hour'],
+        }
+        if 'interval' in columns:
+            prices['Interval'] = columns['interval']
+        for name, values in columns.items():
+            if name not in ('timestamp', 'operating_day', 'operating_hour', 'interval'):
+                prices[name] = values
+        return pd.DataFrame(prices, copy = False)
@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Profiler:
+    """
+    Per-stage wall time, CPU time and peak memory of the optimization pipeline,
+    with the model size, exported as a JSON report. A disabled profiler adds no overhead.
+    """
+
+    def __init__(self, enabled: bool = True, track_memory: bool = True):
+        """
+        Parameters:
+
+        enabled: when False stages are not measured.
+        track_memory: trace Python allocations (numpy included) for the per-stage peak memory.
+        """
+        self.enabled = enabled
+        self.track_memory = track_memory and enabled
+        self.stages = {}                        # measurements by stage name
+        self.model = {}                         # size of the last model built
+        self.open_peaks = []                    # peak memory of each stage open, innermost last
+        self.started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def close(self):
+        """
+        Stops tracing allocations when this profiler started it.
+        """
+        if self.started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measures the block as stage name, repeated stages are accumulated.
+        CPU time includes child processes, such as the CBC solver. The peak memory of a stage
+        includes the stages nested in it.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        if self.track_memory:
+            # fold the peak so far into the open stages before measuring this one from scratch
+            peak = tracemalloc.get_traced_memory()[1]
+            self.open_peaks = [max(open_peak, peak) for open_peak in self.open_peaks]
+            tracemalloc.reset_peak()
+            self.open_peaks.append(0)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        start_children = os.times()
+        try:
+            yield
+        finally:
+            end_children = os.times()
+            children_cpu = (end_children.children_user - start_children.children_user
+                            + end_children.children_system - start_children.children_system)
+            stage = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_mb': 0.0})
+            stage['calls'] += 1
+            stage['wall_s'] += time.perf_counter() - start_wall
+            stage['cpu_s'] += time.process_time() - start_cpu + children_cpu
+            if self.track_memory:
+                peak = max(self.open_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self.open_peaks:
+                    self.open_peaks[-1] = max(self.open_peaks[-1], peak)
+                stage['peak_mb'] = max(stage['peak_mb'], peak / 2**20)
+
+    def set_model_size(self, variables: int, constraints: int, nonzeros: int):
+        """
+        Records the size of the model built.
+        """
+        if self.enabled:
+            self.model = {'variables': variables, 'constraints': constraints, 'nonzeros': nonzeros}
+
+    def report(self) -> dict:
+        """
+        Returns the machine-readable report with the stages, the model size and the environment.
+        """
+        try:
+            import resource
+        except ImportError:
+            resource = None                     # Unix only, no maximum resident set size on Windows
+
+        max_rss = None
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            max_rss = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+        return {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'max_rss_mb': max_rss,
+            'model': self.model,
+            'stages': {
+                name: {key: round(value, 4) if isinstance(value, float) else value for key, value in stage.items()}
+                for name, stage in self.stages.items()
+            },
+        }
+
+    def save(self, path: str):
+        """
+        Writes the report as JSON into path.
+        """
+        with open(path, 'w') as output:
+            json.dump(self.report(), output, indent = 2)
+
+    def print_report(self):
+        """
+        print in the screen the time and memory of each stage and the model size
+        """
+        print('PROFILE:')
+        print(f"{'stage':<28}{'calls':>6}{'wall [s]':>10}{'cpu [s]':>10}{'peak [MB]':>11}")
+        for name, stage in self.stages.items():
+            print(f"{name:<28}{stage['calls']:>6}{stage['wall_s']:>10.3f}{stage['cpu_s']:>10.3f}{stage['peak_mb']:>11.1f}")
+        if self.model:
+            print(f"model: {self.model['variables']} variables, {self.model['constraints']} constraints, "
+                  f"{self.model['nonzeros']} nonzeros")
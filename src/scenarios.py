@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+from src.bess import Bess
+from src.bess_optimizer import Bess_Optimizer
+from src.dp_solver import solve_dp
+from src.lp_matrix import VARIABLES, Persistent_Highs_Model, build_lp_matrices, objective_coefficients, solve_matrices
+
+# hourly price series of a scenario set, each of shape (scenarios, hours)
+PRICES = ['energy', 'reg_up', 'reg_down']
+
+
+def generate_price_paths(energy: np.ndarray, reg_up: np.ndarray, reg_down: np.ndarray, scenarios: int = 200,
+                         volatility: float = 0.2, correlation: float = 0.9, seed: int = None) -> dict:
+    """
+    Generates price scenarios around hourly price series with multiplicative log-normal noise that is
+    autocorrelated from hour to hour (AR(1)), one noise path for energy and one for regulation.
+
+    Parameters:
+    energy / reg_up / reg_down: hourly prices the scenarios vary around.
+    scenarios: number of price paths.
+    volatility: standard deviation of the log noise of each hour.
+    correlation: correlation of the noise between consecutive hours.
+    seed: seed of the random generator.
+
+    Returns: A dict of (scenarios, hours) arrays for each of the PRICES.
+    """
+    rng = np.random.default_rng(seed)
+    hours = len(energy)
+    innovation = np.sqrt(1 - correlation ** 2)
+    noise = rng.standard_normal((2, scenarios, hours))
+    for hour in range(1, hours):
+        noise[:, :, hour] = correlation * noise[:, :, hour - 1] + innovation * noise[:, :, hour]
+    factor = np.exp(volatility * noise - volatility ** 2 / 2)    # mean one multipliers
+    return {
+        'energy': np.asarray(energy, dtype = float) * factor[0],
+        'reg_up': np.asarray(reg_up, dtype = float) * factor[1],
+        'reg_down': np.asarray(reg_down, dtype = float) * factor[1],
+    }
+
+
+def scenario_profits(values: dict, paths: dict, interval_hours: float = 1.0) -> np.ndarray:
+    """
+    Returns the profit of each scenario for hourly values of the VARIABLES of shape (hours,) or (scenarios, hours).
+    """
+    energy, reg_up, reg_down = (paths[price] for price in PRICES)
+    return interval_hours * (energy * (values['gen_hour'] - values['charge_hour'])
+            + (reg_up + 0.1 * energy) * values['reg_up_hour']
+            + (reg_down + 0.1 * energy) * values['reg_down_hour']).sum(axis = 1)
+
+
+def _solve_scenarios(model: dict, paths: dict):
+    """
+    Solves the scenarios one after the other on one persistent HiGHS model, only the objective changes.
+
+    Returns: A tuple with a dict of (scenarios, hours) values for each of the VARIABLES and the profits.
+    """
+    scenarios, hours = paths['energy'].shape
+    matrices = build_lp_matrices(paths['energy'][0], paths['reg_up'][0], paths['reg_down'][0], **model)
+    highs_model = Persistent_Highs_Model(matrices)
+    values = {var: np.empty((scenarios, hours)) for var in VARIABLES}
+    profits = np.empty(scenarios)
+    for scenario in range(scenarios):
+        highs_model.update_objective(objective_coefficients(*(paths[price][scenario] for price in PRICES),
+                                                            model['interval_hours']))
+        solution, profits[scenario] = highs_model.solve()
+        for var in VARIABLES:
+            values[var][scenario] = solution[var]
+    return values, profits
+
+
+def build_two_stage_matrices(paths: dict, day_ranges: list, power_capacity: float, energy_capacity: float,
+                             efficiency: float, initial_charge: float = 0, weights: np.ndarray = None,
+                             interval_hours: float = 1.0) -> dict:
+    """
+    Builds the two-stage stochastic Bess LP in the matrix form of build_lp_matrices. The day-ahead
+    generation and charge are shared by all scenarios, regulation and state of charge follow each scenario.
+    x is [gen, charge] followed by [reg_up, reg_down, state_of_charge] of each scenario.
+
+    Parameters:
+    paths: dict of (scenarios, hours) arrays for each of the PRICES.
+    day_ranges: index ranges [start, stop) of each operating day.
+    power_capacity / energy_capacity / efficiency: Bess parameters.
+    initial_charge: state of charge at the first hour.
+    weights: probability of each scenario, equal by default.
+    interval_hours: length of each interval in hours.
+
+    Returns: A dict with the keys c, A_ub, b_ub, A_eq, b_eq and bounds.
+    """
+    energy, reg_up, reg_down = (paths[price] for price in PRICES)
+    scenarios, n = energy.shape
+    h = interval_hours
+    weights = np.full(scenarios, 1 / scenarios) if weights is None else np.asarray(weights, dtype = float)
+    eye = sp.identity(n, format = 'csr')
+    zero = sp.csr_matrix((n, n))
+    lag = sp.eye(n, k = -1, format = 'csr')
+    each = sp.csr_matrix(np.ones((scenarios, 1)))
+    per_scenario = sp.identity(scenarios, format = 'csr')
+
+    c = h * np.concatenate([
+        weights @ energy,
+        -(weights @ energy),
+        (weights[:, None, None] * np.stack([reg_up + 0.1 * energy, reg_down + 0.1 * energy, np.zeros_like(energy)], axis = 1)).ravel(),
+    ])
+
+    # rows of the hourly constraints of build_lp_matrices, repeated for every scenario
+    first_stage = sp.bmat([[eye, zero], [h * eye, zero], [zero, h * eye]])
+    second_stage = sp.bmat([[eye, zero, zero], [h * eye, zero, -0.9 * eye], [zero, h * eye, (1 / efficiency) * eye]])
+    rows = np.concatenate([np.full(stop - start, day) for day, (start, stop) in enumerate(day_ranges)])
+    cols = np.concatenate([np.arange(start, stop) for start, stop in day_ranges])
+    day_sum = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape = (len(day_ranges), n))
+    day_zero = sp.csr_matrix((len(day_ranges), n))
+
+    A_ub = sp.bmat([
+        [sp.kron(each, first_stage), sp.kron(per_scenario, second_stage)],
+        [sp.bmat([[h * day_sum, day_zero], [day_zero, h * day_sum]]), None],    # one cycle per day
+    ], format = 'csr')
+    b_ub = np.concatenate([
+        np.tile(np.concatenate([np.full(n, power_capacity), np.zeros(n), np.full(n, energy_capacity / efficiency)]), scenarios),
+        np.full(len(day_ranges), efficiency * energy_capacity),
+        np.full(len(day_ranges), energy_capacity / efficiency),
+    ])
+
+    # state of charge dynamics of each scenario
+    A_eq = sp.hstack([
+        sp.kron(each, sp.hstack([(h / efficiency) * lag, -h * efficiency * lag])),
+        sp.kron(per_scenario, sp.hstack([(0.1 * h / efficiency) * lag, -0.1 * h * efficiency * lag, eye - lag])),
+    ], format = 'csr')
+    b_eq = np.zeros(scenarios * n)
+    b_eq[::n] = initial_charge
+
+    upper = np.concatenate([np.full(2 * n, power_capacity),
+                            np.tile(np.concatenate([np.full(2 * n, power_capacity), np.full(n, energy_capacity)]), scenarios)])
+    bounds = np.column_stack([np.zeros(len(upper)), upper])
+    return {'c': c, 'A_ub': A_ub, 'b_ub': b_ub, 'A_eq': A_eq, 'b_eq': b_eq, 'bounds': bounds}
+
+
+class Scenario_Batch:
+    """
+    One Bess optimized against a batch of price scenarios, kept as (scenarios, hours) arrays.
+    """
+
+    def __init__(self, optimizer: Bess_Optimizer, bess: Bess, workers: int = 1):
+        """
+        Parameters:
+
+        optimizer: Bess_Optimizer with the energy and regulation prices loaded, its 'dp' backend solves
+                   the scenarios in one batched dynamic program, otherwise they are solved with HiGHS.
+        bess: Bess optimized in every scenario.
+        workers: processes sharing the independent scenarios.
+        """
+        self.optimizer = optimizer
+        self.bess = bess
+        self.workers = workers
+        self.period = None                      # keys of the hours of the period
+        self.paths = None                       # price scenarios of the period
+        self.values = None                      # (scenarios, hours) values of each of the VARIABLES
+        self.profits = None                     # profit of each scenario
+
+    def generate(self, start_day: str, end_day: str, scenarios: int = 200, **options) -> dict:
+        """
+        generate price scenarios around the loaded prices of the period, options of generate_price_paths
+        """
+        _, _, energy, reg_up, reg_down = self.optimizer.align_prices(start_day, end_day)
+        return generate_price_paths(energy, reg_up, reg_down, scenarios, **options)
+
+    def optimize_period(self, start_day: str, end_day: str, paths: dict, initial_charge: float = 0,
+                        two_stage: bool = False, weights: np.ndarray = None):
+        """
+        determine the optimal schedule of the Bess in every price scenario over the period from
+        start_day to end_day. Missing series in paths use the loaded prices. With two_stage the
+        generation and charge are one day-ahead schedule shared by all the scenarios and only
+        regulation adapts to each scenario, maximizing the expected profit.
+        """
+        self.period, day_ranges, *prices = self.optimizer.align_prices(start_day, end_day)
+        scenarios = max([1] + [np.atleast_2d(paths[price]).shape[0] for price in PRICES if price in paths])
+        self.paths = {}
+        for price, loaded in zip(PRICES, prices):
+            path = np.atleast_2d(np.asarray(paths.get(price, loaded), dtype = float))
+            if path.shape[1] != len(self.period):
+                raise ValueError(f'{price} scenarios need {len(self.period)} hourly values for the period')
+            self.paths[price] = np.broadcast_to(path, (scenarios, len(self.period)))
+
+        model = {
+            'day_ranges': day_ranges,
+            'power_capacity': self.bess.get_power_capacity(),
+            'energy_capacity': self.bess.get_energy_capacity(),
+            'efficiency': self.bess.get_efficiency(),
+            'initial_charge': initial_charge,
+            'interval_hours': self.optimizer.interval_hours,
+        }
+        if two_stage:
+            matrices = build_two_stage_matrices(self.paths, weights = weights, **model)
+            x, _ = solve_matrices(matrices)
+            n = len(self.period)
+            second_stage = x[2 * n:].reshape(scenarios, 3, n)
+            self.values = {
+                'gen_hour': np.broadcast_to(x[:n], (scenarios, n)),
+                'charge_hour': np.broadcast_to(x[n:2 * n], (scenarios, n)),
+                'reg_up_hour': second_stage[:, 0],
+                'reg_down_hour': second_stage[:, 1],
+                'state_of_charge': second_stage[:, 2],
+            }
+            self.profits = scenario_profits(self.values, self.paths, model['interval_hours'])
+        elif self.optimizer.backend == 'dp':
+            self.values, self.profits = solve_dp(*(self.paths[price] for price in PRICES),
+                                                 **model, **self.optimizer.dp_options)
+        else:
+            chunks = [{price: path[chunk] for price, path in self.paths.items()}
+                      for chunk in np.array_split(np.arange(scenarios), min(self.workers, scenarios))]
+            if self.workers > 1:
+                with ProcessPoolExecutor(max_workers = self.workers) as pool:
+                    results = list(pool.map(_solve_scenarios, [model] * len(chunks), chunks))
+            else:
+                results = [_solve_scenarios(model, chunk) for chunk in chunks]
+            self.values = {var: np.concatenate([values[var] for values, _ in results]) for var in VARIABLES}
+            self.profits = np.concatenate([profits for _, profits in results])
+
+    def profit_percentiles(self, percentiles: tuple = (5, 25, 50, 75, 95)) -> pd.Series:
+        """
+        return the percentiles of the scenario profits with their mean
+        """
+        summary = pd.Series(np.percentile(self.profits, percentiles), index = [f'p{p}' for p in percentiles])
+        summary['mean'] = self.profits.mean()
+        return summary.round(1)
+
+    def get_schedule(self, scenario: int) -> pd.DataFrame:
+        """
+        return the hourly schedule of one scenario
+        """
+        return self.optimizer.schedule_from_values(self.period, {var: self.values[var][scenario] for var in VARIABLES})
+
+    def get_profits(self) -> np.ndarray:
+        """
+        return the profit of each scenario
+        """
+        return self.profits
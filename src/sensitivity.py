@@ -0,0 +1,68 @@
+import numpy as np
+from src.lp_matrix import VARIABLES, solve_matrices
+
+# marginal values reported by the sensitivity of a solve, profit per unit of each parameter
+MARGINALS = ['power_capacity', 'energy_capacity', 'daily_discharge', 'daily_charge', 'state_of_charge']
+
+
+def solve_duals(matrices: dict, options: dict = None):
+    """
+    Solves an LP in the matrix form of build_lp_matrices with the SciPy HiGHS solver and keeps its duals.
+
+    Parameters:
+    matrices: matrix form of the model as returned by build_lp_matrices.
+    options: linprog HiGHS options, e.g. time_limit.
+
+    Returns: A tuple with the optimal x, the optimal objective and a dict of duals as profit per unit of
+    right hand side: 'ub' for the A_ub rows, 'eq' for the A_eq rows and 'upper' for the upper bounds.
+    """
+    x, objective, result = solve_matrices(matrices, options, return_result = True)
+    # linprog minimizes -profit, so its marginals change sign
+    duals = {'ub': -result.ineqlin.marginals, 'eq': -result.eqlin.marginals, 'upper': -result.upper.marginals}
+    return x, objective, duals
+
+
+def marginal_values(duals: dict, day_ranges: list, efficiency: float) -> dict:
+    """
+    Aggregates the duals of a solve of build_lp_matrices with the default daily limits into
+    the marginal profit of the Bess parameters, broken down by interval.
+
+    Parameters:
+    duals: duals as returned by solve_duals.
+    day_ranges: index ranges [start, stop) of each operating day.
+    efficiency: Bess efficiency.
+
+    Returns: A dict with one array per interval for each of the MARGINALS:
+    power_capacity: profit of one more MW in each interval, from the power rows and variable bounds.
+    energy_capacity: profit of one more MWh of nominal energy capacity (the Bess energy_capacity parameter)
+                     in each interval, the daily limits it scales are counted on the first interval of the day.
+    daily_discharge / daily_charge: profit of one more MWh of daily discharge / charge allowance,
+                                    on the first interval of each day.
+    state_of_charge: profit of one more MWh stored at the beginning of each interval, the first one
+                     is the marginal value of initial_charge.
+    Summing an array gives the marginal profit over the period. The LP is degenerate in many intervals,
+    so these are one valid set of duals: exact for small changes in the direction HiGHS reports.
+    """
+    n = len(duals['eq'])
+    n_days = len(day_ranges)
+    ub, upper = duals['ub'], duals['upper']
+    power_row, room_row = ub[:n], ub[2 * n:3 * n]
+    daily_gen, daily_charge = ub[3 * n:3 * n + n_days], ub[3 * n + n_days:]
+    day_starts = np.array([start for start, _ in day_ranges])
+
+    # daily limits on the first interval of each day
+    daily_discharge = np.zeros(n)
+    daily_discharge[day_starts] = daily_gen
+    daily_charge_limit = np.zeros(n)
+    daily_charge_limit[day_starts] = daily_charge
+
+    # optimizer capacity E = nominal / efficiency: room rows E / eff, daily limits eff * E and E / eff, soc bound E
+    capacity = (room_row / efficiency + upper[4 * n:] + efficiency * daily_discharge
+                + daily_charge_limit / efficiency)
+    return {
+        'power_capacity': power_row + upper[:4 * n].reshape(len(VARIABLES) - 1, n).sum(axis = 0),
+        'energy_capacity': capacity / efficiency,
+        'daily_discharge': daily_discharge,
+        'daily_charge': daily_charge_limit,
+        'state_of_charge': duals['eq'],
+    }
@@ -0,0 +1,216 @@
+import os
+import json
+import threading
+import urllib.request
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.bess_optimizer import Bess_Optimizer
+from src.sweep import init_worker, run_case
+
+# fields of an optimization request with their defaults, None marks the required ones
+REQUEST_FIELDS = {
+    'power_capacity': 100,
+    'energy_capacity': 200,
+    'efficiency': 0.9,
+    'start_date': None,
+    'end_date': None,
+    'initial_charge': 0,
+}
+
+
+def schedule_to_json(schedule: pd.DataFrame) -> dict:
+    """
+    Returns the hourly schedule as lists by column with ISO timestamps.
+    """
+    return {'timestamp': schedule.index.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+            **{column: schedule[column].tolist() for column in schedule.columns}}
+
+
+def check_arrow():
+    """
+    Raises ValueError when pyarrow, needed by arrow responses, is not installed.
+    """
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise ValueError("arrow responses need pyarrow, install it with 'pip install pyarrow'") from error
+
+
+def schedule_to_arrow(schedule: pd.DataFrame) -> bytes:
+    """
+    Returns the hourly schedule as an Arrow IPC stream.
+    """
+    check_arrow()
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(schedule.rename_axis('timestamp').reset_index(), preserve_index = False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class Optimization_Service:
+    """
+    Local HTTP service keeping the prices, the solver processes and the models last built in each of them
+    warm between optimization requests.
+    """
+
+    def __init__(self, energy_price_file: str = 'data/energy_prices.csv',
+                 regulation_price_file: str = 'data/regulation_prices.csv', workers: int = None,
+                 queue_size: int = 8, backend: str = 'highs', warm_models: int = 4, host: str = '127.0.0.1',
+                 port: int = 8765):
+        """
+        Parameters:
+
+        energy_price_file / regulation_price_file: price files loaded once for all requests.
+        workers: solver processes, all cores by default.
+        queue_size: requests waiting for a free solver before new ones are rejected with 503.
+        backend: model backend of the solver processes.
+        warm_models: models kept built in each solver process, a request for the Bess and period of one of them
+                     only updates its initial charge and re-solves it warm. 0 builds every request from the prices.
+        host / port: address the service listens on, localhost only by default.
+        """
+        loader = Bess_Optimizer(case = 'service', backend = backend)
+        loader.load_prices(energy_price_file)
+        loader.load_regulation(regulation_price_file)
+
+        self.workers = workers or os.cpu_count()
+        self.pool = ProcessPoolExecutor(max_workers = self.workers, initializer = init_worker,
+                                        initargs = (loader.energy_price, loader.reg_prices, backend, warm_models))
+        self.slots = threading.BoundedSemaphore(self.workers + queue_size)     # requests solving or queued
+        self.requests = 0                       # requests accepted since the start
+        self.rejected = 0                       # requests rejected by backpressure
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.service = self
+        self.thread = None
+
+    @property
+    def address(self) -> str:
+        """
+        Returns the base URL of the service.
+        """
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def optimize(self, request: dict) -> dict:
+        """
+        Solves one optimization request on the solver pool, waiting for a free slot is not allowed.
+
+        Returns: A dict with the case, profit, cycles and hourly schedule DataFrame, or None when all slots are busy.
+        """
+        missing = [field for field, default in REQUEST_FIELDS.items() if default is None and field not in request]
+        if missing:
+            raise ValueError(f'missing request fields: {", ".join(missing)}')
+        if request.get('format') == 'arrow':
+            check_arrow()
+        case = {field: request.get(field, default) for field, default in REQUEST_FIELDS.items()}
+
+        if not self.slots.acquire(blocking = False):
+            with self.lock:
+                self.rejected += 1
+            return None
+        try:
+            with self.lock:
+                self.requests += 1
+                case['case'] = request.get('case', f'request_{self.requests}')
+            return self.pool.submit(run_case, case).result()
+        finally:
+            self.slots.release()
+
+    def start(self):
+        """
+        Serves requests from a background thread.
+        """
+        self.thread = threading.Thread(target = self.server.serve_forever, daemon = True)
+        self.thread.start()
+
+    def serve_forever(self):
+        """
+        Serves requests until interrupted.
+        """
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """
+        Stops the HTTP server and the solver processes.
+        """
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+        self.server.server_close()
+        self.pool.shutdown(cancel_futures = True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    POST /optimize solves a request, GET /health reports the load of the service.
+    """
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path != '/health':
+            self.send_json(404, {'error': f'unknown path {self.path}'})
+            return
+        self.send_json(200, {'status': 'ok', 'workers': service.workers, 'requests': service.requests,
+                             'rejected': service.rejected})
+
+    def do_POST(self):
+        if self.path != '/optimize':
+            self.send_json(404, {'error': f'unknown path {self.path}'})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            result = self.server.service.optimize(request)
+            if result is None:
+                self.send_json(503, {'error': 'all solvers busy, retry later'}, {'Retry-After': '1'})
+            elif request.get('format') == 'arrow':
+                self.send_body(200, schedule_to_arrow(result['schedule']), 'application/vnd.apache.arrow.stream',
+                               {'X-Profit': str(result['profit']), 'X-Cycles': str(result['cycles'])})
+            else:
+                self.send_json(200, {'case': result['case'], 'profit': result['profit'], 'cycles': result['cycles'],
+                                     'schedule': schedule_to_json(result['schedule'])})
+        except (ValueError, TypeError) as error:
+            self.send_json(400, {'error': str(error)})
+        except Exception as error:
+            self.send_json(500, {'error': str(error)})
+
+    def send_json(self, status: int, body: dict, headers: dict = None):
+        self.send_body(status, json.dumps(body).encode(), 'application/json', headers)
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def request_optimization(request: dict, address: str = 'http://127.0.0.1:8765', timeout: float = 600) -> dict:
+    """
+    Sends an optimization request to a running service.
+
+    Parameters:
+    request: start_date and end_date, optionally power_capacity, energy_capacity, efficiency, initial_charge and case.
+    address: base URL of the service.
+    timeout: seconds to wait for the response.
+
+    Returns: A dict with case, profit, cycles and the schedule as lists by column.
+    """
+    http_request = urllib.request.Request(f'{address}/optimize', data = json.dumps(request).encode(),
+                                          headers = {'Content-Type': 'application/json'}, method = 'POST')
+    with urllib.request.urlopen(http_request, timeout = timeout) as response:
+        return json.loads(response.read())
@@ -0,0 +1,171 @@
+import io
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import numpy as np
+from src.lp_matrix import VARIABLES
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, profit REAL, data BLOB, size INTEGER, last_access REAL)',
+    'CREATE INDEX IF NOT EXISTS solutions_last_access ON solutions (last_access)',
+    'CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)',
+]
+
+
+def _as_floats(value):
+    """
+    Returns the settings with every number as a float, so 0 and 0.0 hash the same.
+    """
+    if isinstance(value, dict):
+        return {name: _as_floats(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_as_floats(item) for item in value]
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+        return float(value)
+    return value
+
+
+class Solution_Cache:
+    """
+    Persistent cache of solved schedules keyed by a hash of everything that determines the solution:
+    Bess parameters, period, initial charge, solver settings and the prices of the period.
+    Entries live in one SQLite file, so several processes can share the cache safely, and the least
+    recently used entries are evicted beyond max_entries or max_bytes.
+    """
+
+    def __init__(self, path: str = 'output/.solution_cache/solutions.sqlite', max_entries: int = 1000,
+                 max_bytes: int = 256 * 2**20):
+        """
+        Parameters:
+
+        path: SQLite file of the cache, created with its folder when missing.
+        max_entries: maximum number of cached solutions.
+        max_bytes: maximum total size of the cached schedules.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.connection = None
+        self.pid = None                         # process owning the connection, connections do not survive fork
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Returns the connection of this process to the cache file.
+        """
+        if self.connection is None or self.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok = True)
+            self.connection = sqlite3.connect(self.path, timeout = 30, isolation_level = None)
+            # switching to WAL does not wait on the busy timeout when another process creates the file
+            for _ in range(50):
+                try:
+                    self.connection.execute('PRAGMA journal_mode=WAL')
+                    break
+                except sqlite3.OperationalError:
+                    time.sleep(0.05)
+            self.connection.execute('BEGIN IMMEDIATE')
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+            self.connection.execute('COMMIT')
+            self.pid = os.getpid()
+        return self.connection
+
+    def __getstate__(self):
+        return {**self.__dict__, 'connection': None, 'pid': None}
+
+    @staticmethod
+    def key(settings: dict, period: list, energy: np.ndarray, reg_up: np.ndarray, reg_down: np.ndarray) -> str:
+        """
+        Returns the content hash of a case.
+
+        Parameters:
+        settings: Bess parameters, initial charge and solver settings, JSON serializable. Numbers are
+                  hashed as floats, so int and float forms of a setting share the entry.
+        period: keys of the hours of the period.
+        energy / reg_up / reg_down: hourly prices of the period.
+        """
+        digest = hashlib.sha256(json.dumps(_as_floats(settings), sort_keys = True).encode())
+        digest.update('\n'.join(period).encode())
+        for prices in (energy, reg_up, reg_down):
+            digest.update(np.ascontiguousarray(prices, dtype = np.float64).tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """
+        Returns a tuple with the dict of hourly values of the VARIABLES and the profit, or None on a miss.
+        """
+        connection = self.connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute('SELECT profit, data FROM solutions WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                connection.execute('UPDATE solutions SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.count(connection, 'hits' if row is not None else 'misses')
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        values = np.load(io.BytesIO(row[1]))
+        return dict(zip(VARIABLES, values)), row[0]
+
+    def put(self, key: str, values: dict, profit: float):
+        """
+        Stores the hourly values of the VARIABLES and the profit of a solved case, evicting the
+        least recently used entries over the size bounds.
+        """
+        buffer = io.BytesIO()
+        np.save(buffer, np.stack([np.asarray(values[var], dtype = np.float64) for var in VARIABLES]))
+        data = buffer.getvalue()
+
+        connection = self.connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)',
+                               (key, float(profit), data, len(data), time.time()))
+            entries, size = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solutions').fetchone()
+            evicted = 0
+            for old_key, old_size in connection.execute('SELECT key, size FROM solutions ORDER BY last_access').fetchall():
+                if entries <= self.max_entries and size <= self.max_bytes:
+                    break
+                connection.execute('DELETE FROM solutions WHERE key = ?', (old_key,))
+                entries -= 1
+                size -= old_size
+                evicted += 1
+            self.count(connection, 'evictions', evicted)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def count(connection: sqlite3.Connection, name: str, increment: int = 1):
+        """
+        Adds increment to a statistic of the cache.
+        """
+        connection.execute('INSERT INTO stats VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?',
+                           (name, increment, increment))
+
+    def stats(self) -> dict:
+        """
+        Returns the hits, misses, hit rate and evictions of every process using the cache,
+        with the number of entries and their size.
+        """
+        connection = self.connect()
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        stats.update(dict(connection.execute('SELECT name, value FROM stats').fetchall()))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['entries'], stats['bytes'] = connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solutions').fetchone()
+        return stats
+
+    def clear(self):
+        """
+        Removes every entry and resets the statistics.
+        """
+        connection = self.connect()
+        connection.execute('DELETE FROM solutions')
+        connection.execute('DELETE FROM stats')
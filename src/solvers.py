@@ -0,0 +1,262 @@
+import os
+import time
+import queue
+import signal
+import multiprocessing
+import numpy as np
+import pulp
+from pulp import LpProblem, LpMaximize, LpVariable, LpAffineExpression, LpConstraint, LpConstraintLE, LpConstraintEQ
+from src.lp_matrix import Persistent_Highs_Model
+
+# LP solvers selectable in the solver options, 'highs' runs in-process, 'cbc' and 'glpk' through PuLP
+SOLVERS = ('cbc', 'highs', 'glpk')
+# keys of the solver options: solver name, threads, time limit in seconds, primal and dual feasibility
+# tolerance, and raw options passed to the solver as they are
+OPTIONS = ('solver', 'threads', 'time_limit', 'tolerance', 'options')
+# status of scipy linprog results by result.status
+LINPROG_STATUS = {0: 'optimal', 1: 'time_limit', 2: 'infeasible', 3: 'unbounded', 4: 'numerical_error'}
+
+
+def available_solvers() -> list:
+    """
+    Returns the SOLVERS installed on this machine.
+    """
+    installed = {
+        'cbc': pulp.PULP_CBC_CMD(msg = False).available(),
+        'highs': True,                          # SciPy HiGHS is always there
+        'glpk': pulp.GLPK_CMD(msg = False).available(),
+    }
+    return [solver for solver in SOLVERS if installed[solver]]
+
+
+def check_options(options: dict, default_solver: str = 'cbc') -> dict:
+    """
+    Returns the solver options with the solver filled in, raising ValueError for unknown keys
+    or a solver that is unknown or not installed.
+    """
+    unknown = set(options) - set(OPTIONS)
+    if unknown:
+        raise ValueError(f'unknown solver options {sorted(unknown)}, expected some of {OPTIONS}')
+    options = {'solver': default_solver, **options}
+    if options['solver'] not in SOLVERS:
+        raise ValueError(f"unknown solver '{options['solver']}', expected one of {SOLVERS}")
+    if options['solver'] not in available_solvers():
+        raise ValueError(f"solver '{options['solver']}' is not installed, available: {available_solvers()}")
+    return options
+
+
+def pulp_solver(options: dict):
+    """
+    Returns the PuLP solver command for the solver options.
+    """
+    raw = options.get('options') or {}
+    tolerance = options.get('tolerance')
+    if options['solver'] == 'cbc':
+        flags = [f'{name} {value}' for name, value in raw.items()]
+        if tolerance is not None:
+            flags += [f'primalTolerance {tolerance}', f'dualTolerance {tolerance}']
+        return pulp.PULP_CBC_CMD(msg = False, threads = options.get('threads'), timeLimit = options.get('time_limit'),
+                                 options = flags)
+    if options['solver'] == 'glpk':
+        flags = [f'--{name} {value}' if value is not None else f'--{name}' for name, value in raw.items()]
+        return pulp.GLPK_CMD(msg = False, timeLimit = options.get('time_limit'), options = flags)
+    if tolerance is not None:
+        raw = {'primal_feasibility_tolerance': tolerance, 'dual_feasibility_tolerance': tolerance, **raw}
+    return pulp.HiGHS(msg = False, threads = options.get('threads'), timeLimit = options.get('time_limit'), **raw)
+
+
+def pulp_status(problem: LpProblem, options: dict) -> str:
+    """
+    Returns the status of a solved PuLP problem. Only a solution proven optimal is 'optimal', and only a solve
+    stopped without that proof while a time limit is set is 'time_limit': PuLP reports CBC stopped at its time
+    limit as Not Solved or Undefined, and as Optimal when it has an unproven solution.
+    """
+    if problem.status == pulp.LpStatusOptimal and problem.sol_status == pulp.LpSolutionOptimal:
+        return 'optimal'
+    if problem.status == pulp.LpStatusInfeasible:
+        return 'infeasible'
+    if problem.status == pulp.LpStatusUnbounded:
+        return 'unbounded'
+    stopped = problem.status in (pulp.LpStatusNotSolved, pulp.LpStatusUndefined, pulp.LpStatusOptimal)
+    if options.get('time_limit') is not None and stopped \
+            and problem.sol_status in (pulp.LpSolutionIntegerFeasible, pulp.LpSolutionNoSolutionFound):
+        return 'time_limit'
+    return 'not_solved'
+
+
+def solve_pulp(problem: LpProblem, options: dict) -> str:
+    """
+    Solves a PuLP problem with the solver options.
+
+    Returns: The status of the solve, 'optimal' when the variable values can be read.
+    """
+    problem.solve(pulp_solver(options))
+    return pulp_status(problem, options)
+
+
+def highs_status(highs) -> str:
+    """
+    Returns the model status of a highspy instance as a status name.
+    """
+    import highspy
+
+    status = highs.getModelStatus()
+    names = {
+        highspy.HighsModelStatus.kOptimal: 'optimal',
+        highspy.HighsModelStatus.kTimeLimit: 'time_limit',
+        highspy.HighsModelStatus.kInfeasible: 'infeasible',
+        highspy.HighsModelStatus.kUnbounded: 'unbounded',
+        highspy.HighsModelStatus.kUnboundedOrInfeasible: 'unbounded',
+    }
+    return names.get(status, highs.modelStatusToString(status).lower().replace(' ', '_'))
+
+
+def highs_options(options: dict) -> dict:
+    """
+    Returns the HiGHS option values of the solver options.
+    """
+    values = {}
+    if options.get('threads') is not None:
+        values['threads'] = int(options['threads'])
+    if options.get('time_limit') is not None:
+        values['time_limit'] = float(options['time_limit'])
+    if options.get('tolerance') is not None:
+        values['primal_feasibility_tolerance'] = values['dual_feasibility_tolerance'] = float(options['tolerance'])
+    return {**values, **(options.get('options') or {})}
+
+
+def solve_highs_options(matrices: dict, options: dict):
+    """
+    Solves an LP in the matrix form of build_lp_matrices with HiGHS and the solver options. Threads and raw
+    options need highspy, time limit and tolerance also run through SciPy.
+
+    Returns: A tuple with x, the objective and the status, x and the objective are None unless optimal.
+    """
+    try:
+        import highspy
+    except ImportError:
+        highspy = None
+
+    values = highs_options(options)
+    if highspy is None or (options.get('threads') is None and not options.get('options')):
+        from scipy.optimize import linprog
+
+        if options.get('threads') is not None or options.get('options'):
+            raise ValueError("HiGHS threads and raw options need highspy, install it with 'pip install highspy'")
+        result = linprog(-matrices['c'], A_ub = matrices['A_ub'], b_ub = matrices['b_ub'], A_eq = matrices['A_eq'],
+                         b_eq = matrices['b_eq'], bounds = matrices['bounds'], method = 'highs', options = values)
+        status = LINPROG_STATUS.get(result.status, 'error')
+        return (result.x, -result.fun, status) if status == 'optimal' else (None, None, status)
+
+    highs = Persistent_Highs_Model(matrices, values).highs
+    highs.run()
+    status = highs_status(highs)
+    if status != 'optimal':
+        return None, None, status
+    return np.array(highs.getSolution().col_value), -highs.getInfo().objective_function_value, status
+
+
+def pulp_from_matrices(matrices: dict) -> tuple:
+    """
+    Returns a PuLP problem equivalent to an LP in the matrix form of build_lp_matrices, with its variables.
+    """
+    bounds = [(None if np.isinf(low) else low, None if np.isinf(up) else up) for low, up in matrices['bounds']]
+    x = [LpVariable(f'x{i}', low, up) for i, (low, up) in enumerate(bounds)]
+    problem = LpProblem('bess_matrices', LpMaximize)
+    problem.setObjective(LpAffineExpression(zip(x, matrices['c'])))
+    for name, sense in (('ub', LpConstraintLE), ('eq', LpConstraintEQ)):
+        A, b = matrices[f'A_{name}'].tocsr(), matrices[f'b_{name}']
+        for row in range(A.shape[0]):
+            start, stop = A.indptr[row], A.indptr[row + 1]
+            expression = LpAffineExpression(zip((x[col] for col in A.indices[start:stop]), A.data[start:stop]))
+            problem.addConstraint(LpConstraint(expression, sense, f'{name}_{row}', b[row]))
+    return problem, x
+
+
+def solve_with_options(matrices: dict, options: dict):
+    """
+    Solves an LP in the matrix form of build_lp_matrices with any of the SOLVERS.
+
+    Returns: A tuple with x, the objective and the status, x and the objective are None unless optimal.
+    """
+    if options['solver'] == 'highs':
+        return solve_highs_options(matrices, options)
+    problem, x = pulp_from_matrices(matrices)
+    status = solve_pulp(problem, options)
+    if status != 'optimal':
+        return None, None, status
+    return np.array([var.varValue for var in x], dtype = float), problem.objective.value(), status
+
+
+def _race_worker(matrices: dict, options: dict, results, index: int):
+    """
+    Solves one entry of the race and sends its result, in its own process group so the
+    solver processes started by PuLP are stopped with it.
+    """
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    start = time.perf_counter()
+    try:
+        x, objective, status = solve_with_options(matrices, options)
+    except Exception as error:
+        x, objective, status = None, None, f'error: {error}'
+    results.put((index, x, objective, status, time.perf_counter() - start))
+
+
+def _stop(process):
+    """
+    Stops a racing process with every solver it started.
+    """
+    if process.is_alive():
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            process.kill()
+    process.join()
+
+
+def race(matrices: dict, candidates: list, timeout: float = None) -> dict:
+    """
+    Solves an LP in the matrix form of build_lp_matrices with several solver options at once,
+    one process each, and keeps the first optimal result, stopping the other solvers.
+
+    Parameters:
+    matrices: matrix form of the model as returned by build_lp_matrices.
+    candidates: solver options of each entry, as checked by check_options.
+    timeout: seconds to wait for an optimal result, unlimited by default.
+
+    Returns: A dict with x and the objective of the winner (None when no entry was optimal), its status,
+    index and seconds, and the status of every entry ('running' for the entries stopped).
+    """
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target = _race_worker, args = (matrices, options, results, index), daemon = True)
+                 for index, options in enumerate(candidates)]
+    for process in processes:
+        process.start()
+
+    start = time.perf_counter()
+    statuses = ['running'] * len(candidates)
+    winner = {'x': None, 'objective': None, 'status': 'not_solved', 'index': None}
+    try:
+        while 'running' in statuses:
+            wait = None if timeout is None else timeout - (time.perf_counter() - start)
+            if wait is not None and wait <= 0:
+                winner['status'] = 'time_limit'
+                break
+            try:
+                index, x, objective, status, seconds = results.get(timeout = 0.5 if wait is None else min(wait, 0.5))
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    statuses = ['crashed' if status == 'running' else status for status in statuses]
+                continue
+            statuses[index] = status
+            if status == 'optimal':
+                winner = {'x': x, 'objective': objective, 'status': status, 'index': index, 'time': seconds}
+                break
+            winner['status'] = status
+    finally:
+        for process in processes:
+            _stop(process)
+        results.close()
+    winner['statuses'] = statuses
+    return winner
@@ -0,0 +1,130 @@
+import os
+import itertools
+from collections import OrderedDict
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.bess import Bess
+from src.bess_optimizer import Bess_Optimizer
+
+# optimizer holding the shared prices inside each worker process
+_worker_optimizer = None
+# persistent models kept warm inside each worker process by Bess parameters and period, least recently used first
+_warm_models = OrderedDict()
+_max_warm_models = 0
+
+
+def init_worker(energy_price: pd.DataFrame, reg_prices: pd.DataFrame, backend: str, warm_models: int = 0):
+    """
+    Receives the parsed prices once per worker process so tasks never re-read the CSV files.
+
+    Parameters:
+    energy_price / reg_prices: parsed prices shared by all cases.
+    backend: model backend of the worker optimizer.
+    warm_models: persistent models kept built in the worker, a case repeating the Bess and period of one of
+                 them only updates its initial charge and re-solves it. 0 builds every case from the prices.
+    """
+    global _worker_optimizer, _max_warm_models
+    _worker_optimizer = Bess_Optimizer(case = 'sweep', backend = backend)
+    _worker_optimizer.energy_price = energy_price
+    _worker_optimizer.reg_prices = reg_prices
+    _warm_models.clear()
+    _max_warm_models = warm_models if backend != 'dp' else 0
+
+
+def warm_optimizer(bess: Bess, case: dict) -> Bess_Optimizer:
+    """
+    Returns the worker optimizer holding the persistent model of the Bess and period of the case,
+    built on first use and with the initial charge of the case.
+    """
+    key = (case['power_capacity'], case['energy_capacity'], case['efficiency'], case['start_date'], case['end_date'])
+    optimizer = _warm_models.pop(key, None)
+    if optimizer is None:
+        optimizer = Bess_Optimizer(case = case['case'], backend = _worker_optimizer.backend)
+        optimizer.energy_price = _worker_optimizer.energy_price
+        optimizer.reg_prices = _worker_optimizer.reg_prices
+        optimizer.build_persistent(bess, case['start_date'], case['end_date'], initial_charge = case['initial_charge'])
+    else:
+        optimizer.update_initial_charge(case['initial_charge'])
+    _warm_models[key] = optimizer
+    while len(_warm_models) > _max_warm_models:
+        _warm_models.popitem(last = False)
+    return optimizer
+
+
+def run_case(case: dict) -> dict:
+    """
+    Optimizes one case of the sweep with the worker prices and returns its summary and schedule.
+    """
+    bess = Bess(power_capacity = case['power_capacity'], energy_capacity = case['energy_capacity'],
+                efficiency = case['efficiency'])
+    if _max_warm_models:
+        optimizer = warm_optimizer(bess, case)
+        optimizer.case = case['case']
+        optimizer.resolve()
+    else:
+        optimizer = _worker_optimizer
+        optimizer.case = case['case']
+        optimizer.optimize_period(bess, start_day = case['start_date'], end_day = case['end_date'],
+                                  initial_charge = case['initial_charge'])
+    bess.set_schedule(optimizer.get_optimal_schedule())
+    bess.set_profit(optimizer.get_profit())
+    return {**case, 'profit': bess.total_profit, 'cycles': bess.calc_total_cycles(), 'schedule': bess.schedule_ds}
+
+
+def build_grid(power_capacities: list, energy_capacities: list, periods: list,
+               efficiencies: list = (0.9,), initial_charge: float = 0) -> list:
+    """
+    Builds the cases of a sweep as the cartesian product of Bess parameters and periods.
+
+    Parameters:
+    power_capacities / energy_capacities / efficiencies: Bess parameters to combine.
+    periods: (start_date, end_date) pairs.
+    initial_charge: initial charge of the Bess for every case.
+
+    Returns: A list of case dicts named case_<n>.
+    """
+    grid = itertools.product(power_capacities, energy_capacities, efficiencies, periods)
+    return [
+        {
+            'case': f'case_{index}',
+            'power_capacity': power_capacity,
+            'energy_capacity': energy_capacity,
+            'efficiency': efficiency,
+            'start_date': start_date,
+            'end_date': end_date,
+            'initial_charge': initial_charge,
+        }
+        for index, (power_capacity, energy_capacity, efficiency, (start_date, end_date)) in enumerate(grid)
+    ]
+
+
+def run_sweep(cases: list, energy_price_file: str = 'data/energy_prices.csv',
+              regulation_price_file: str = 'data/regulation_prices.csv', workers: int = None,
+              backend: str = 'highs'):
+    """
+    Loads the prices once and optimizes every case of the sweep over a process pool.
+
+    Parameters:
+    cases: case dicts as returned by build_grid.
+    energy_price_file / regulation_price_file: price files loaded once for all cases.
+    workers: number of worker processes, all cores by default and 1 runs in this process.
+    backend: model backend used by each Bess_Optimizer.
+
+    Returns: A tuple with the summary DataFrame (one row per case with profit and cycles)
+    and a dict of hourly schedules by case name.
+    """
+    loader = Bess_Optimizer(case = 'sweep', backend = backend)
+    loader.load_prices(energy_price_file)
+    loader.load_regulation(regulation_price_file)
+    workers = workers or os.cpu_count()
+
+    if workers == 1:
+        init_worker(loader.energy_price, loader.reg_prices, backend)
+        results = [run_case(case) for case in cases]
+    else:
+        with ProcessPoolExecutor(max_workers = workers, initializer = init_worker,
+                                 initargs = (loader.energy_price, loader.reg_prices, backend)) as pool:
+            results = list(pool.map(run_case, cases, chunksize = max(1, len(cases) // (4 * workers))))
+
+    schedules = {result['case']: result.pop('schedule') for result in results}
+    return pd.DataFrame(results), schedules
@@ -1,14 +1,105 @@
+import os
+import matplotlib
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+from src.profiler import Profiler
+
+# pages of the batch report: column, title and line style
+PANELS = [
+    ('gen_hour', 'Generation Hour', '-'),
+    ('charge_hour', 'Charge Hour', '--'),
+    ('reg_up_hour', 'Regulation Up Hour', '-'),
+    ('reg_down_hour', 'Regulation Down Hour', '--'),
+    ('state_of_charge', 'State of Charge', '-.'),
+]
+# points drawn per series in the batch report, longer series are downsampled
+MAX_POINTS = 2000
+
+
+def downsample_min_max(x: np.ndarray, y: np.ndarray, max_points: int = MAX_POINTS):
+    """
+    Reduces a series to about max_points by keeping the minimum and maximum of consecutive buckets,
+    so the peaks of the hourly schedule survive the downsampling.
+
+    Returns: A tuple with the kept x and y values in their original order.
+    """
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    bucket = int(np.ceil(2 * n / max_points))
+    buckets = int(np.ceil(n / bucket))
+    padded = np.full(buckets * bucket, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(buckets, bucket)
+    offsets = np.arange(buckets) * bucket
+    keep = np.unique(np.concatenate([offsets + np.nanargmin(blocks, axis=1), offsets + np.nanargmax(blocks, axis=1)]))
+    return x[keep], y[keep]
+
+
+def _init_worker():
+    """
+    Forces the non-interactive Agg backend in each rendering process.
+    """
+    matplotlib.use('Agg', force=True)
+
+
+def _render_case(case: str, data: pd.DataFrame, path: str, max_points: int) -> str:
+    """
+    Renders the batch report of one case.
+    """
+    return Visualizer(case, data=data).render_pdf(path, max_points)
+
+
+def render_reports(schedules: dict, output_dir: str = 'output', workers: int = None, max_points: int = MAX_POINTS) -> list:
+    """
+    Renders the batch report of many cases over a process pool, with at most two cases
+    per worker in flight so memory stays bounded.
+
+    Parameters:
+    schedules: hourly schedule of each case indexed by timestamp, by case name.
+    output_dir: folder of the report-<case>.pdf files.
+    workers: number of rendering processes, all cores by default and 1 renders in this process.
+    max_points: points drawn per series.
+
+    Returns: A list with the path of each report, in the order of schedules.
+    """
+    workers = workers or os.cpu_count()
+    paths = {case: os.path.join(output_dir, f'report-{case}.pdf') for case in schedules}
+    if workers == 1:
+        _init_worker()
+        return [_render_case(case, data, paths[case], max_points) for case, data in schedules.items()]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+        for case, data in schedules.items():
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(pool.submit(_render_case, case, data, paths[case], max_points))
+        for future in pending:
+            future.result()
+    return list(paths.values())
+
 
 class Visualizer:
-    def __init__(self, case):
+    def __init__(self, case, data: pd.DataFrame = None, profiler: Profiler = None):
         """
         Initialize the Visualizer with the dataset.
         
         :param case: identifier used to locate the the CSV file containing the dataset, and naming the output.
+        :param data: optional in-memory hourly schedule indexed by timestamp, used instead of reading the CSV file.
+        :param profiler: optional profiler measuring the plot stage.
         """
         self.case = case
+        self.profiler = profiler or Profiler(enabled = False)
+        if data is not None:
+            self.data = data.rename_axis('timestamp').reset_index()
+            return
         self.data = pd.read_csv(f'output/results-{self.case}.csv')
         self.data.rename(columns={'Unnamed: 0': 'timestamp'}, inplace=True)
         self.data['timestamp'] = pd.to_datetime(self.data['timestamp'])
@@ -17,6 +108,40 @@ class Visualizer:
         """
         Generate separate reports for gen_hour, charge_hour, and state_of_charge over time in pdf.
         """
+        with self.profiler.stage('plot'):
+            self.plot_reports()
+
+    def render_pdf(self, path: str = None, max_points: int = MAX_POINTS) -> str:
+        """
+        Write one page per schedule column into a single pdf without pyplot, so nothing is shown
+        or kept open, with the series downsampled to max_points.
+
+        :param path: pdf file, output/report-<case>.pdf by default.
+        :param max_points: points drawn per series.
+        :return: the path of the pdf.
+        """
+        path = path or f'output/report-{self.case}.pdf'
+        with self.profiler.stage('plot'):
+            timestamps = self.data['timestamp'].to_numpy()
+            with PdfPages(path) as pdf:
+                for column, title, linestyle in PANELS:
+                    figure = Figure(figsize=(10, 4))
+                    axes = figure.subplots()
+                    axes.plot(*downsample_min_max(timestamps, self.data[column].to_numpy(), max_points),
+                              linestyle=linestyle, linewidth=0.8)
+                    axes.set_title(f'{title} Over Time', fontsize=14)
+                    axes.set_xlabel('Timestamp', fontsize=12)
+                    axes.set_ylabel(title, fontsize=12)
+                    axes.grid(True, linestyle='--', alpha=0.6)
+                    figure.autofmt_xdate(rotation=45)
+                    figure.tight_layout()
+                    pdf.savefig(figure)
+        return path
+
+    def plot_reports(self):
+        """
+        Draw and save the pdf reports of plot.
+        """
         # Plot gen_hour
         plt.figure(figsize=(10, 4))
         plt.plot(self.data['timestamp'], self.data['gen_hour'], label='Generation Hour', linestyle='-', marker='o', alpha=0.5)
@@ -28,6 +153,7 @@ class Visualizer:
         plt.tight_layout()
         plt.savefig(f'output/gen-{self.case}.pdf')
         plt.show()
+        plt.close()
 
         # Plot charge_hour
         plt.figure(figsize=(10, 4))
@@ -40,6 +166,7 @@ class Visualizer:
         plt.tight_layout()
         plt.savefig(f'output/charge-{self.case}.pdf')
         plt.show()
+        plt.close()
 
         # Plot state_of_charge
         plt.figure(figsize=(10, 4))
@@ -51,4 +178,5 @@ class Visualizer:
         plt.xticks(rotation=45)
         plt.tight_layout()
         plt.savefig(f'output/state_of_charge-{self.case}.pdf')
-        plt.show()
\ No newline at end of file
+        plt.show()
+        plt.close()
\ No newline at end of file
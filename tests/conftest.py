@@ -0,0 +1,36 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess_optimizer import Bess_Optimizer
+from src.bess import Bess
+
+
+@pytest.fixture(scope = 'session')
+def january_solution():
+    '''
+    default Bess and its optimizer solved once over January 2023 for the whole test session
+    '''
+    bess = Bess()
+    optimizer = Bess_Optimizer(case = 'case1')
+    optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
+    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    optimizer.optimize_period(bess, start_day = '1/1/2023', end_day = '2/1/2023', initial_charge = 0)
+    return bess, optimizer
+
+
+@pytest.fixture(scope = 'session')
+def loaded_optimizer():
+    '''
+    factory of optimizers with the 2023 energy and regulation prices loaded, for the given backend
+    '''
+    price_files = {'energy_price_file': os.path.abspath('data/energy_prices.csv'),
+                   'regulation_price_file': os.path.abspath('data/regulation_prices.csv')}
+
+    def load(backend: str = 'highs', case: str = 'test') -> Bess_Optimizer:
+        optimizer = Bess_Optimizer(case = case, backend = backend)
+        optimizer.load_prices(energy_price_file = price_files['energy_price_file'])
+        optimizer.load_regulation(regulation_price_file = price_files['regulation_price_file'])
+        return optimizer
+    return load
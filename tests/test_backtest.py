@@ -0,0 +1,91 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.backtest import backtest, check_schedule, settle
+
+
+def test_settlement_matches_optimal_profit(january_solution):
+    '''
+    check settling the schedule against the prices it was optimized on gives back the profit
+    '''
+    bess, optimizer = january_solution
+    settlement = settle(optimizer.get_optimal_schedule(), optimizer.energy_array, optimizer.reg_up_array,
+                        optimizer.reg_down_array, hourly = True)
+    assert settlement['revenue'][0] == pytest.approx(optimizer.get_profit(), rel = 1e-4), 'settled revenue differs from the profit'
+    assert settlement['hourly_revenue'].sum() == pytest.approx(settlement['revenue'][0]), 'hourly revenue does not add up'
+
+
+def test_optimal_schedule_has_no_violations(january_solution):
+    '''
+    check the optimal schedule is feasible at its efficiency and breaks the state of charge at a lower one,
+    the tolerance covers the rounding of the schedule replayed over the whole month
+    '''
+    bess, optimizer = january_solution
+    checks = check_schedule(optimizer.get_optimal_schedule(), bess.get_power_capacity(), bess.get_energy_capacity(),
+                            efficiency = [bess.get_efficiency(), 0.8], tolerance = 0.5)
+    assert checks['state_of_charge'].shape == (2, len(optimizer.get_optimal_schedule())), 'one replay expected per efficiency'
+    assert checks['total'][0] == 0, 'optimal schedule breaks a constraint'
+    assert checks['total'][1] > 0, 'lower efficiency not detected'
+
+
+def test_drift_across_days_flagged():
+    '''
+    check a state of charge that the schedule claims but its flows cannot keep over several days is flagged,
+    unless each day is explicitly anchored to the schedule
+    '''
+    hours = 72
+    schedule = pd.DataFrame({'gen_hour': 1.0, 'charge_hour': 0.0, 'reg_up_hour': 0.0, 'reg_down_hour': 0.0,
+                             'state_of_charge': 50.0}, index = pd.date_range('2023-01-01', periods = hours, freq = 'h'))
+    replay = check_schedule(schedule, power_capacity = 100, energy_capacity = 200, efficiency = 0.9)
+    anchored = check_schedule(schedule, power_capacity = 100, energy_capacity = 200, efficiency = 0.9, daily_anchor = True)
+    assert replay['soc_below_zero'][0] > 0, 'drift over several days not flagged'
+    assert anchored['total'][0] == 0, 'each anchored day is feasible on its own'
+
+
+def test_backtest_price_paths(january_solution):
+    '''
+    check the backtest returns one row per price path and charges the throughput fee
+    '''
+    bess, optimizer = january_solution
+    schedule = optimizer.get_optimal_schedule()
+    paths = np.stack([optimizer.energy_array, 2 * optimizer.energy_array, optimizer.energy_array])
+    summary = backtest(schedule, bess, paths, optimizer.reg_up_array, optimizer.reg_down_array, throughput_fee = 1.0)
+    throughput = schedule['gen_hour'].sum() + schedule['charge_hour'].sum()
+    assert len(summary) == 3, 'one row expected per price path'
+    assert summary['fees'][0] == pytest.approx(throughput, abs = 0.1), 'fee not charged on the throughput'
+    assert summary['energy_revenue'][1] == pytest.approx(2 * summary['energy_revenue'][0], abs = 0.5), 'energy revenue not linear in prices'
+    assert summary['revenue'][0] == summary['revenue'][2], 'same prices settle differently'
+    assert summary['cycles'][0] == round(schedule['charge_hour'].sum() / bess.get_energy_capacity(), 1), 'cycles differ from the schedule'
+
+
+def test_daily_limits_use_bess_efficiency():
+    '''
+    check the daily limits stay those of the Bess when a lower efficiency is assumed for the replay
+    '''
+    schedule = pd.DataFrame({'gen_hour': 7.0, 'charge_hour': 0.0, 'reg_up_hour': 0.0, 'reg_down_hour': 0.0,
+                             'state_of_charge': 200.0}, index = pd.date_range('2023-01-01', periods = 24, freq = 'h'))
+    nominal = check_schedule(schedule, power_capacity = 100, energy_capacity = 200, efficiency = 0.8, limit_efficiency = 0.9)
+    assumed = check_schedule(schedule, power_capacity = 100, energy_capacity = 200, efficiency = 0.8)
+    assert nominal['daily_discharge'][0] == 0, '168 MWh is within the 180 MWh daily limit of the Bess'
+    assert assumed['daily_discharge'][0] == 1, 'limit of the assumed efficiency not applied when asked'
+
+
+def test_backtest_rejects_mismatched_efficiencies(january_solution):
+    '''
+    check efficiencies that are neither one nor one per price path are rejected with both sizes named
+    '''
+    bess, optimizer = january_solution
+    paths = np.stack([optimizer.energy_array] * 3)
+    with pytest.raises(ValueError, match = r'\(3\).*got 2'):
+        backtest(optimizer.get_optimal_schedule(), bess, paths, optimizer.reg_up_array, optimizer.reg_down_array,
+                 efficiency = [0.9, 0.8])
+    with pytest.raises(ValueError, match = r'\(1\).*got 2'):
+        backtest(optimizer.get_optimal_schedule(), bess, optimizer.energy_array, optimizer.reg_up_array,
+                 optimizer.reg_down_array, efficiency = [0.9, 0.8])
+    summary = backtest(optimizer.get_optimal_schedule(), bess, paths, optimizer.reg_up_array, optimizer.reg_down_array,
+                       efficiency = [0.9, 0.8, 0.9])
+    assert summary['violations'][0] == summary['violations'][2] and summary['violations'][1] > 0, 'violations not per path'
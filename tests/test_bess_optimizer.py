@@ -1,9 +1,11 @@
 import sys
 import os
+import pytest
 
 sys.path.append(os.path.abspath('../sr'))
 from src.bess_optimizer import Bess_Optimizer
 from src.bess import Bess
+from src.lp_matrix import VARIABLES
 
 
 def test_price_data():
@@ -24,52 +26,119 @@ def test_reg_data():
     assert len(optimizer_test.reg_prices)>0, 'no data for regulation prices'
 
 
-def test_generation_not_exceed_capacity():
+def test_generation_not_exceed_capacity(january_solution):
     '''
     check that hourly generation not exceed the bess power capacity
     '''
-    bess_1 = Bess()
-    optimizer = Bess_Optimizer(case = 'case1')
-    optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
-    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
-    optimizer.optimize_period(bess_1, start_day = '1/1/2023', end_day = '2/1/2023', initial_charge = 0)
+    bess_1, optimizer = january_solution
     optimizer.get_optimal_schedule()
     assert (optimizer.schedule_ds['gen_hour'] <= bess_1.power_capacity).all(), 'generation is greater than capacity'
 
 
-def test_generation_not_exceed_charge():
+def test_generation_not_exceed_charge(january_solution):
     '''
     check that hourly generation the bess charge available
     '''
-    bess_1 = Bess()
-    optimizer = Bess_Optimizer(case = 'case1')
-    optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
-    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
-    optimizer.optimize_period(bess_1, start_day = '1/1/2023', end_day = '2/1/2023', initial_charge = 0)
+    bess_1, optimizer = january_solution
     optimizer.get_optimal_schedule()
     assert (optimizer.schedule_ds['gen_hour'] <= optimizer.schedule_ds['state_of_charge']).all(), 'generation is greater than capacity'
 
 
-def test_reg_up_not_exceed_capacity():
+def test_reg_up_not_exceed_capacity(january_solution):
     '''
     check that hourly generation not exceed the bess power capacity
     '''
-    bess_1 = Bess()
-    optimizer = Bess_Optimizer(case = 'case1')
-    optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
-    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
-    optimizer.optimize_period(bess_1, start_day = '1/1/2023', end_day = '2/1/2023', initial_charge = 0)
+    bess_1, optimizer = january_solution
     optimizer.get_optimal_schedule()
     assert (optimizer.schedule_ds['reg_up_hour'] <= bess_1.power_capacity).all(), 'generation is greater than capacity'
 
-def test_reg_down_not_exceed_capacity():
+def test_reg_down_not_exceed_capacity(january_solution):
     '''
     check that hourly generation not exceed the bess power capacity
     '''
-    bess_1 = Bess()
+    bess_1, optimizer = january_solution
+    optimizer.get_optimal_schedule()
+    assert (optimizer.schedule_ds['reg_up_hour'] <= bess_1.power_capacity).all(), 'generation is greater than capacity'
+
+def test_align_prices_hours_line_up():
+    '''
+    check aligned price arrays have one entry per hour of the period and days cover the period
+    '''
     optimizer = Bess_Optimizer(case = 'case1')
     optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
     optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
-    optimizer.optimize_period(bess_1, start_day = '1/1/2023', end_day = '2/1/2023', initial_charge = 0)
-    optimizer.get_optimal_schedule()
-    assert (optimizer.schedule_ds['reg_up_hour'] <= bess_1.power_capacity).all(), 'generation is greater than capacity'
\ No newline at end of file
+    period, day_ranges, energy, reg_up, reg_down = optimizer.align_prices('1/1/2023', '1/7/2023')
+    assert len(period) == len(energy) == len(reg_up) == len(reg_down) == 7 * 24, 'price arrays not aligned with the period'
+    assert day_ranges[0] == (0, 24) and day_ranges[-1][1] == len(period), 'day ranges do not cover the period'
+
+
+def test_align_prices_mismatch_raises():
+    '''
+    check a clear error is raised when energy and regulation hours do not line up
+    '''
+    optimizer = Bess_Optimizer(case = 'case1')
+    optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
+    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    optimizer.reg_prices = optimizer.reg_prices.drop(index = 5)
+    with pytest.raises(ValueError, match = 'do not line up'):
+        optimizer.align_prices('1/1/2023', '1/7/2023')
+
+
+def test_highs_backend_parity():
+    '''
+    check the matrix HiGHS backend returns the same profit and hourly schedule as the PuLP formulation
+    '''
+    schedules = {}
+    profits = {}
+    for backend in ['pulp', 'highs']:
+        optimizer = Bess_Optimizer(case = 'case1', backend = backend)
+        optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
+        optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+        optimizer.optimize_period(Bess(), start_day = '1/1/2023', end_day = '1/7/2023', initial_charge = 0)
+        schedules[backend] = optimizer.get_optimal_schedule()
+        profits[backend] = optimizer.get_profit()
+    assert profits['highs'] == pytest.approx(profits['pulp'], rel = 1e-6), 'profit differs between backends'
+    assert (schedules['highs'].index == schedules['pulp'].index).all(), 'schedule hours differ between backends'
+    assert list(schedules['highs'].columns) == list(schedules['pulp'].columns), 'schedule columns differ between backends'
+    for var in VARIABLES:
+        assert schedules['highs'][var].to_numpy() == pytest.approx(schedules['pulp'][var].to_numpy(), abs = 0.01), \
+            f'{var} differs between backends'
+
+
+def test_rolling_horizon_respects_daily_cycle():
+    '''
+    check the stitched rolling horizon schedule keeps one cycle per day and does not beat the monolithic solve
+    '''
+    bess_1 = Bess()
+    optimizer = Bess_Optimizer(case = 'case1', backend = 'highs')
+    optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
+    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    report = optimizer.rolling_profit_gap(bess_1, start_day = '1/1/2023', end_day = '1/14/2023', windows = [(36, 12)])
+    schedule = optimizer.get_optimal_schedule()
+    daily_gen = schedule['gen_hour'].groupby(schedule.index.date).sum()
+    assert len(schedule) == 14 * 24, 'rolling schedule does not cover the period'
+    assert (daily_gen <= bess_1.efficiency * bess_1.energy_capacity + 0.1).all(), 'more than one discharge cycle per day'
+    assert (report['gap'] >= -0.1).all(), 'rolling horizon profit above the monolithic optimum'
+
+
+def test_persistent_resolve_matches_rebuild():
+    '''
+    check updating prices and initial charge in place gives the same profit as rebuilding the model
+    '''
+    optimizer = Bess_Optimizer(case = 'case1', backend = 'highs')
+    optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
+    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    optimizer.build_persistent(Bess(), start_day = '1/1/2023', end_day = '1/7/2023', initial_charge = 0)
+    optimizer.resolve()
+    optimizer.update_prices(energy = optimizer.energy_array * 1.5)
+    optimizer.update_initial_charge(50)
+    optimizer.resolve()
+    assert {'build', 'update', 'solve'} <= set(optimizer.timings), 'missing timings of the persistent model'
+    assert optimizer.schedule_ds['state_of_charge'].iloc[0] == 50, 'initial charge not updated'
+
+    rebuild = Bess_Optimizer(case = 'case1', backend = 'highs')
+    rebuild.energy_price = optimizer.energy_price.copy()
+    rebuild.reg_prices = optimizer.reg_prices
+    rebuild.energy_price['Price'] = rebuild.energy_price['Price'] * 1.5
+    rebuild.optimize_period(Bess(), start_day = '1/1/2023', end_day = '1/7/2023', initial_charge = 50)
+    assert optimizer.get_profit() == pytest.approx(rebuild.get_profit(), rel = 1e-6), 'persistent re-solve differs from rebuild'
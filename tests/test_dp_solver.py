@@ -0,0 +1,89 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess_optimizer import Bess_Optimizer
+from src.bess import Bess
+from src.dp_solver import screen
+from src.backtest import check_schedule
+
+
+@pytest.fixture(scope = 'module')
+def week_solutions():
+    '''
+    default Bess solved over the first week of 2023 with the dp and highs backends
+    '''
+    bess = Bess()
+    optimizers = {}
+    for backend in ('dp', 'highs'):
+        optimizer = Bess_Optimizer(case = f'dp_{backend}', backend = backend)
+        optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
+        optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+        optimizer.optimize_period(bess, start_day = '1/1/2023', end_day = '1/7/2023', initial_charge = 0)
+        optimizers[backend] = optimizer
+    return bess, optimizers
+
+
+def test_dp_schedule_is_feasible(week_solutions):
+    '''
+    check the dp schedule respects the power, charge, daily cycle and state of charge constraints of the LP
+    '''
+    bess, optimizers = week_solutions
+    schedule = optimizers['dp'].schedule_ds
+    power, capacity, eff = bess.get_power_capacity(), bess.get_energy_capacity(), bess.get_efficiency()
+    gen, charge = schedule['gen_hour'], schedule['charge_hour']
+    reg_up, reg_down, soc = schedule['reg_up_hour'], schedule['reg_down_hour'], schedule['state_of_charge']
+    tolerance = 0.05                                    # schedule values are rounded to 2 decimals
+
+    assert (gen + reg_up <= power + tolerance).all(), 'generation plus regulation up exceeds the power capacity'
+    assert (gen + reg_up <= 0.9 * soc + tolerance).all(), 'generation plus regulation up exceeds the charge'
+    assert (charge + reg_down <= (capacity - soc) / eff + tolerance).all(), 'charge exceeds the remaining capacity'
+    assert (gen.groupby(gen.index.date).sum() <= eff * capacity + tolerance).all(), 'more than one discharge cycle by day'
+    assert (charge.groupby(charge.index.date).sum() <= capacity / eff + tolerance).all(), 'more than one charge cycle by day'
+
+    next_soc = soc + eff * charge - gen / eff + 0.1 * eff * reg_down - 0.1 * reg_up / eff
+    assert np.allclose(next_soc.values[:-1], soc.values[1:], atol = tolerance), 'state of charge dynamics are broken'
+
+
+def test_dp_profit_close_to_lp(week_solutions):
+    '''
+    check the dp profit is a lower bound within a few percent of the LP optimum
+    '''
+    bess, optimizers = week_solutions
+    dp_profit, lp_profit = optimizers['dp'].get_profit(), optimizers['highs'].get_profit()
+    assert dp_profit <= lp_profit + 1, 'dp profit above the LP optimum'
+    assert dp_profit >= 0.95 * lp_profit, 'dp profit more than 5% below the LP optimum'
+
+
+def test_low_efficiency_stays_lp_feasible():
+    '''
+    check with regulation losses larger than the stored energy allows, the dp schedule still keeps the LP
+    constraints and its profit stays below the LP optimum
+    '''
+    bess = Bess(efficiency = 0.8)
+    profits = {}
+    for backend in ('dp', 'highs'):
+        optimizer = Bess_Optimizer(case = f'dp_low_{backend}', backend = backend)
+        optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
+        optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+        optimizer.optimize_period(bess, start_day = '1/1/2023', end_day = '1/7/2023', initial_charge = 0)
+        profits[backend] = optimizer.get_profit()
+        if backend == 'dp':
+            checks = check_schedule(optimizer.schedule_ds, bess.get_power_capacity(), bess.get_energy_capacity(),
+                                    bess.get_efficiency(), initial_charge = 0)
+    assert checks['total'][0] == 0, 'dp schedule breaks the LP constraints at 80% efficiency'
+    assert profits['dp'] <= profits['highs'] + 1, 'dp profit above the LP optimum'
+
+
+def test_screen_batches_cases(week_solutions):
+    '''
+    check the batched screen matches single dp solves and ranks larger batteries higher
+    '''
+    bess, optimizers = week_solutions
+    assets = [bess, Bess(power_capacity = 50, energy_capacity = 100), Bess(power_capacity = 100, energy_capacity = 400)]
+    summary = screen(optimizers['dp'], assets, '1/1/2023', '1/7/2023')
+    assert len(summary) == len(assets), 'one row expected per Bess'
+    assert summary['profit'][0] == pytest.approx(optimizers['dp'].get_profit(), abs = 1), 'batched profit differs from the single solve'
+    assert summary['profit'][1] < summary['profit'][0] < summary['profit'][2], 'profit does not grow with the Bess size'
@@ -0,0 +1,44 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.exporter import Schedule_Exporter
+
+
+def make_schedule(hours: int = 100) -> pd.DataFrame:
+    columns = ['gen_hour', 'charge_hour', 'reg_up_hour', 'reg_down_hour', 'state_of_charge']
+    index = pd.date_range('2023-01-01', periods = hours, freq = 'h')
+    return pd.DataFrame(np.random.default_rng(0).random((hours, len(columns))).round(2), index = index, columns = columns)
+
+
+def test_chunked_csv_matches_full_write(tmp_path):
+    '''
+    check the chunked csv is identical to writing the whole schedule at once
+    '''
+    schedule = make_schedule()
+    Schedule_Exporter(str(tmp_path / 'chunked.csv'), chunk_size = 7).write(schedule)
+    schedule.to_csv(tmp_path / 'full.csv')
+    assert (tmp_path / 'chunked.csv').read_text() == (tmp_path / 'full.csv').read_text(), 'chunked csv differs from full write'
+
+
+def test_stream_of_schedules(tmp_path):
+    '''
+    check an iterable of consecutive schedules is streamed into one file
+    '''
+    schedule = make_schedule()
+    Schedule_Exporter(str(tmp_path / 'stream.csv'), chunk_size = 30).write(schedule.iloc[start:start + 24] for start in range(0, 100, 24))
+    assert len(pd.read_csv(tmp_path / 'stream.csv')) == 100, 'streamed csv does not have every hour'
+
+
+def test_parquet_export(tmp_path):
+    '''
+    check the parquet export keeps every hour and the timestamp column
+    '''
+    pytest.importorskip('pyarrow')
+    schedule = make_schedule()
+    Schedule_Exporter(str(tmp_path / 'schedule.parquet'), file_format = 'parquet', chunk_size = 24).write(schedule)
+    exported = pd.read_parquet(tmp_path / 'schedule.parquet')
+    assert len(exported) == 100 and 'timestamp' in exported.columns, 'parquet export lost hours or timestamps'
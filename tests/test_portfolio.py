@@ -0,0 +1,54 @@
+import sys
+import os
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess import Bess
+from src.portfolio import Bess_Portfolio
+
+
+def test_independent_assets_match_single_solves(loaded_optimizer):
+    '''
+    check a portfolio without coupling earns the sum of the single asset solves
+    '''
+    optimizer = loaded_optimizer()
+    assets = [Bess(100, 200), Bess(50, 100)]
+    portfolio = Bess_Portfolio(optimizer, assets)
+    portfolio.optimize_period(start_day = '1/1/2023', end_day = '1/7/2023')
+
+    single_profits = []
+    for bess in assets:
+        optimizer.optimize_period(bess, start_day = '1/1/2023', end_day = '1/7/2023')
+        single_profits.append(optimizer.get_profit())
+    assert portfolio.get_profit() == pytest.approx(sum(single_profits), abs = 0.2), 'portfolio profit differs from single solves'
+    assert set(portfolio.get_schedules()) == {'asset_0', 'asset_1'}, 'missing asset schedules'
+
+
+def test_poi_limit_respected(loaded_optimizer):
+    '''
+    check the aggregate injection and withdrawal of the portfolio stay within the POI limit
+    '''
+    portfolio = Bess_Portfolio(loaded_optimizer(), [Bess(100, 200), Bess(100, 200)], poi_limit = 120)
+    portfolio.optimize_period(start_day = '1/1/2023', end_day = '1/7/2023')
+    aggregate = portfolio.get_aggregate_schedule()
+    assert ((aggregate['gen_hour'] + aggregate['reg_up_hour']) <= 120 + 0.1).all(), 'injection above the POI limit'
+    assert ((aggregate['charge_hour'] + aggregate['reg_down_hour']) <= 120 + 0.1).all(), 'withdrawal above the POI limit'
+
+
+def test_solver_settings_honoured(loaded_optimizer):
+    '''
+    check the portfolio solves with the backend and solver options of the optimizer
+    '''
+    optimizer = loaded_optimizer()
+    optimizer.solver_options = {'time_limit': 1e-6}
+    with pytest.raises(RuntimeError, match = 'time_limit'):
+        Bess_Portfolio(optimizer, [Bess(100, 200), Bess(50, 100)], poi_limit = 120).optimize_period('1/1/2023', '3/31/2023')
+
+    optimizer = loaded_optimizer('pulp')
+    portfolio = Bess_Portfolio(optimizer, [Bess(100, 200), Bess(50, 100)], poi_limit = 120)
+    portfolio.optimize_period('1/1/2023', '1/3/2023')
+    assert optimizer.solved_by['solver'] == 'cbc', 'pulp backend not solved with CBC'
+
+    optimizer.race = [{'solver': 'highs'}]
+    with pytest.raises(ValueError):
+        Bess_Portfolio(optimizer, [Bess(100, 200), Bess(50, 100)], workers = 2).optimize_period('1/1/2023', '1/3/2023')
@@ -0,0 +1,53 @@
+import sys
+import os
+import shutil
+import numpy as np
+
+sys.path.append(os.path.abspath('../sr'))
+from src.price_store import Price_Store
+
+
+def test_cached_load_matches_parse(tmp_path):
+    '''
+    check the cached columns are memory-mapped and equal to a fresh parse
+    '''
+    store = Price_Store(cache_dir = str(tmp_path))
+    parsed = store.load('data/regulation_prices.csv')
+    cached = store.load_columns('data/regulation_prices.csv')
+    assert isinstance(cached['timestamp'], np.memmap), 'cached columns are not memory-mapped'
+    assert (parsed['Date'].dt.tz is not None), 'timestamps are not tz-aware'
+    assert (np.asarray(cached['Regulation Up']) == parsed['Regulation Up'].to_numpy()).all(), 'cached prices differ from parsed prices'
+
+
+def test_cache_invalidated_on_source_change(tmp_path):
+    '''
+    check a modified source file is parsed again instead of read from the stale cache
+    '''
+    price_file = tmp_path / 'energy_prices.csv'
+    shutil.copy('data/energy_prices.csv', price_file)
+    store = Price_Store(cache_dir = str(tmp_path / 'cache'))
+    first_path = store.cache_path(str(price_file))
+    store.load(str(price_file))
+
+    content = price_file.read_text().rstrip('\n')
+    price_file.write_text(content + '\n1/1/24,1,10.0\n')
+    assert store.cache_path(str(price_file)) != first_path, 'cache key did not change with the source file'
+    assert len(store.load(str(price_file))) == 8761, 'stale cache returned for a modified source file'
+
+
+def test_cache_written_atomically(tmp_path):
+    '''
+    check the cache folder only appears complete, and a cache written first by another process is kept
+    '''
+    store = Price_Store(cache_dir = str(tmp_path))
+    path = store.cache_path('data/regulation_prices.csv')
+    store.load_columns('data/regulation_prices.csv')
+    assert os.listdir(tmp_path) == [os.path.basename(path)], 'staging folder left next to the cache'
+    assert 'meta.json' in os.listdir(path), 'cache moved into place without its metadata'
+
+    shutil.rmtree(path)
+    os.makedirs(path)
+    (tmp_path / os.path.basename(path) / 'other.npy').write_bytes(b'')
+    columns = store.load_columns('data/regulation_prices.csv')
+    assert len(columns['timestamp']) == 8760, 'parsed columns lost when the cache folder was taken'
+    assert os.listdir(tmp_path) == [os.path.basename(path)], 'staging folder left after losing the race'
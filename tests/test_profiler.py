@@ -0,0 +1,54 @@
+import sys
+import os
+import json
+import tracemalloc
+import numpy as np
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess_optimizer import Bess_Optimizer
+from src.bess import Bess
+from src.profiler import Profiler
+
+
+def test_profile_pipeline_stages(tmp_path):
+    '''
+    check every stage of the pipeline and the model size end up in the JSON report
+    '''
+    optimizer = Bess_Optimizer(case = 'profile', backend = 'highs')
+    optimizer.profiler = Profiler(track_memory = False)
+    optimizer.load_prices(energy_price_file ='data/energy_prices.csv')
+    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    optimizer.optimize_period(Bess(), start_day = '1/1/2023', end_day = '1/7/2023')
+    optimizer.profiler.save(str(tmp_path / 'profile.json'))
+
+    with open(tmp_path / 'profile.json') as report_file:
+        report = json.load(report_file)
+    expected = {'load_prices', 'load_regulation', 'align_prices', 'build_model', 'solve', 'process_optimal_schedule'}
+    assert expected <= set(report['stages']), 'missing stages in the profile report'
+    assert report['model']['variables'] == 5 * 7 * 24, 'model size not recorded'
+
+
+def test_disabled_profiler_records_nothing():
+    '''
+    check the default profiler of the optimizer does not measure anything
+    '''
+    profiler = Profiler(enabled = False)
+    with profiler.stage('load_prices'):
+        pass
+    assert profiler.stages == {}, 'disabled profiler recorded a stage'
+
+
+def test_nested_stage_keeps_parent_peak():
+    '''
+    check a nested stage does not wipe the peak memory of the stage around it, and tracing stops on close
+    '''
+    profiler = Profiler()
+    with profiler.stage('outer'):
+        buffer = np.ones(2**22)                 # 32 MB released before the inner stage
+        del buffer
+        with profiler.stage('inner'):
+            pass
+    profiler.close()
+    assert profiler.stages['outer']['peak_mb'] >= 32, 'parent peak lost in the nested stage'
+    assert profiler.stages['inner']['peak_mb'] < 32, 'nested stage charged with the parent peak'
+    assert not tracemalloc.is_tracing(), 'tracing left running after close'
@@ -0,0 +1,61 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess import Bess
+from src.scenarios import Scenario_Batch, generate_price_paths
+
+
+def test_generated_paths_vary_around_prices():
+    '''
+    check the generated scenarios have one row per scenario and the historical prices as mean
+    '''
+    energy = np.full(1000, 50.0)
+    paths = generate_price_paths(energy, energy, energy, scenarios = 400, seed = 0)
+    assert paths['energy'].shape == (400, 1000), 'scenarios are not a (scenarios, hours) array'
+    assert paths['energy'].mean() == pytest.approx(50, rel = 0.02), 'scenarios are biased from the prices'
+    assert paths['energy'].std() > 1, 'scenarios do not vary'
+
+
+def test_loaded_prices_scenario_matches_optimizer(loaded_optimizer):
+    '''
+    check a scenario with the loaded prices earns the deterministic optimum
+    '''
+    optimizer = loaded_optimizer()
+    batch = Scenario_Batch(optimizer, Bess())
+    batch.optimize_period('1/1/2023', '1/7/2023', paths = {})
+    optimizer.optimize_period(Bess(), '1/1/2023', '1/7/2023')
+    assert batch.get_profits()[0] == pytest.approx(optimizer.get_profit(), abs = 0.2), 'scenario profit differs from the single solve'
+    assert len(batch.get_schedule(0)) == len(optimizer.get_optimal_schedule()), 'scenario schedule has the wrong length'
+
+
+def test_parallel_and_two_stage_scenarios(loaded_optimizer):
+    '''
+    check parallel scenarios match the serial solve and the shared day-ahead schedule earns less in each scenario
+    '''
+    batch = Scenario_Batch(loaded_optimizer(), Bess())
+    paths = batch.generate('1/1/2023', '1/3/2023', scenarios = 6, seed = 1)
+    batch.optimize_period('1/1/2023', '1/3/2023', paths)
+    independent = batch.get_profits().copy()
+
+    batch.workers = 2
+    batch.optimize_period('1/1/2023', '1/3/2023', paths)
+    assert np.allclose(batch.get_profits(), independent), 'parallel scenarios differ from the serial solve'
+
+    batch.optimize_period('1/1/2023', '1/3/2023', paths, two_stage = True)
+    assert (batch.values['gen_hour'] == batch.values['gen_hour'][0]).all(), 'generation is not shared by the scenarios'
+    assert (batch.get_profits() <= independent + 1e-3).all(), 'shared schedule beats the scenario optimum'
+    assert list(batch.profit_percentiles().index) == ['p5', 'p25', 'p50', 'p75', 'p95', 'mean'], 'missing percentiles'
+
+
+def test_dp_backend_solves_batch(loaded_optimizer):
+    '''
+    check the dp backend solves every scenario in one batch
+    '''
+    batch = Scenario_Batch(loaded_optimizer('dp'), Bess())
+    paths = batch.generate('1/1/2023', '1/3/2023', scenarios = 5, seed = 1)
+    batch.optimize_period('1/1/2023', '1/3/2023', paths)
+    assert batch.values['gen_hour'].shape == (5, len(batch.period)), 'one row of values expected per scenario'
+    assert (batch.get_profits() > 0).all(), 'scenario profits missing'
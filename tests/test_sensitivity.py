@@ -0,0 +1,96 @@
+import sys
+import os
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess_optimizer import Bess_Optimizer
+from src.bess import Bess
+from src.lp_matrix import build_lp_matrices, solve_matrices
+from src.profiler import Profiler
+from src.sensitivity import MARGINALS
+from src.solution_cache import Solution_Cache
+
+
+def week_profit(optimizer: Bess_Optimizer, power_capacity: float = 100, energy_capacity: float = 200,
+                initial_charge: float = 0) -> float:
+    '''
+    unrounded optimal profit of the first week of 2023
+    '''
+    bess = Bess(power_capacity = power_capacity, energy_capacity = energy_capacity)
+    _, day_ranges, energy, reg_up, reg_down = optimizer.align_prices('1/1/2023', '1/7/2023')
+    matrices = build_lp_matrices(energy, reg_up, reg_down, day_ranges, bess.get_power_capacity(),
+                                 bess.get_energy_capacity(), bess.get_efficiency(), initial_charge)
+    return solve_matrices(matrices)[1]
+
+
+@pytest.fixture(scope = 'module')
+def week_sensitivity(loaded_optimizer):
+    '''
+    optimizer and marginal values of the default Bess over the first week of 2023
+    '''
+    optimizer = loaded_optimizer('highs', 'sensitivity')
+    summary = optimizer.optimize_sensitivity(Bess(), '1/1/2023', '1/7/2023', initial_charge = 50)
+    return optimizer, summary
+
+
+def test_marginals_bound_resolves(week_sensitivity, loaded_optimizer):
+    '''
+    check each marginal value lies between the profit change of one unit less and one unit more,
+    as a dual of the concave optimal profit
+    '''
+    optimizer, summary = week_sensitivity
+    resolver = loaded_optimizer()
+    base = week_profit(resolver, initial_charge = 50)
+    for name, nudged in [('power_capacity', lambda step: week_profit(resolver, power_capacity = 100 + step, initial_charge = 50)),
+                         ('energy_capacity', lambda step: week_profit(resolver, energy_capacity = 200 + step, initial_charge = 50)),
+                         ('initial_charge', lambda step: week_profit(resolver, initial_charge = 50 + step))]:
+        gain, loss = nudged(1) - base, base - nudged(-1)
+        assert gain - 0.05 <= summary[name] <= loss + 0.05, f'marginal value of {name} out of the re-solve bounds'
+    assert optimizer.get_profit() == pytest.approx(base, abs = 0.1), 'sensitivity solve is not the optimum'
+
+
+def test_breakdown_sums_to_summary(week_sensitivity):
+    '''
+    check the breakdown by interval follows the schedule and adds up to the marginal values
+    '''
+    optimizer, summary = week_sensitivity
+    breakdown = optimizer.get_sensitivity()
+    assert list(breakdown.columns) == MARGINALS, 'wrong sensitivity columns'
+    assert breakdown.index.equals(optimizer.get_optimal_schedule().index), 'breakdown not aligned with the schedule'
+    for name in MARGINALS[:-1]:
+        assert breakdown[name].sum() == pytest.approx(summary[name], abs = 0.1), f'{name} breakdown does not add up'
+    assert breakdown['state_of_charge'].iloc[0] == pytest.approx(summary['initial_charge'], abs = 0.01), 'initial charge value differs'
+
+
+def test_sensitivity_report(week_sensitivity, tmp_path, monkeypatch):
+    '''
+    check the breakdown is exported next to the hourly report
+    '''
+    optimizer, _ = week_sensitivity
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('output')
+    optimizer.save_hourly_report()
+    path = optimizer.save_sensitivity_report()
+    assert os.path.dirname(path) == 'output', 'sensitivity report not next to the schedule'
+    report = pd.read_csv(path, index_col = 0)
+    assert len(report) == len(optimizer.get_optimal_schedule()), 'sensitivity report has the wrong length'
+
+
+def test_unsupported_solver_settings_rejected(loaded_optimizer, tmp_path):
+    '''
+    check solver settings the sensitivity solve cannot honour are rejected, and the model size is recorded
+    '''
+    for setting, value in [('solver_options', {'solver': 'cbc'}), ('race', [{'solver': 'highs'}]),
+                           ('solution_cache', Solution_Cache(str(tmp_path / 'cache.sqlite')))]:
+        optimizer = loaded_optimizer()
+        setattr(optimizer, setting, value)
+        with pytest.raises(ValueError):
+            optimizer.optimize_sensitivity(Bess(), '1/1/2023', '1/2/2023')
+
+    optimizer = loaded_optimizer()
+    optimizer.profiler = Profiler(track_memory = False)
+    optimizer.solver_options = {'time_limit': 60}
+    optimizer.optimize_sensitivity(Bess(), '1/1/2023', '1/2/2023')
+    assert optimizer.profiler.model['variables'] == 5 * 48, 'model size not recorded'
+    assert optimizer.solved_by == {'solver': 'highs', 'time_limit': 60}, 'solver options not surfaced'
@@ -0,0 +1,81 @@
+import sys
+import os
+import json
+import urllib.error
+import urllib.request
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.service import Optimization_Service, request_optimization
+
+
+@pytest.fixture(scope = 'module')
+def service():
+    '''
+    service with one solver process on a free localhost port
+    '''
+    service = Optimization_Service(workers = 1, queue_size = 0, port = 0)
+    service.start()
+    yield service
+    service.shutdown()
+
+
+def test_request_returns_schedule(service, january_solution):
+    '''
+    check a request returns the profit and schedule of the same optimization run locally
+    '''
+    bess, optimizer = january_solution
+    response = request_optimization({'start_date': '1/1/2023', 'end_date': '2/1/2023'}, service.address)
+    assert response['profit'] == pytest.approx(optimizer.get_profit(), abs = 0.2), 'service profit differs from the optimizer'
+    assert len(response['schedule']['timestamp']) == len(optimizer.get_optimal_schedule()), 'schedule has the wrong length'
+    assert set(response['schedule']) == {'timestamp', *optimizer.get_optimal_schedule().columns}, 'missing schedule columns'
+
+
+def test_invalid_request_rejected(service):
+    '''
+    check requests without a period or with a period out of the prices get a 400 error
+    '''
+    for request in ({'start_date': '1/1/2023'}, {'start_date': '1/1/2030', 'end_date': '1/2/2030'}):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            request_optimization(request, service.address)
+        assert error.value.code == 400, 'invalid request not rejected'
+
+
+def test_busy_service_applies_backpressure(service):
+    '''
+    check a request is rejected with 503 while every solver slot is taken
+    '''
+    service.slots.acquire()
+    try:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            request_optimization({'start_date': '1/1/2023', 'end_date': '1/2/2023'}, service.address)
+    finally:
+        service.slots.release()
+    assert error.value.code == 503, 'busy service did not reject the request'
+    health = json.loads(urllib.request.urlopen(f'{service.address}/health').read())
+    assert health['rejected'] >= 1, 'rejected request not counted'
+
+
+def test_repeated_request_reuses_warm_model(service):
+    '''
+    check a request for a Bess and period solved before re-solves its warm model with the new initial charge
+    '''
+    request = {'start_date': '1/1/2023', 'end_date': '1/3/2023', 'power_capacity': 50}
+    first = request_optimization(request, service.address)
+    warm = request_optimization({**request, 'initial_charge': 100}, service.address)
+    cold = request_optimization({**request, 'power_capacity': 50.0001, 'initial_charge': 100}, service.address)
+    assert warm['schedule']['state_of_charge'][0] == 100, 'initial charge not updated in the warm model'
+    assert warm['profit'] == pytest.approx(cold['profit'], abs = 0.2), 'warm model re-solve differs from a fresh build'
+    assert first['profit'] != warm['profit'], 'warm model returned the previous solution'
+
+
+def test_arrow_without_pyarrow_rejected_before_solving(service, monkeypatch):
+    '''
+    check an arrow request is rejected with 400 before reaching the solvers when pyarrow is missing
+    '''
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    requests = service.requests
+    with pytest.raises(urllib.error.HTTPError) as error:
+        request_optimization({'start_date': '1/1/2023', 'end_date': '1/2/2023', 'format': 'arrow'}, service.address)
+    assert error.value.code == 400, 'arrow request without pyarrow not rejected'
+    assert service.requests == requests, 'arrow request reached the solvers'
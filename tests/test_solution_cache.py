@@ -0,0 +1,79 @@
+import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess_optimizer import Bess_Optimizer
+from src.bess import Bess
+from src.solution_cache import Solution_Cache
+
+
+def solve_week(optimizer: Bess_Optimizer, path: str, power_capacity: float):
+    optimizer.solution_cache = Solution_Cache(path)
+    optimizer.optimize_period(Bess(power_capacity = power_capacity), '1/1/2023', '1/7/2023')
+    return optimizer.get_profit()
+
+
+def test_hit_returns_same_solution(loaded_optimizer, tmp_path):
+    '''
+    check a repeated case is read from the cache with the same schedule and profit, and a changed case is not
+    '''
+    optimizer = loaded_optimizer()
+    optimizer.solution_cache = Solution_Cache(str(tmp_path / 'cache.sqlite'))
+    optimizer.optimize_period(Bess(), '1/1/2023', '1/7/2023')
+    solved, profit = optimizer.get_optimal_schedule(), optimizer.get_profit()
+    assert not optimizer.cache_hit, 'first solve cannot be a hit'
+
+    optimizer.optimize_period(Bess(), '1/1/2023', '1/7/2023')
+    assert optimizer.cache_hit, 'repeated case not read from the cache'
+    assert optimizer.solve_status == 'optimal' and optimizer.solved_by == {'solver': 'cache'}, 'cache hit reported as a solve'
+    assert optimizer.solve_time > 0, 'lookup time not surfaced'
+    assert optimizer.get_profit() == profit, 'cached profit differs'
+    pd.testing.assert_frame_equal(optimizer.get_optimal_schedule(), solved)
+
+    optimizer.optimize_period(Bess(), '1/1/2023', '1/7/2023', initial_charge = 50)
+    assert not optimizer.cache_hit, 'different initial charge read from the cache'
+    stats = optimizer.solution_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 2), 'wrong cache statistics'
+
+
+def test_int_and_float_settings_share_entry(loaded_optimizer, tmp_path):
+    '''
+    check settings given as int or float hash to the same entry
+    '''
+    optimizer = loaded_optimizer()
+    optimizer.solution_cache = Solution_Cache(str(tmp_path / 'cache.sqlite'))
+    optimizer.optimize_period(Bess(power_capacity = 100), '1/1/2023', '1/3/2023', initial_charge = 0)
+    optimizer.optimize_period(Bess(power_capacity = 100.0), '1/1/2023', '1/3/2023', initial_charge = 0.0)
+    assert optimizer.cache_hit, 'float form of the same case missed the cache'
+    assert optimizer.solution_cache.stats()['entries'] == 1, 'int and float forms stored twice'
+
+
+def test_least_recently_used_evicted(loaded_optimizer, tmp_path):
+    '''
+    check the cache keeps max_entries and evicts the least recently used case
+    '''
+    optimizer = loaded_optimizer()
+    optimizer.solution_cache = Solution_Cache(str(tmp_path / 'cache.sqlite'), max_entries = 2)
+    for power_capacity in (50, 100):
+        optimizer.optimize_period(Bess(power_capacity = power_capacity), '1/1/2023', '1/3/2023')
+    optimizer.optimize_period(Bess(power_capacity = 50), '1/1/2023', '1/3/2023')      # 100 is now the oldest
+    optimizer.optimize_period(Bess(power_capacity = 80), '1/1/2023', '1/3/2023')
+    optimizer.optimize_period(Bess(power_capacity = 50), '1/1/2023', '1/3/2023')
+    assert optimizer.cache_hit, 'recently used case evicted'
+    optimizer.optimize_period(Bess(power_capacity = 100), '1/1/2023', '1/3/2023')
+    assert not optimizer.cache_hit, 'least recently used case kept'
+    assert optimizer.solution_cache.stats()['entries'] == 2, 'cache above max_entries'
+
+
+def test_shared_between_processes(loaded_optimizer, tmp_path):
+    '''
+    check several processes share the cache and count every lookup
+    '''
+    path = str(tmp_path / 'cache.sqlite')
+    with ProcessPoolExecutor(max_workers = 2) as pool:
+        profits = list(pool.map(solve_week, [loaded_optimizer()] * 6, [path] * 6, [50, 100] * 3))
+    assert profits[:2] * 3 == profits, 'processes read different solutions'
+    stats = Solution_Cache(path).stats()
+    assert stats['hits'] + stats['misses'] == 6 and stats['entries'] == 2, 'lookups lost between processes'
@@ -0,0 +1,83 @@
+import sys
+import os
+import multiprocessing
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess import Bess
+from src.solvers import available_solvers, check_options
+
+
+@pytest.mark.parametrize('backend', ['pulp', 'highs'])
+def test_installed_solvers_agree(backend, loaded_optimizer):
+    '''
+    check every installed solver reaches the same optimum from both backends and reports its status and time
+    '''
+    profits = []
+    for solver in available_solvers():
+        optimizer = loaded_optimizer(backend)
+        optimizer.solver_options = {'solver': solver, 'threads': 1, 'time_limit': 120, 'tolerance': 1e-7}
+        optimizer.optimize_period(Bess(), '1/1/2023', '1/7/2023')
+        assert optimizer.solve_status == 'optimal', f'{solver} did not report an optimal solve'
+        assert optimizer.solved_by['solver'] == solver and optimizer.solve_time > 0, 'solver or timing not surfaced'
+        profits.append(optimizer.get_profit())
+    assert max(profits) - min(profits) <= 0.2, 'solvers disagree on the optimum'
+
+
+def test_time_limit_raises(loaded_optimizer):
+    '''
+    check a solve stopped by the time limit raises instead of returning a partial schedule
+    '''
+    optimizer = loaded_optimizer('highs')
+    optimizer.solver_options = {'time_limit': 1e-6}
+    with pytest.raises(RuntimeError, match = 'time_limit'):
+        optimizer.optimize_period(Bess(), '1/1/2023', '3/31/2023')
+    assert optimizer.solve_status == 'time_limit', 'time limit status not surfaced'
+
+
+def test_cbc_time_limit_raises(loaded_optimizer):
+    '''
+    check CBC stopped by its time limit with an unproven solution is not read as optimal
+    '''
+    optimizer = loaded_optimizer('pulp')
+    optimizer.solver_options = {'solver': 'cbc', 'time_limit': 0.01}
+    with pytest.raises(RuntimeError, match = 'time_limit'):
+        optimizer.optimize_period(Bess(), '1/1/2023', '12/31/2023')
+    assert optimizer.solve_status == 'time_limit', 'time limited CBC solve reported as optimal'
+
+
+@pytest.mark.parametrize('backend', ['pulp', 'highs'])
+def test_infeasible_model_not_reported_as_time_limit(backend, loaded_optimizer):
+    '''
+    check an infeasible model solved with a time limit is reported infeasible, not as a timeout
+    '''
+    optimizer = loaded_optimizer(backend)
+    optimizer.solver_options = {'solver': 'cbc', 'time_limit': 60}
+    with pytest.raises(RuntimeError, match = 'infeasible'):
+        optimizer.optimize_period(Bess(), '1/1/2023', '1/2/2023', initial_charge = 10000)
+    assert optimizer.solve_status == 'infeasible', 'infeasible model reported as a timeout'
+
+
+def test_race_keeps_first_optimal(january_solution, loaded_optimizer):
+    '''
+    check racing solvers and settings returns the optimum of one of them and stops the others
+    '''
+    bess, solved = january_solution
+    optimizer = loaded_optimizer('pulp')
+    optimizer.race = [{'solver': 'highs', 'time_limit': 1e-6}, {'solver': 'highs', 'options': {'solver': 'ipm'}},
+                      *({'solver': solver} for solver in available_solvers())]
+    optimizer.optimize_period(bess, '1/1/2023', '2/1/2023')
+    assert optimizer.solve_status == 'optimal', 'no optimal result from the race'
+    assert optimizer.solved_by in [check_options(options, 'highs') for options in optimizer.race[1:]], 'time limited entry won the race'
+    assert optimizer.get_profit() == pytest.approx(solved.get_profit(), abs = 0.2), 'race optimum differs'
+    assert multiprocessing.active_children() == [], 'losing solvers still running'
+
+
+def test_unknown_solver_rejected():
+    '''
+    check unknown solvers and options are rejected before solving
+    '''
+    with pytest.raises(ValueError):
+        check_options({'solver': 'gurobi'})
+    with pytest.raises(ValueError):
+        check_options({'solver': 'highs', 'gap': 0.01})
@@ -0,0 +1,70 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess_optimizer import Bess_Optimizer
+from src.bess import Bess
+from src.backtest import check_schedule
+
+
+@pytest.fixture(scope = 'module')
+def quarter_hour_file(tmp_path_factory):
+    '''
+    energy prices from 1/1/2023 to 2/1/2023 repeated over four 15 minute intervals per hour
+    '''
+    prices = pd.read_csv('data/energy_prices.csv')
+    prices = prices[prices['Operating Day'].str.startswith('1/') | (prices['Operating Day'] == '2/1/23')]
+    quarters = prices.loc[prices.index.repeat(4)].reset_index(drop = True)
+    quarters.insert(2, 'Interval', np.tile(np.arange(1, 5), len(prices)))
+    path = tmp_path_factory.mktemp('prices') / 'energy_prices_15min.csv'
+    quarters.to_csv(path, index = False)
+    return str(path)
+
+
+def quarter_hour_optimizer(price_file: str, backend: str) -> Bess_Optimizer:
+    optimizer = Bess_Optimizer(case = 'quarter_hour', backend = backend)
+    optimizer.load_prices(energy_price_file = price_file)
+    optimizer.load_regulation(regulation_price_file = 'data/regulation_prices.csv')
+    return optimizer
+
+
+def test_intervals_aligned(quarter_hour_file):
+    '''
+    check the interval length is read from the prices and the hourly regulation prices cover every interval
+    '''
+    optimizer = quarter_hour_optimizer(quarter_hour_file, 'highs')
+    period, day_ranges, energy, reg_up, reg_down = optimizer.align_prices('1/1/2023', '1/7/2023')
+    assert optimizer.interval_hours == 0.25, 'wrong interval length'
+    assert len(period) == len(set(period)) == 7 * 96, 'one unique key expected per interval'
+    assert day_ranges[1] == (96, 192), 'wrong day ranges'
+    assert (reg_up[:4] == reg_up[0]).all() and reg_up[4] != reg_up[0], 'hourly regulation prices not repeated per interval'
+
+
+def test_backends_agree(quarter_hour_file):
+    '''
+    check the PuLP and HiGHS models of 15 minute intervals have the same optimum
+    '''
+    profits = []
+    for backend in ('pulp', 'highs'):
+        optimizer = quarter_hour_optimizer(quarter_hour_file, backend)
+        optimizer.optimize_period(Bess(), '1/1/2023', '1/3/2023')
+        profits.append(optimizer.get_profit())
+    assert profits[0] == pytest.approx(profits[1], rel = 1e-4), 'backends disagree on 15 minute intervals'
+
+
+def test_schedule_feasible_and_close_to_hourly(quarter_hour_file, january_solution):
+    '''
+    check the 15 minute schedule keeps the constraints and earns about the hourly profit on hourly prices,
+    a little more as regulation only needs the energy of one interval
+    '''
+    bess, hourly = january_solution
+    optimizer = quarter_hour_optimizer(quarter_hour_file, 'highs')
+    optimizer.optimize_period(bess, '1/1/2023', '2/1/2023')
+    schedule = optimizer.get_optimal_schedule()
+    assert (schedule.index[1] - schedule.index[0]) == pd.Timedelta(minutes = 15), 'schedule is not indexed by interval'
+    checks = check_schedule(schedule, bess.get_power_capacity(), bess.get_energy_capacity(), bess.get_efficiency())
+    assert checks['total'][0] == 0, 'constraints broken by the 15 minute schedule'
+    assert optimizer.get_profit() == pytest.approx(hourly.get_profit(), rel = 0.1), 'profit far from the hourly optimum'
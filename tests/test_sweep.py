@@ -0,0 +1,46 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath('../sr'))
+from src.bess import Bess
+from src.sweep import build_grid, run_sweep, init_worker, run_case, warm_optimizer
+
+
+def test_build_grid():
+    '''
+    check the grid has one case per combination of Bess parameters and periods
+    '''
+    cases = build_grid([50, 100], [100, 200, 400], [('1/1/2023', '1/7/2023'), ('2/1/2023', '2/7/2023')])
+    assert len(cases) == 12, 'grid is not the cartesian product of the parameters'
+    assert len({case['case'] for case in cases}) == 12, 'case names are not unique'
+
+
+def test_sweep_parallel_matches_serial():
+    '''
+    check the process pool returns the same summary as the serial sweep
+    '''
+    cases = build_grid([50, 100], [200], [('1/1/2023', '1/3/2023')])
+    serial, serial_schedules = run_sweep(cases, workers = 1)
+    parallel, parallel_schedules = run_sweep(cases, workers = 2)
+    assert serial['profit'].tolist() == parallel['profit'].tolist(), 'parallel profits differ from serial run'
+    assert set(parallel_schedules) == {case['case'] for case in cases}, 'missing schedules in the sweep'
+    assert (parallel['cycles'] > 0).all(), 'cycles not collected in the summary'
+
+
+def test_warm_models_reused_and_evicted(loaded_optimizer):
+    '''
+    check a worker re-solves the kept model of a repeated Bess and period, and keeps at most warm_models
+    '''
+    loader = loaded_optimizer()
+    init_worker(loader.energy_price, loader.reg_prices, 'highs', warm_models = 1)
+    first, other = build_grid([50, 100], [200], [('1/1/2023', '1/3/2023')])
+    optimizer = warm_optimizer(Bess(power_capacity = 50), first)
+    assert warm_optimizer(Bess(power_capacity = 50), {**first, 'initial_charge': 100}) is optimizer, 'warm model rebuilt'
+    warm_optimizer(Bess(power_capacity = 100), other)
+    assert warm_optimizer(Bess(power_capacity = 50), first) is not optimizer, 'model kept beyond warm_models'
+
+    init_worker(loader.energy_price, loader.reg_prices, 'highs')
+    cold = run_case(first)
+    init_worker(loader.energy_price, loader.reg_prices, 'highs', warm_models = 1)
+    run_case({**first, 'initial_charge': 100})
+    assert run_case(first)['profit'] == cold['profit'], 'warm re-solve differs from a fresh build'
@@ -0,0 +1,44 @@
+import sys
+import os
+import re
+import numpy as np
+
+sys.path.append(os.path.abspath('../sr'))
+from src.visualizer import PANELS, Visualizer, downsample_min_max, render_reports
+
+
+def test_downsample_keeps_peaks():
+    '''
+    check the downsampled series is bounded in size, ordered and keeps the extremes
+    '''
+    x = np.arange(8760)
+    y = np.sin(x / 24.0)
+    y[5000] = 10
+    y[6000] = -10
+    small_x, small_y = downsample_min_max(x, y, max_points = 500)
+    assert len(small_x) <= 500, 'too many points kept'
+    assert (np.diff(small_x) > 0).all(), 'points are not in time order'
+    assert small_y.max() == 10 and small_y.min() == -10, 'peaks lost in the downsampling'
+
+
+def test_render_pdf_pages(january_solution, tmp_path):
+    '''
+    check the batch report writes one page per panel into a single pdf
+    '''
+    bess, optimizer = january_solution
+    path = Visualizer('test', data = optimizer.get_optimal_schedule()).render_pdf(str(tmp_path / 'report.pdf'))
+    with open(path, 'rb') as pdf:
+        content = pdf.read()
+    assert content.startswith(b'%PDF'), 'report is not a pdf'
+    assert len(re.findall(rb'/Type /Page\W', content)) == len(PANELS), 'one page expected per panel'
+
+
+def test_render_reports_cases(january_solution, tmp_path):
+    '''
+    check every case of the batch gets its report
+    '''
+    bess, optimizer = january_solution
+    schedule = optimizer.get_optimal_schedule()
+    paths = render_reports({'a': schedule, 'b': schedule}, output_dir = str(tmp_path), workers = 1)
+    assert [os.path.basename(path) for path in paths] == ['report-a.pdf', 'report-b.pdf'], 'wrong report names'
+    assert all(os.path.getsize(path) > 0 for path in paths), 'empty report'